@@ -0,0 +1,155 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from api import reference, throttling
+from api.authentication import CachedTokenAuthentication
+from api.conditional import conditional_response
+from api.filters import RecipeFilter
+from api.pagination import CustomPageNumberPagination
+from api.representations import (RECIPE_FIELDS, ingredient_representation,
+                                 recipe_detail, recipe_representations,
+                                 tag_representation)
+from api.versions import INGREDIENTS, RECIPES, TAGS, USERS
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import close_old_connections
+from django.http import HttpResponse
+from recipe.models import Recipe
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_THREADS,
+    thread_name_prefix='async-db',
+)
+
+
+def _call_in_thread(func, *args):
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_thread(func, *args):
+    """
+    Выполняет синхронный код с ORM в ограниченном пуле потоков,
+    не блокируя цикл событий. Контекст (метрики запроса) сохраняется.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _executor, partial(context.run, _call_in_thread, func, *args)
+    )
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    """Ответ в том же виде, что и у JSONRenderer DRF."""
+    return HttpResponse(JSONRenderer().render(data), status=status_code,
+                        content_type='application/json')
+
+
+def authenticate(request):
+    """Запрос DRF с пользователем, определённым по токену."""
+    drf_request = Request(request)
+    result = CachedTokenAuthentication().authenticate(drf_request)
+    drf_request.user = result[0] if result else AnonymousUser()
+    return drf_request
+
+
+def api_view(build, throttle_scope=None, resources=(), per_user=False,
+             cached=False):
+    """
+    Асинхронное GET-представление поверх синхронной функции ``build``.
+    ``throttle_scope`` - класс стоимости для ``api.throttling``.
+    ``resources``, ``per_user`` и ``cached`` - как у ``conditional_get``
+    синхронного представления: ETag и ответы 304 те же.
+    """
+    def respond(request, *args, **kwargs):
+        request = authenticate(request)
+        if throttle_scope is not None:
+            throttling.check(request, throttle_scope)
+
+        def get_response(request):
+            return json_response(build(request, *args, **kwargs))
+
+        if not resources:
+            return get_response(request)
+        return conditional_response(request, get_response, resources,
+                                    per_user, cached)
+
+    async def view(request, *args, **kwargs):
+        if request.method != 'GET':
+            return json_response(
+                {'detail': f'Метод "{request.method}" не разрешён.'},
+                status.HTTP_405_METHOD_NOT_ALLOWED
+            )
+        try:
+            return await run_in_db_thread(
+                lambda: respond(request, *args, **kwargs)
+            )
+        except exceptions.APIException as error:
+            detail = error.detail
+            if not isinstance(detail, dict):
+                detail = {'detail': detail}
+            response = json_response(detail, error.status_code)
+            if getattr(error, 'wait', None) is not None:
+                response['Retry-After'] = str(error.wait)
+            return response
+    return view
+
+
+def filtered(filterset_class, request, queryset):
+    filterset = filterset_class(request.query_params, queryset=queryset,
+                                request=request)
+    if not filterset.is_valid():
+        raise exceptions.ValidationError(filterset.errors)
+    return filterset.qs
+
+
+def ingredient_list(request):
+    return [
+        ingredient_representation(row)
+        for row in reference.search_ingredients(
+            request.query_params.get('name')
+        )
+    ]
+
+
+def tag_list(request):
+    return [tag_representation(row) for row in reference.tags.get()['rows']]
+
+
+def recipe_list(request):
+    paginator = CustomPageNumberPagination()
+    page = paginator.paginate_queryset(
+        filtered(RecipeFilter, request, Recipe.objects.all()).values(
+            *RECIPE_FIELDS
+        ),
+        request
+    )
+    return paginator.get_paginated_response(
+        recipe_representations(page, request)
+    ).data
+
+
+def recipe(request, pk):
+    data = recipe_detail(Recipe.objects.filter(pk=pk), request)
+    if data is None:
+        raise exceptions.NotFound()
+    return data
+
+
+async_ingredient_list = api_view(ingredient_list, throttle_scope='search',
+                                 resources=(INGREDIENTS, ), cached=True)
+async_tag_list = api_view(tag_list, resources=(TAGS, ), cached=True)
+async_recipe_list = api_view(
+    recipe_list, resources=(RECIPES, TAGS, INGREDIENTS, USERS), per_user=True
+)
+async_recipe_detail = api_view(
+    recipe, resources=(RECIPES, TAGS, INGREDIENTS, USERS), per_user=True
+)
@@ -0,0 +1,119 @@
+import copy
+import hashlib
+
+from api import versions
+from api.caches import LRUCache
+from api.models import ResourceVersion
+from api.routers import use_primary
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+DEFAULT_TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TIMEOUT': 60,
+    'CACHE': None,
+}
+
+
+def get_config():
+    return {**DEFAULT_TOKEN_AUTH_CACHE,
+            **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+
+
+_local_tokens = LRUCache(**{
+    option.lower(): value for option, value in get_config().items()
+    if option != 'CACHE'
+})
+
+
+def shared_cache():
+    """Общий кэш из CACHES, если он задан в настройках."""
+    alias = get_config()['CACHE']
+    if alias:
+        return caches[alias]
+    return None
+
+
+def cache_key(key):
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+# Поля пользователя, от которых зависят проверка токена и ответы,
+# собранные из ``request.user``. Сохранение других полей, например
+# last_login при входе, кэш токенов не сбрасывает.
+CACHED_USER_FIELDS = frozenset((
+    'is_active', 'password', 'is_staff', 'is_superuser',
+    'email', 'username', 'first_name', 'last_name',
+))
+
+
+def invalidate_user(user_id):
+    """
+    Сбрасывает кэш всех токенов пользователя во всех процессах:
+    записи кэша хранят версию учётных данных из ``ResourceVersion``.
+    """
+    versions.bump(versions.auth_resource(user_id))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кэшированием пары токен -> пользователь.
+
+    Пара хранится в общем кэше, если он задан в
+    ``TOKEN_AUTH_CACHE['CACHE']``, иначе - в LRU-кэше процесса, вместе
+    с версией учётных данных пользователя. Каждый запрос сверяет её
+    с версией в базе одним запросом по ключу: удаление токена
+    и изменение пользователя в любом процессе сразу действуют во всех.
+    """
+
+    def load_credentials(self, key):
+        """
+        Токен, пользователь и версия его учётных данных одним запросом,
+        то есть из одного снимка базы: версия не может оказаться новее
+        прочитанных данных.
+        """
+        try:
+            token = Token.objects.select_related('user').annotate(
+                auth_version=Coalesce(Subquery(
+                    ResourceVersion.objects.filter(name=Concat(
+                        Value('auth:'),
+                        Cast(OuterRef('user_id'), CharField()),
+                    )).values('version')[:1]
+                ), 0),
+            ).get(key=key)
+        except Token.DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return token.user, token, token.auth_version
+
+    def authenticate_credentials(self, key):
+        cache = shared_cache()
+        if cache is not None:
+            cached = cache.get(cache_key(key))
+        else:
+            cached = _local_tokens.get(key)
+        # Только что выданного токена и версии после отзыва на реплике
+        # может ещё не быть.
+        with use_primary():
+            if cached is not None:
+                resource = versions.auth_resource(cached[0].pk)
+                if versions.get_versions(
+                    [resource]
+                )[resource][0] != cached[2]:
+                    cached = None
+            if cached is None:
+                cached = self.load_credentials(key)
+                timeout = get_config()['TIMEOUT']
+                if cache is not None:
+                    cache.set(cache_key(key), cached, timeout)
+                else:
+                    _local_tokens.set(key, cached, timeout)
+        user, token = cached[:2]
+        return copy.copy(user), token
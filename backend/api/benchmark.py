@@ -0,0 +1,195 @@
+import json
+import random
+import re
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from recipe import feed
+from recipe.fixtures import FixtureGenerator
+from recipe.models import Ingredient, Recipe, Tag
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def seed(users=100, recipes=1000, favorites=20, cart=5, subscriptions=10,
+         seed=0):
+    """Синтетический набор данных заданного масштаба."""
+    FixtureGenerator(seed=seed, prefix='bench').generate(
+        users=users, recipes=recipes, favorites=favorites, cart=cart,
+        subscriptions=subscriptions,
+    )
+    feed.rebuild()
+
+
+def scenarios(rng):
+    """Сценарии: имя, путь и нужна ли аутентификация."""
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True)[:1000])
+    slugs = list(Tag.objects.values_list('slug', flat=True))
+    prefixes = list(Ingredient.objects.values_list('name', flat=True)[:500])
+    return (
+        ('recipes-list-anonymous', lambda: '/api/recipes/', False),
+        ('recipes-list', lambda: '/api/recipes/', True),
+        ('recipes-list-tags', lambda: '/api/recipes/?' + '&'.join(
+            f'tags={slug}' for slug in rng.sample(slugs, min(2, len(slugs)))
+        ), True),
+        ('recipes-favorited', lambda: '/api/recipes/?is_favorited=1', True),
+        ('recipes-in-cart',
+         lambda: '/api/recipes/?is_in_shopping_cart=1', True),
+        ('recipe-detail',
+         lambda: f'/api/recipes/{rng.choice(recipe_ids)}/', True),
+        ('tags', lambda: '/api/tags/', False),
+        ('ingredients-search', lambda: '/api/ingredients/?name='
+         + rng.choice(prefixes)[:2], False),
+        ('subscriptions',
+         lambda: '/api/users/subscriptions/?recipes_limit=3', True),
+        ('feed', lambda: '/api/recipes/feed/', True),
+        ('users-me', lambda: '/api/users/me/', True),
+        ('download-shopping-cart',
+         lambda: '/api/recipes/download_shopping_cart/', True),
+    )
+
+
+class ClientDriver:
+    """Запросы через тестовый клиент Django в том же процессе."""
+
+    def __init__(self, accept_encoding=None):
+        self.client = Client()
+        self.accept_encoding = accept_encoding
+
+    def get(self, path, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        if self.accept_encoding:
+            headers['HTTP_ACCEPT_ENCODING'] = self.accept_encoding
+        response = self.client.get(path, **headers)
+        content = (b''.join(response.streaming_content)
+                   if response.streaming else response.content)
+        return (response.status_code, len(content),
+                response.get('Server-Timing', ''))
+
+
+class HTTPDriver:
+    """Запросы к запущенному серверу по HTTP."""
+
+    def __init__(self, base_url, accept_encoding=None):
+        self.base_url = base_url.rstrip('/')
+        self.accept_encoding = accept_encoding
+
+    def get(self, path, token=None):
+        # urllib не распаковывает ответ: считаются байты, переданные
+        # по сети.
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        if self.accept_encoding:
+            headers['Accept-Encoding'] = self.accept_encoding
+        request = Request(self.base_url + path, headers=headers)
+        try:
+            with urlopen(request) as response:
+                return (response.status, len(response.read()),
+                        response.headers.get('Server-Timing', ''))
+        except HTTPError as error:
+            return error.code, len(error.read()), ''
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def run_scenario(driver, make_path, token, requests, concurrency):
+    def timed_request(path):
+        start = perf_counter()
+        status, size, timing = driver.get(path, token)
+        queries = SERVER_TIMING_QUERIES.search(timing)
+        return (perf_counter() - start, status, size,
+                int(queries.group(1)) if queries else None)
+
+    paths = [make_path() for _ in range(requests)]
+    start = perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(timed_request, paths))
+    else:
+        results = [timed_request(path) for path in paths]
+    elapsed = perf_counter() - start
+
+    latencies = [result[0] * 1000 for result in results]
+    queries = [result[3] for result in results if result[3] is not None]
+    return {
+        'requests': requests,
+        'errors': sum(1 for result in results if result[1] >= 400),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'queries_per_request': (round(statistics.mean(queries), 2)
+                                if queries else None),
+        'bytes_per_request': round(
+            statistics.mean(result[2] for result in results)
+        ),
+        'throughput_rps': round(requests / elapsed, 2),
+    }
+
+
+def run(driver, requests=100, warmup=5, concurrency=1, only=None, seed=0):
+    """Прогоняет сценарии и возвращает отчёт."""
+    rng = random.Random(seed)
+    tokens = list(Token.objects.values_list('key', flat=True)[:100])
+    report = {
+        'database': connection.vendor,
+        'recipes': Recipe.objects.count(),
+        'users': User.objects.count(),
+        'requests': requests,
+        'concurrency': concurrency,
+        'accept_encoding': driver.accept_encoding,
+        'scenarios': {},
+    }
+    for name, make_path, auth in scenarios(rng):
+        if only and name not in only:
+            continue
+        token = rng.choice(tokens) if auth and tokens else None
+        if warmup:
+            run_scenario(driver, make_path, token, warmup, 1)
+        report['scenarios'][name] = run_scenario(
+            driver, make_path, token, requests, concurrency
+        )
+    return report
+
+
+def compare(report, baseline, tolerance):
+    """Список регрессий относительно сохранённого отчёта."""
+    regressions = []
+    for name, current in report['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance / 100):
+            regressions.append(
+                f'{name}: p95 {previous["p95_ms"]} -> {current["p95_ms"]} мс'
+            )
+        if (current['queries_per_request'] or 0) > (
+            previous['queries_per_request'] or 0
+        ):
+            regressions.append(
+                f'{name}: запросов к БД {previous["queries_per_request"]} '
+                f'-> {current["queries_per_request"]}'
+            )
+    return regressions
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as report_file:
+        return json.load(report_file)
+
+
+def save_report(report, path):
+    with open(path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, ensure_ascii=False, indent=2)
@@ -0,0 +1,76 @@
+import gzip
+import re
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_COMPRESSION = {
+    'ENABLED': True,
+    # Ответы меньше порога не сжимаются: выигрыш меньше накладных
+    # расходов на сжатие и распаковку.
+    'MIN_SIZE': 1024,
+    # Сжимаются только текстовые типы. PDF и картинки уже сжаты.
+    'CONTENT_TYPES': ('application/json', 'text/'),
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+}
+
+ACCEPT_ENCODING = re.compile(
+    r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*(?:,|$)'
+)
+
+
+def get_config():
+    return {**DEFAULT_COMPRESSION, **getattr(settings, 'COMPRESSION', {})}
+
+
+def encoding_weights(header):
+    """
+    Веса кодировок из Accept-Encoding. Нулевой вес сохраняется: это явный
+    отказ, который важнее веса ``*``.
+    """
+    weights = {}
+    for name, weight in ACCEPT_ENCODING.findall(header or ''):
+        try:
+            weights[name.lower()] = float(weight) if weight else 1.0
+        except ValueError:
+            continue
+    return weights
+
+
+def choose_encoding(header):
+    """
+    Поддерживаемая кодировка с наибольшим весом, при равных весах - brotli.
+    Кодировка без своего веса получает вес ``*``, если он указан.
+    """
+    weights = encoding_weights(header)
+    default = weights.get('*', 0)
+    chosen, chosen_weight = None, 0
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        weight = weights.get(encoding, default)
+        if weight > chosen_weight:
+            chosen, chosen_weight = encoding, weight
+    return chosen
+
+
+def is_compressible(response, config):
+    if response.streaming or response.has_header('Content-Encoding'):
+        return False
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip()
+    return (content_type.startswith(tuple(config['CONTENT_TYPES']))
+            and len(response.content) >= config['MIN_SIZE'])
+
+
+def compress(content, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(content, quality=config['BROTLI_QUALITY'])
+    return gzip.compress(content, compresslevel=config['GZIP_LEVEL'],
+                         mtime=0)
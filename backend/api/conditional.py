@@ -0,0 +1,72 @@
+import hashlib
+from functools import partial, wraps
+
+from api import reference, versions
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+
+def get_validators(request, resources, per_user=False, cached=False):
+    """ETag и время последнего изменения по версиям ресурсов."""
+    resources = list(resources)
+    if per_user and request.user.is_authenticated:
+        resources.append(versions.user_resource(request.user.id))
+    if cached:
+        current = reference.get_versions(resources)
+    else:
+        current = versions.get_versions(resources)
+    key = '|'.join(
+        [request.get_full_path(), str(request.user.id)]
+        + [f'{name}={version}'
+           for name, (version, _) in sorted(current.items())]
+    )
+    updated = [updated for _, updated in current.values() if updated]
+    return (
+        hashlib.sha1(key.encode()).hexdigest(),
+        max(updated) if updated else None,
+    )
+
+
+def conditional_response(request, get_response, resources,
+                         per_user=False, cached=False):
+    """
+    Ответ ``get_response(request)`` с ETag и Last-Modified по версиям
+    ресурсов или 304, если данные не менялись с версии клиента.
+    Версии читаются один раз и только для GET и HEAD.
+    """
+    validators = []
+
+    def validator(index, request):
+        if not validators:
+            validators.extend(
+                get_validators(request, resources, per_user, cached)
+            )
+        return validators[index]
+
+    response = condition(
+        etag_func=partial(validator, 0),
+        last_modified_func=partial(validator, 1),
+    )(get_response)(request)
+    patch_vary_headers(response, ('Authorization', ))
+    return response
+
+
+def conditional_get(*resources, per_user=False, cached=False):
+    """
+    Декоратор методов вьюсета для условных GET-запросов.
+
+    Если данные ресурсов не менялись с версии клиента, возвращается
+    ответ 304 до выборки и сериализации данных. С ``cached=True``
+    версии берутся из кэша справочников ``api.reference``, которым
+    и отвечает представление.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            return conditional_response(
+                request,
+                lambda request: method(self, request, *args, **kwargs),
+                resources, per_user, cached,
+            )
+        return wrapper
+    return decorator
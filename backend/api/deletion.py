@@ -0,0 +1,185 @@
+from collections import defaultdict
+
+from api import matching, profiles, versions
+from api.authentication import invalidate_user
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.db.models.signals import post_delete, pre_delete
+from recipe import feed, similarity
+from recipe.models import Favorite, IngredientAmount, Recipe, ShoppingCart
+from rest_framework.authtoken.models import Token
+from users.models import Subscriptions
+
+User = get_user_model()
+
+
+def recipes_deleted(rows, removing):
+    versions.bump(versions.RECIPES)
+    matching.log_changes([recipe_id for recipe_id, in rows])
+
+
+def amounts_deleted(rows, removing):
+    """Состав изменился у рецептов, которые сами не удаляются."""
+    recipe_ids = {recipe_id for recipe_id, in rows
+                  if recipe_id not in removing[Recipe]}
+    if recipe_ids:
+        versions.bump(versions.RECIPES)
+        matching.log_changes(recipe_ids)
+        for recipe_id in recipe_ids:
+            similarity.mark_changed(recipe_id)
+
+
+def user_relations_deleted(rows, removing):
+    user_ids = {user_id for user_id, *_ in rows}
+    versions.bump(*map(versions.user_resource, sorted(user_ids)))
+
+
+def subscriptions_deleted(rows, removing):
+    user_relations_deleted(rows, removing)
+    # Записи лент удалены каскадом, остаётся пересмотреть популярность
+    # оставшихся авторов.
+    for author_id in {author_id for _, author_id in rows
+                      if author_id not in removing[User]}:
+        feed.followers_decreased(author_id)
+
+
+def users_deleted(rows, removing):
+    versions.bump(versions.USERS)
+    for user_id, in rows:
+        profiles.invalidate_profile(user_id)
+
+
+def tokens_deleted(rows, removing):
+    for user_id in sorted({user_id for user_id, in rows}):
+        invalidate_user(user_id)
+
+
+# Модели, сигналы удаления которых воспроизводятся здесь: поля, которые
+# нужно прочитать до удаления, и обработчик пачки удалённых строк.
+# Удаление остальных моделей с подписчиками на сигналы идёт через
+# обычный сборщик Django, но пачками.
+HANDLERS = {
+    Recipe: (('id',), recipes_deleted),
+    IngredientAmount: (('recipe_id',), amounts_deleted),
+    Favorite: (('user_id',), user_relations_deleted),
+    ShoppingCart: (('user_id',), user_relations_deleted),
+    Subscriptions: (('user_id', 'author_id'), subscriptions_deleted),
+    User: (('id',), users_deleted),
+    Token: (('user_id',), tokens_deleted),
+}
+
+# Модели, ключи удаляемых строк которых нужны обработчикам зависимых
+# строк: зависимые удаляются и обрабатываются раньше.
+REMOVING = (Recipe, User)
+
+
+class BatchDeleter:
+    """
+    Удаление объектов со всеми зависимыми строками пачками.
+
+    Сборщик Django загружает в память все каскадно удаляемые объекты
+    сразу. Здесь зависимые таблицы обходятся по метаданным связей,
+    строки выбираются по ``batch_size`` ключей и удаляются прямым
+    DELETE, каждая пачка - в своей короткой транзакции. Обработчики
+    ``HANDLERS`` выполняются после каждой пачки, поэтому в памяти
+    остаются только ключи удаляемых моделей из ``REMOVING``.
+    """
+
+    def __init__(self, batch_size=1000, using=DEFAULT_DB_ALIAS, log=None):
+        self.batch_size = batch_size
+        self.using = using
+        self.log = log or (lambda message: None)
+        self.removing = defaultdict(set)
+        self.counts = defaultdict(int)
+
+    def delete(self, model, pks):
+        """Удаляет объекты ``model`` с ключами ``pks`` и всё зависимое."""
+        pks = list(pks)
+        if model in REMOVING:
+            self.removing[model].update(pks)
+        self.delete_rows(model, model._meta.pk.name, pks)
+        return dict(self.counts)
+
+    def delete_rows(self, model, field, values):
+        values = list(values)
+        for start in range(0, len(values), self.batch_size):
+            self.delete_batches(model, {
+                f'{field}__in': values[start:start + self.batch_size]
+            })
+
+    def delete_batches(self, model, filters):
+        fields, handler = HANDLERS.get(model, ((), None))
+        queryset = model._base_manager.using(self.using).filter(**filters)
+        while True:
+            rows = list(queryset.order_by().values_list(
+                'pk', *fields
+            )[:self.batch_size])
+            if not rows:
+                return
+            pks = [row[0] for row in rows]
+            if model in REMOVING:
+                self.removing[model].update(pks)
+            self.delete_dependents(model, pks)
+            batch = model._base_manager.using(self.using).filter(pk__in=pks)
+            with transaction.atomic(using=self.using):
+                if model in HANDLERS or not self.has_listeners(model):
+                    batch._raw_delete(self.using)
+                else:
+                    batch.delete()
+            if handler is not None:
+                handler([row[1:] for row in rows], self.removing)
+            self.counts[model._meta.label] += len(rows)
+            self.log(f'{model._meta.label}: {self.counts[model._meta.label]}')
+
+    @staticmethod
+    def has_listeners(model):
+        return (pre_delete.has_listeners(model)
+                or post_delete.has_listeners(model))
+
+    def delete_dependents(self, model, pks):
+        # Те же связи, что обходит сборщик Django, включая скрытые
+        # и связи промежуточных таблиц many-to-many.
+        for relation in get_candidate_relations_to_delete(model._meta):
+            related = relation.related_model
+            name = relation.field.name
+            on_delete = relation.on_delete
+            if on_delete is models.CASCADE:
+                self.delete_rows(related, name, pks)
+            elif on_delete is models.SET_NULL:
+                related._base_manager.using(self.using).filter(**{
+                    f'{name}__in': pks
+                }).update(**{name: None})
+            elif on_delete in (models.PROTECT, models.RESTRICT):
+                protected = related._base_manager.using(self.using).filter(
+                    **{f'{name}__in': pks}
+                )
+                if protected.exists():
+                    raise models.ProtectedError(
+                        f'Удалению мешают связанные {related._meta.label}',
+                        set(protected[:self.batch_size]),
+                    )
+            elif on_delete is not models.DO_NOTHING:
+                raise NotImplementedError(
+                    f'{related._meta.label}.{name}: on_delete '
+                    f'{on_delete.__name__} не поддерживается'
+                )
+
+
+def delete_recipes(recipe_ids, batch_size=1000, log=None):
+    return BatchDeleter(batch_size, log=log).delete(Recipe, recipe_ids)
+
+
+def delete_users(user_ids, batch_size=1000, log=None):
+    return BatchDeleter(batch_size, log=log).delete(User, user_ids)
+
+
+DELETERS = {
+    'recipe': delete_recipes,
+    'user': delete_users,
+}
+
+
+def delete_objects(kind, pks, batch_size=1000, log=None):
+    """Удаление по имени типа: для команды и фоновой задачи."""
+    return DELETERS[kind](pks, batch_size=batch_size, log=log)
@@ -1,6 +1,8 @@
 import base64
+import hashlib
 
 import webcolors
+from api.reference import get_instance
 from django.core.files.base import ContentFile
 from rest_framework import serializers
 
@@ -13,7 +15,11 @@ class Base64ImageField(serializers.ImageField):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            content = base64.b64decode(imgstr)
+            # Имя по содержимому: файл под таким именем не меняется,
+            # и nginx отдаёт его с долгим кэшированием.
+            name = hashlib.sha256(content).hexdigest()[:32]
+            data = ContentFile(content, name=f'{name}.{ext}')
 
         return super().to_internal_value(data)
 
@@ -32,3 +38,32 @@ class Hex2NameColor(serializers.Field):
         except ValueError:
             raise serializers.ValidationError('Для этого цвета нет имени')
         return data
+
+
+class ReferenceRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Ссылка на тег или ингредиент по id. Существование проверяется
+    по кэшу справочника (``api.reference``), без запросов к БД. Если id
+    в кэше нет, версия справочника сверяется с базой сразу, не дожидаясь
+    ``CHECK_INTERVAL``: тег, только что созданный в другом процессе,
+    не отклоняется.
+    """
+    def __init__(self, cache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        model = self.get_queryset().model
+        instance = get_instance(self.cache, model, pk)
+        if instance is None:
+            self.cache.invalidate()
+            instance = get_instance(self.cache, model, pk)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
@@ -1,6 +1,7 @@
+from api import reference
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import FilterSet, filters
-from recipe.models import Ingredient, Recipe, Tag
+from recipe.models import Ingredient, Recipe
 
 User = get_user_model()
 
@@ -16,13 +17,16 @@ class IngredientFilter(FilterSet):
         fields = ('name', )
 
 
+def tag_choices():
+    return [(slug, slug) for slug in reference.tags.get()['by_slug']]
+
+
 class RecipeFilter(FilterSet):
     """Фильтр для рецептов."""
 
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug',
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags',
     )
     is_favorited = filters.BooleanFilter(
         method='filter_is_favorited'
@@ -35,6 +39,17 @@ class RecipeFilter(FilterSet):
         model = Recipe
         fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
 
+    def filter_tags(self, queryset, name, value):
+        """
+        Слаги переводятся в id по кэшу тегов, рецепты отбираются
+        подзапросом к связующей таблице: без JOIN и без дублей.
+        """
+        by_slug = reference.tags.get()['by_slug']
+        return queryset.filter(id__in=Recipe.tags.through.objects.filter(
+            tag_id__in=[by_slug[slug]['id'] for slug in value
+                        if slug in by_slug]
+        ).values('recipe_id'))
+
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
             return queryset.filter(favorites__user=self.request.user)
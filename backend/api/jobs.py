@@ -0,0 +1,207 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from api import deletion
+from api.models import Job
+from api.utils import shopping_list, shopping_list_pdf, shopping_list_text
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from recipe import feed, similarity
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS = {
+    # Сколько задач выполняется одновременно, по процессу на задачу.
+    'PROCESSES': 2,
+    # Как часто проверять очередь, секунд.
+    'POLL_INTERVAL': 1,
+    # Задача, выполняющаяся дольше, считается брошенной упавшим
+    # процессом и возвращается в очередь.
+    'TIMEOUT': 600,
+    'MAX_ATTEMPTS': 3,
+    # Сколько секунд хранятся завершённые задачи и их результаты.
+    'RETENTION': 86400,
+    # Периодические задачи: тип -> интервал в секундах.
+    'SCHEDULE': {
+        'similar_recipes': 300,
+        'similar_recipes_build': 86400,
+    },
+}
+
+TASKS = {}
+
+
+def get_config():
+    return {**DEFAULT_JOBS, **getattr(settings, 'JOBS', {})}
+
+
+def task(kind):
+    """
+    Регистрирует функцию задачи. Функция получает ``Job`` и возвращает
+    ``(имя файла, тип содержимого, байты)``.
+    """
+    def register(function):
+        TASKS[kind] = function
+        return function
+    return register
+
+
+def enqueue(kind, user=None, payload=None):
+    if kind not in TASKS:
+        raise ValueError(f'Неизвестный тип задачи: {kind}')
+    return Job.objects.create(kind=kind, user=user, payload=payload or {})
+
+
+def claim(limit):
+    """
+    Забирает до ``limit`` задач из очереди. Задачу получает тот процесс,
+    чей UPDATE со статусом ``pending`` в условии изменил строку, поэтому
+    несколько обработчиков не выполнят одну задачу дважды.
+    """
+    claimed = []
+    if limit <= 0:
+        return claimed
+    candidates = Job.objects.filter(status=Job.PENDING).order_by(
+        'id'
+    ).values_list('id', 'attempts')[:limit * 2]
+    for job_id, attempts in candidates:
+        if len(claimed) == limit:
+            break
+        if Job.objects.filter(id=job_id, status=Job.PENDING).update(
+            status=Job.RUNNING, started=timezone.now(),
+            attempts=attempts + 1,
+        ):
+            claimed.append(job_id)
+    return claimed
+
+
+def execute(job_id):
+    """Выполняет забранную задачу и сохраняет результат или ошибку."""
+    close_old_connections()
+    job = Job.objects.select_related('user').get(id=job_id)
+    try:
+        name, content_type, content = TASKS[job.kind](job)
+    except Exception:
+        logger.exception('Задача %s завершилась ошибкой', job)
+        retry = job.attempts < get_config()['MAX_ATTEMPTS']
+        Job.objects.filter(id=job_id).update(
+            status=Job.PENDING if retry else Job.FAILED,
+            error=traceback.format_exc(limit=5),
+            finished=None if retry else timezone.now(),
+        )
+        return False
+    Job.objects.filter(id=job_id).update(
+        status=Job.DONE, result=content, result_name=name,
+        content_type=content_type, error='', finished=timezone.now(),
+    )
+    return True
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи процессов, которые не завершились."""
+    config = get_config()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        started__lt=timezone.now() - timedelta(seconds=config['TIMEOUT']),
+    )
+    failed = stale.filter(attempts__gte=config['MAX_ATTEMPTS']).update(
+        status=Job.FAILED, error='Превышено время выполнения',
+        finished=timezone.now(),
+    )
+    return failed + stale.update(status=Job.PENDING)
+
+
+def prune():
+    return Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED),
+        finished__lt=timezone.now() - timedelta(
+            seconds=get_config()['RETENTION']
+        ),
+    ).delete()[0]
+
+
+def enqueue_scheduled():
+    """
+    Ставит в очередь периодические задачи, которым пора выполниться:
+    задачи этого типа нет в очереди и она не ставилась за интервал.
+    Два обработчика могут поставить задачу одновременно, поэтому
+    периодические задачи должны допускать повторный запуск.
+    """
+    now = timezone.now()
+    queued = []
+    for kind, interval in get_config()['SCHEDULE'].items():
+        if not Job.objects.filter(kind=kind).filter(
+            Q(status__in=(Job.PENDING, Job.RUNNING))
+            | Q(created__gte=now - timedelta(seconds=interval))
+        ).exists():
+            queued.append(enqueue(kind))
+    return queued
+
+
+@task('shopping_list')
+def shopping_list_task(job):
+    items = shopping_list(job.user)
+    if job.payload.get('export') == 'txt':
+        return ('shopping_list.txt', 'text/plain; charset=utf-8',
+                shopping_list_text(items).encode())
+    return ('shopping_list.pdf', 'application/pdf',
+            shopping_list_pdf(items).getvalue())
+
+
+@task('bulk_delete')
+def bulk_delete_task(job):
+    counts = deletion.delete_objects(job.payload['kind'], job.payload['ids'])
+    return ('deleted.json', 'application/json',
+            json.dumps(counts, ensure_ascii=False).encode())
+
+
+@task('similar_recipes')
+def similar_recipes_task(job):
+    lines = []
+    similarity.refresh(log=lines.append)
+    return ('similar_recipes.txt', 'text/plain; charset=utf-8',
+            '\n'.join(lines).encode())
+
+
+@task('similar_recipes_build')
+def similar_recipes_build_task(job):
+    lines = []
+    similarity.build(log=lines.append)
+    return ('similar_recipes.txt', 'text/plain; charset=utf-8',
+            '\n'.join(lines).encode())
+
+
+@task('feed_publish')
+def feed_publish_task(job):
+    feed.recipe_published(job.payload['recipe_id'])
+    return ('feed.txt', 'text/plain; charset=utf-8', b'')
+
+
+@task('feed_subscribe')
+def feed_subscribe_task(job):
+    feed.subscribed(job.payload['user_id'], job.payload['author_id'])
+    return ('feed.txt', 'text/plain; charset=utf-8', b'')
+
+
+@task('feed_followers_decreased')
+def feed_followers_decreased_task(job):
+    feed.followers_decreased(job.payload['author_id'])
+    return ('feed.txt', 'text/plain; charset=utf-8', b'')
+
+
+def delete_in_background(modeladmin, request, queryset):
+    """Действие админки: удалить выбранное пачками фоновой задачей."""
+    job = enqueue('bulk_delete', request.user, {
+        'kind': queryset.model._meta.model_name,
+        'ids': list(queryset.values_list('pk', flat=True)),
+    })
+    modeladmin.message_user(
+        request, f'Удаление поставлено в очередь, задача #{job.id}'
+    )
+
+
+delete_in_background.short_description = 'Удалить выбранные в фоне'
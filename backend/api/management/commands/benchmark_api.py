@@ -0,0 +1,115 @@
+from contextlib import nullcontext
+
+from api import benchmark
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import override_settings
+
+
+class Command(BaseCommand):
+    help = 'Замер латентности и числа запросов к БД на эндпоинтах API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Избранных рецептов на пользователя')
+        parser.add_argument('--cart', type=int, default=5,
+                            help='Рецептов в корзине на пользователя')
+        parser.add_argument('--subscriptions', type=int, default=10,
+                            help='Подписок на пользователя')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Запросов на сценарий')
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Параллельных запросов (только с --url)')
+        parser.add_argument('--scenario', action='append', dest='only',
+                            help='Запустить только указанные сценарии')
+        parser.add_argument('--existing-data', action='store_true',
+                            help='Не создавать тестовую БД, '
+                                 'использовать текущие данные')
+        parser.add_argument('--url',
+                            help='Адрес запущенного сервера, '
+                                 'требует --existing-data')
+        parser.add_argument('--accept-encoding',
+                            help='Заголовок Accept-Encoding запросов, '
+                                 'например "gzip" или "br"')
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--baseline',
+                            help='Отчёт, с которым сравнить результат')
+        parser.add_argument('--tolerance', type=float, default=20,
+                            help='Допустимый рост p95, в процентах')
+
+    def handle(self, *args, **options):
+        if options['url'] and not options['existing_data']:
+            raise CommandError('--url можно использовать только '
+                               'с --existing-data')
+        if options['concurrency'] > 1 and not options['url']:
+            raise CommandError('--concurrency требует --url')
+
+        old_name = None
+        if not options['existing_data']:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0,
+                                               autoclobber=True)
+            for alias in connections:
+                mirror = connections[alias].settings_dict['TEST']['MIRROR']
+                if mirror == DEFAULT_DB_ALIAS:
+                    connections[alias].creation.set_as_test_mirror(
+                        connection.settings_dict
+                    )
+        try:
+            if old_name is not None:
+                self.stdout.write(self.style.WARNING('Генерация данных'))
+                benchmark.seed(
+                    users=options['users'],
+                    recipes=options['recipes'],
+                    favorites=options['favorites'],
+                    cart=options['cart'],
+                    subscriptions=options['subscriptions'],
+                    seed=options['seed'],
+                )
+            accept_encoding = options['accept_encoding']
+            driver = (
+                benchmark.HTTPDriver(options['url'], accept_encoding)
+                if options['url']
+                else benchmark.ClientDriver(accept_encoding)
+            )
+            # Замер в процессе идёт от одного клиента, лимиты запросов
+            # его бы останавливали. Запущенный сервер ограничивает сам.
+            with (nullcontext() if options['url']
+                  else override_settings(THROTTLING={'RATES': {}})):
+                report = benchmark.run(
+                    driver,
+                    requests=options['requests'],
+                    warmup=options['warmup'],
+                    concurrency=options['concurrency'],
+                    only=options['only'],
+                    seed=options['seed'],
+                )
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for name, result in report['scenarios'].items():
+            self.stdout.write(
+                f'{name:<26} p50={result["p50_ms"]:>8} '
+                f'p95={result["p95_ms"]:>8} p99={result["p99_ms"]:>8} мс  '
+                f'запросов={result["queries_per_request"]}  '
+                f'байт={result["bytes_per_request"]}  '
+                f'rps={result["throughput_rps"]}'
+            )
+        benchmark.save_report(report, options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчёт сохранён в {options["output"]}'
+        ))
+
+        if options['baseline']:
+            regressions = benchmark.compare(
+                report, benchmark.load_report(options['baseline']),
+                options['tolerance']
+            )
+            if regressions:
+                raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий не найдено'))
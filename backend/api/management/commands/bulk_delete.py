@@ -0,0 +1,32 @@
+from api import deletion, jobs
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Удалить рецепты или пользователей со связанными данными пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(deletion.DELETERS))
+        parser.add_argument('ids', nargs='+', type=int)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--background', action='store_true',
+                            help='Поставить удаление в очередь '
+                                 'для run_worker')
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = jobs.enqueue('bulk_delete', payload={
+                'kind': options['kind'], 'ids': options['ids'],
+            })
+            self.stdout.write(self.style.SUCCESS(
+                f'Удаление поставлено в очередь, задача #{job.id}'
+            ))
+            return
+        self.stdout.write(self.style.WARNING('Старт команды'))
+        counts = deletion.delete_objects(
+            options['kind'], options['ids'],
+            batch_size=options['batch_size'], log=self.stdout.write,
+        )
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(self.style.SUCCESS('Удаление завершено'))
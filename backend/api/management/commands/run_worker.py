@@ -0,0 +1,61 @@
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from time import monotonic, sleep
+
+import django
+from api import jobs
+from django.core.management.base import BaseCommand
+
+# Как часто возвращать в очередь брошенные задачи, удалять старые
+# и ставить периодические.
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Обработчик фоновых задач из очереди в базе'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int,
+                            help='Сколько задач выполнять одновременно')
+        parser.add_argument('--once', action='store_true',
+                            help='Выполнить задачи из очереди и выйти')
+
+    def handle(self, *args, **options):
+        config = jobs.get_config()
+        processes = options['processes'] or config['PROCESSES']
+        self.stdout.write(self.style.WARNING(
+            f'Старт обработчика, процессов: {processes}'
+        ))
+        # Дочерние процессы запускаются заново, а не копируют родителя:
+        # так они не наследуют его соединения с базой.
+        with ProcessPoolExecutor(
+            processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        ) as executor:
+            running = {}
+            maintained = None
+            while True:
+                if maintained is None or (
+                    monotonic() - maintained > MAINTENANCE_INTERVAL
+                ):
+                    jobs.requeue_stale()
+                    jobs.prune()
+                    jobs.enqueue_scheduled()
+                    maintained = monotonic()
+                for job_id in jobs.claim(processes - len(running)):
+                    running[executor.submit(jobs.execute, job_id)] = job_id
+                if not running:
+                    if options['once']:
+                        break
+                    sleep(config['POLL_INTERVAL'])
+                    continue
+                done, _ = wait(running, timeout=config['POLL_INTERVAL'],
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    if future.exception() is not None:
+                        self.stderr.write(
+                            f'Задача {job_id}: {future.exception()}'
+                        )
+        self.stdout.write(self.style.SUCCESS('Обработчик остановлен'))
@@ -0,0 +1,180 @@
+import threading
+from collections import Counter, defaultdict
+from datetime import timedelta
+from time import monotonic
+
+from api.models import RecipeChange
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from recipe.models import IngredientAmount
+
+DEFAULT_RECIPE_MATCHING = {
+    # Не чаще чем раз в столько секунд читать журнал изменений.
+    'CHECK_INTERVAL': 5,
+    # Сколько секунд хранится журнал. Процесс, не обновлявший индекс
+    # дольше половины этого срока, перестраивает его целиком.
+    'RETENTION': 3600,
+}
+
+# Повторно читаются последние записи журнала: записи из параллельных
+# транзакций могут стать видны не в порядке id.
+CHANGES_OVERLAP = 100
+
+
+def get_config():
+    return {**DEFAULT_RECIPE_MATCHING,
+            **getattr(settings, 'RECIPE_MATCHING', {})}
+
+
+class IngredientIndex:
+    """
+    Инвертированный индекс ингредиент -> рецепты в памяти процесса.
+
+    Подбор рецептов по набору ингредиентов - это подсчёт совпадений
+    по спискам рецептов каждого ингредиента, без JOIN в базе.
+    Изменённые рецепты перечитываются по журналу ``RecipeChange``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recipes = None
+        self._postings = {}
+        self._last_change = 0
+        self._seen_changes = frozenset()
+        self._synced = None
+        self._checked = None
+        self._pruned = None
+
+    def rebuild(self):
+        """Строит индекс заново по всем ингредиентам рецептов."""
+        # Позицию в журнале берём до чтения данных: изменения между
+        # двумя запросами будут применены повторно, а не потеряны.
+        # Видимые сейчас записи учтены перестройкой, в том числе
+        # запросы перестройки, и при следующей синхронизации
+        # пропускаются. Записи, которые станут видны позже, применятся.
+        seen = list(RecipeChange.objects.order_by('-id').values_list(
+            'id', flat=True
+        )[:CHANGES_OVERLAP])
+        last = seen[0] if seen else 0
+        recipes = defaultdict(set)
+        for recipe_id, ingredient_id in IngredientAmount.objects.order_by(
+        ).values_list('recipe_id', 'ingredient_id').iterator():
+            recipes[recipe_id].add(ingredient_id)
+        postings = defaultdict(set)
+        for recipe_id, ingredient_ids in recipes.items():
+            for ingredient_id in ingredient_ids:
+                postings[ingredient_id].add(recipe_id)
+        self._recipes = {recipe_id: frozenset(ingredient_ids)
+                         for recipe_id, ingredient_ids in recipes.items()}
+        self._postings = dict(postings)
+        self._last_change = last
+        self._seen_changes = frozenset(seen)
+
+    def apply(self, recipe_ids):
+        """Перечитывает состав указанных рецептов."""
+        recipes = defaultdict(set)
+        for recipe_id, ingredient_id in IngredientAmount.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by().values_list('recipe_id', 'ingredient_id'):
+            recipes[recipe_id].add(ingredient_id)
+        for recipe_id in recipe_ids:
+            for ingredient_id in self._recipes.pop(recipe_id, ()):
+                self._postings[ingredient_id].discard(recipe_id)
+            if recipes[recipe_id]:
+                self._recipes[recipe_id] = frozenset(recipes[recipe_id])
+                for ingredient_id in recipes[recipe_id]:
+                    self._postings.setdefault(
+                        ingredient_id, set()
+                    ).add(recipe_id)
+
+    def sync(self):
+        """Догоняет журнал изменений, если пора его проверить."""
+        config = get_config()
+        now = monotonic()
+        if (self._checked is not None
+                and now - self._checked < config['CHECK_INTERVAL']):
+            return
+        if (self._recipes is None
+                or now - self._synced > config['RETENTION'] / 2):
+            self.rebuild()
+            self._synced = self._checked = monotonic()
+            return
+        changes = [
+            change for change in RecipeChange.objects.filter(
+                id__gt=self._last_change - CHANGES_OVERLAP
+            ).order_by('id').values_list('id', 'recipe_id')
+            if change[0] not in self._seen_changes
+        ]
+        if any(recipe_id is None for _, recipe_id in changes):
+            self.rebuild()
+        elif changes:
+            if (self._pruned is None
+                    or now - self._pruned > config['RETENTION'] / 2):
+                prune_changes()
+                self._pruned = now
+            self.apply({recipe_id for _, recipe_id in changes})
+            self._last_change = max(self._last_change, changes[-1][0])
+            self._seen_changes = frozenset(
+                change_id for change_id in self._seen_changes | {
+                    change_id for change_id, _ in changes
+                }
+                if change_id > self._last_change - CHANGES_OVERLAP
+            )
+        self._synced = self._checked = monotonic()
+
+    def invalidate(self):
+        """Прочитать журнал при следующем запросе."""
+        self._checked = None
+
+    def match(self, ingredient_ids, max_missing=None):
+        """
+        Рецепты, в которых есть хотя бы один из ингредиентов, в виде
+        ``(id рецепта, совпало, всего ингредиентов)``. Сначала рецепты,
+        для которых не хватает меньше ингредиентов.
+        """
+        with self._lock:
+            self.sync()
+            matched = Counter()
+            for ingredient_id in set(ingredient_ids):
+                matched.update(self._postings.get(ingredient_id, ()))
+            results = [
+                (recipe_id, count, len(self._recipes[recipe_id]))
+                for recipe_id, count in matched.items()
+            ]
+        if max_missing is not None:
+            results = [result for result in results
+                       if result[2] - result[1] <= max_missing]
+        results.sort(key=lambda result: (
+            result[2] - result[1], -result[1] / result[2], -result[0]
+        ))
+        return results
+
+
+index = IngredientIndex()
+
+
+def log_changes(recipe_ids):
+    RecipeChange.objects.bulk_create(
+        [RecipeChange(recipe_id=recipe_id) for recipe_id in recipe_ids]
+    )
+    index.invalidate()
+
+
+def recipe_changed(recipe_id):
+    """Записывает изменение рецепта в журнал после фиксации транзакции."""
+    transaction.on_commit(lambda: log_changes([recipe_id]))
+
+
+def request_rebuild():
+    """Все процессы перестроят индекс, например после массовой загрузки."""
+    log_changes([None])
+
+
+def prune_changes():
+    """Удаляет записи журнала старше ``RETENTION``."""
+    return RecipeChange.objects.filter(
+        created__lt=timezone.now() - timedelta(
+            seconds=get_config()['RETENTION']
+        )
+    ).delete()[0]
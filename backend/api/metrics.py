@@ -0,0 +1,191 @@
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REQUEST_METRICS = {
+    'ENABLED': True,
+    'QUERY_BUDGETS': {},
+    'STRICT_BUDGETS': False,
+}
+
+BUCKETS = {
+    'duration_ms': (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    'db_ms': (1, 5, 10, 25, 50, 100, 250, 500, 1000),
+    'serialize_ms': (1, 5, 10, 25, 50, 100, 250, 500),
+    'queries': (1, 2, 3, 5, 10, 20, 50, 100),
+    'size_bytes': (1000, 10000, 100000, 1000000, 10000000),
+}
+
+
+def get_config():
+    return {**DEFAULT_REQUEST_METRICS,
+            **getattr(settings, 'REQUEST_METRICS', {})}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Эндпоинт выполнил больше запросов к БД, чем разрешено бюджетом."""
+
+
+class RequestMetrics:
+    """Метрики одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+
+
+current_metrics = ContextVar('request_metrics', default=None)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """
+    Обёртка выполнения запросов, которая ставится на каждое подключение.
+    Метрики берутся из контекста, поэтому учитываются и запросы из
+    потоков, в которых асинхронные представления обращаются к БД.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += perf_counter() - start
+
+
+def install_execute_wrapper(connection, **kwargs):
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        index = len(self.bounds)
+        for position, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = position
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        buckets = [str(bound) for bound in self.bounds] + ['+Inf']
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'buckets': dict(zip(buckets, self.counts)),
+        }
+
+
+class MetricsRegistry:
+    """Гистограммы метрик, агрегированные по имени представления."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(
+            lambda: {name: Histogram(bounds)
+                     for name, bounds in BUCKETS.items()}
+        )
+
+    def record(self, view_name, **values):
+        with self._lock:
+            histograms = self._views[view_name]
+            for name, value in values.items():
+                histograms[name].observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view_name: {name: histogram.snapshot()
+                            for name, histogram in histograms.items()}
+                for view_name, histograms in self._views.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = MetricsRegistry()
+
+
+def get_request_metrics(request):
+    request = getattr(request, '_request', request)
+    return getattr(request, 'metrics', None)
+
+
+@contextmanager
+def measure_serialization(request):
+    """Учитывает время блока как сериализацию, без времени запросов к БД."""
+    metrics = get_request_metrics(request)
+    if metrics is None:
+        yield
+        return
+    start = perf_counter()
+    db_time = metrics.db_time
+    try:
+        yield
+    finally:
+        metrics.serialize_time += (
+            perf_counter() - start - (metrics.db_time - db_time)
+        )
+
+
+def serialization(func):
+    """Декоратор функций представления, принимающих запрос вторым."""
+    @wraps(func)
+    def wrapper(rows, request, *args, **kwargs):
+        with measure_serialization(request):
+            return func(rows, request, *args, **kwargs)
+    return wrapper
+
+
+def get_query_budget(budgets, method, view_name):
+    """
+    Бюджет по ключу ``'POST api:recipe-list'``, а для чтения - и просто
+    по имени представления: записи не меряются бюджетами чтения.
+    """
+    budget = budgets.get(f'{method} {view_name}')
+    if budget is None and method in SAFE_METHODS:
+        budget = budgets.get(view_name)
+    return budget
+
+
+def check_query_budget(view_name, queries, method='GET'):
+    config = get_config()
+    budget = get_query_budget(config['QUERY_BUDGETS'], method, view_name)
+    if budget is None or queries <= budget:
+        return
+    message = (f'{method} {view_name}: выполнено {queries} запросов к БД '
+               f'при бюджете {budget}')
+    if config['STRICT_BUDGETS']:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+def metrics_view(request):
+    """Агрегированные метрики; доступны только с локальных адресов."""
+    allowed = {'127.0.0.1', '::1', *getattr(settings, 'INTERNAL_IPS', ())}
+    if request.META.get('REMOTE_ADDR') not in allowed:
+        raise Http404
+    return JsonResponse(registry.snapshot(),
+                        json_dumps_params={'ensure_ascii': False})
@@ -0,0 +1,205 @@
+import asyncio
+from time import perf_counter
+
+from api import compression, profiling
+from api.metrics import (RequestMetrics, check_query_budget, current_metrics,
+                         get_config, registry)
+from api.routers import choose_replica, current_replica, pin_to_primary
+from django.utils.cache import patch_vary_headers
+from rest_framework.permissions import SAFE_METHODS
+
+
+class RequestMetricsMiddleware:
+    """
+    Считает запросы к БД, время БД, сериализации и ответа по каждому
+    представлению. Результат отдаётся в заголовке Server-Timing и
+    накапливается в гистограммах ``api.metrics.registry``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not get_config()['ENABLED']:
+            return self.get_response(request)
+        metrics, token, start = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        if not get_config()['ENABLED']:
+            return await self.get_response(request)
+        metrics, token, start = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, start)
+
+    def start(self, request):
+        metrics = RequestMetrics()
+        request.metrics = metrics
+        return metrics, current_metrics.set(metrics), perf_counter()
+
+    def finish(self, request, response, metrics, start):
+        duration = perf_counter() - start
+        view_name = (request.resolver_match.view_name
+                     if request.resolver_match else 'unresolved')
+        size = 0 if response.streaming else len(response.content)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.db_time * 1000:.2f};'
+            f'desc="{metrics.queries} queries"',
+            f'serialize;dur={metrics.serialize_time * 1000:.2f}',
+            f'total;dur={duration * 1000:.2f}',
+        ))
+        registry.record(
+            view_name,
+            duration_ms=duration * 1000,
+            db_ms=metrics.db_time * 1000,
+            serialize_ms=metrics.serialize_time * 1000,
+            queries=metrics.queries,
+            size_bytes=size,
+        )
+        check_query_budget(view_name, metrics.queries, request.method)
+        return response
+
+    def process_template_response(self, request, response):
+        """Время рендеринга ответа DRF тоже относится к сериализации."""
+        metrics = getattr(request, 'metrics', None)
+        if metrics is not None:
+            start = perf_counter()
+
+            def rendered(response):
+                metrics.serialize_time += perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Выбирает реплику для чтения на время безопасного запроса (см.
+    ``api.routers.ReplicaRouter``). После успешной записи клиент
+    закрепляется за основной БД на ``READ_REPLICAS['PIN_SECONDS']``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = current_replica.set(choose_replica(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            current_replica.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        token = current_replica.set(choose_replica(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_replica.reset(token)
+        return self.finish(request, response)
+
+    def finish(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request)
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Сжимает текстовые ответы gzip или brotli, если клиент их принимает
+    и ответ больше ``COMPRESSION['MIN_SIZE']``. Потоковые ответы (PDF)
+    и уже сжатые типы не трогает.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.finish(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.finish(request, await self.get_response(request))
+
+    def finish(self, request, response):
+        config = compression.get_config()
+        if not config['ENABLED'] or not compression.is_compressible(
+            response, config
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding', ))
+        encoding = compression.choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING')
+        )
+        if encoding is None:
+            return response
+        content = compression.compress(response.content, encoding, config)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        # Сжатое представление побайтно отличается от исходного.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование отдельного запроса по просьбе сотрудника: заголовок
+    ``X-Profile`` или параметр ``?profile=`` (``cprofile`` или
+    ``sample``). Запросы без них проходят без изменений. Асинхронные
+    представления не профилируются: cProfile и сэмплер следят за одним
+    потоком, а не за задачей цикла событий.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.get_response(request)
+        config = profiling.get_config()
+        if not config['ENABLED']:
+            return self.get_response(request)
+        mode = profiling.requested_mode(request, config)
+        if mode is None:
+            return self.get_response(request)
+        user = profiling.get_staff_user(request)
+        if user is None:
+            return self.get_response(request)
+        return profiling.profile(request, self.get_response, mode, user)
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='Ресурс')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Версия')),
+                ('updated', models.DateTimeField(verbose_name='Время изменения')),
+            ],
+            options={
+                'verbose_name': 'Версия ресурса',
+                'verbose_name_plural': 'Версии ресурсов',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(help_text='Пусто - перестроить индекс целиком', null=True, verbose_name='Рецепт')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Время изменения')),
+            ],
+            options={
+                'verbose_name': 'Изменение рецепта',
+                'verbose_name_plural': 'Изменения рецептов',
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0002_recipechange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=64, verbose_name='Тип задачи')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=16, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попытки')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('result', models.BinaryField(null=True, verbose_name='Результат')),
+                ('result_name', models.CharField(blank=True, max_length=255, verbose_name='Имя файла результата')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='Тип результата')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Время создания')),
+                ('started', models.DateTimeField(null=True, verbose_name='Время запуска')),
+                ('finished', models.DateTimeField(null=True, verbose_name='Время завершения')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'id'], name='job_status_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0003_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('path', models.TextField(verbose_name='Адрес')),
+                ('mode', models.CharField(choices=[('cprofile', 'cProfile'), ('sample', 'Сэмплирование')], max_length=16, verbose_name='Профилировщик')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Код ответа')),
+                ('duration_ms', models.FloatField(verbose_name='Длительность, мс')),
+                ('queries', models.PositiveIntegerField(verbose_name='Запросов к БД')),
+                ('report', models.TextField(verbose_name='Отчёт')),
+                ('data', models.BinaryField(verbose_name='Данные профиля')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Время создания')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='profile_reports', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,203 @@
+from django.conf import settings
+from django.db import models
+
+
+class ResourceVersion(models.Model):
+    """
+    Счётчик версий ресурса API. Увеличивается при любом изменении
+    данных ресурса и служит валидатором для условных запросов.
+    """
+
+    name = models.CharField(
+        max_length=64,
+        primary_key=True,
+        verbose_name='Ресурс'
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Версия'
+    )
+    updated = models.DateTimeField(
+        verbose_name='Время изменения'
+    )
+
+    class Meta:
+        verbose_name = 'Версия ресурса'
+        verbose_name_plural = 'Версии ресурсов'
+
+    def __str__(self):
+        return f'{self.name}: {self.version}'
+
+
+class RecipeChange(models.Model):
+    """
+    Журнал изменений состава рецептов. По нему процессы обновляют
+    индекс ``api.matching`` по частям, а не перестраивают целиком.
+    """
+
+    recipe_id = models.BigIntegerField(
+        null=True,
+        verbose_name='Рецепт',
+        help_text='Пусто - перестроить индекс целиком'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Время изменения'
+    )
+
+    class Meta:
+        verbose_name = 'Изменение рецепта'
+        verbose_name_plural = 'Изменения рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.created}'
+
+
+class Job(models.Model):
+    """
+    Фоновая задача. Очередь - сама таблица: процесс ``run_worker``
+    забирает задачи в статусе ``pending`` и сохраняет результат здесь же,
+    поэтому внешний брокер не нужен.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='jobs',
+        verbose_name='Пользователь'
+    )
+    kind = models.CharField(
+        max_length=64,
+        verbose_name='Тип задачи'
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Параметры'
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попытки'
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка'
+    )
+    result = models.BinaryField(
+        null=True,
+        verbose_name='Результат'
+    )
+    result_name = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name='Имя файла результата'
+    )
+    content_type = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Тип результата'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Время создания'
+    )
+    started = models.DateTimeField(
+        null=True,
+        verbose_name='Время запуска'
+    )
+    finished = models.DateTimeField(
+        null=True,
+        verbose_name='Время завершения'
+    )
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(fields=['status', 'id'], name='job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} #{self.id}: {self.status}'
+
+
+class ProfileReport(models.Model):
+    """
+    Профиль одного запроса, снятый по просьбе сотрудника
+    (``api.middleware.ProfilingMiddleware``): отчёт профилировщика,
+    запросы к БД с планами выполнения и исходные данные профиля.
+    """
+
+    CPROFILE = 'cprofile'
+    SAMPLE = 'sample'
+    MODE_CHOICES = (
+        (CPROFILE, 'cProfile'),
+        (SAMPLE, 'Сэмплирование'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='profile_reports',
+        verbose_name='Пользователь'
+    )
+    method = models.CharField(
+        max_length=10,
+        verbose_name='Метод'
+    )
+    path = models.TextField(
+        verbose_name='Адрес'
+    )
+    mode = models.CharField(
+        max_length=16,
+        choices=MODE_CHOICES,
+        verbose_name='Профилировщик'
+    )
+    status_code = models.PositiveSmallIntegerField(
+        verbose_name='Код ответа'
+    )
+    duration_ms = models.FloatField(
+        verbose_name='Длительность, мс'
+    )
+    queries = models.PositiveIntegerField(
+        verbose_name='Запросов к БД'
+    )
+    report = models.TextField(
+        verbose_name='Отчёт'
+    )
+    data = models.BinaryField(
+        verbose_name='Данные профиля'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Время создания'
+    )
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+
+    def __str__(self):
+        return f'{self.method} {self.path} #{self.id}'
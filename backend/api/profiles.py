@@ -0,0 +1,95 @@
+from api import versions
+from api.caches import LRUCache
+from api.representations import USER_FIELDS
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from users.models import Subscriptions
+
+User = get_user_model()
+
+DEFAULT_PROFILE_CACHE = {
+    'MAX_SIZE': 10000,
+    'TIMEOUT': 30,
+    'CACHE': None,
+}
+
+
+def get_config():
+    return {**DEFAULT_PROFILE_CACHE,
+            **getattr(settings, 'PROFILE_CACHE', {})}
+
+
+_local = LRUCache(**{
+    option.lower(): value for option, value in get_config().items()
+    if option != 'CACHE'
+})
+
+
+def shared_cache():
+    alias = get_config()['CACHE']
+    if alias:
+        return caches[alias]
+    return None
+
+
+def cached(key, load):
+    """
+    Значение из LRU-кэша процесса, общего кэша (если задан
+    в ``PROFILE_CACHE['CACHE']``) или из базы через ``load``.
+    """
+    value = _local.get(key)
+    if value is not None:
+        return value
+    cache = shared_cache()
+    if cache is not None:
+        value = cache.get(key)
+    if value is None:
+        value = load()
+        if value is None:
+            return None
+        if cache is not None:
+            cache.set(key, value, get_config()['TIMEOUT'])
+    _local.set(key, value)
+    return value
+
+
+def profile_key(user_id, version):
+    return f'profile:{user_id}:{version}'
+
+
+def subscriptions_key(user_id, version):
+    return f'profile:{user_id}:subscriptions:{version}'
+
+
+def get_profile(user_id, viewer_id=None):
+    """
+    Поля профиля в формате ``.values()`` (или ``None``) и авторы,
+    на которых подписан ``viewer_id``.
+
+    Ключи кэша содержат версии ресурсов из ``ResourceVersion``: запись
+    в любом процессе меняет версию в базе, и все процессы сразу читают
+    новые данные. Версии читаются одним запросом.
+    """
+    profile = versions.profile_resource(user_id)
+    relations = versions.user_resource(viewer_id)
+    current = versions.get_versions(
+        [profile] if viewer_id is None else [profile, relations]
+    )
+    row = cached(
+        profile_key(user_id, current[profile][0]),
+        lambda: User.objects.filter(id=user_id).values(*USER_FIELDS).first()
+    )
+    if viewer_id is None:
+        return row, frozenset()
+    return row, cached(
+        subscriptions_key(viewer_id, current[relations][0]),
+        lambda: frozenset(Subscriptions.objects.filter(
+            user_id=viewer_id
+        ).values_list('author_id', flat=True))
+    )
+
+
+def invalidate_profile(user_id):
+    """Все процессы перечитают профиль при следующем обращении."""
+    versions.bump(versions.profile_resource(user_id))
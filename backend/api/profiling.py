@@ -0,0 +1,276 @@
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import ExitStack
+from datetime import timedelta
+from time import perf_counter
+
+from api.authentication import CachedTokenAuthentication
+from api.metrics import current_metrics
+from api.models import ProfileReport
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+
+DEFAULT_PROFILING = {
+    'ENABLED': True,
+    # Профиль снимается по заголовку X-Profile или параметру ?profile=
+    # со значением cprofile (по умолчанию) или sample.
+    'HEADER': 'HTTP_X_PROFILE',
+    'PARAM': 'profile',
+    # Период сэмплирования, секунды.
+    'SAMPLE_INTERVAL': 0.005,
+    # Сортировка и число строк отчёта.
+    'SORT': 'cumulative',
+    'LIMIT': 50,
+    # Для скольких запросов к БД снимать план выполнения.
+    'EXPLAIN_LIMIT': 50,
+    # Сколько секунд хранить отчёты.
+    'RETENTION': 7 * 86400,
+}
+
+# Команды, для которых есть план выполнения; BEGIN, SAVEPOINT и
+# подобные пропускаются.
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+MODES = {
+    '1': ProfileReport.CPROFILE,
+    ProfileReport.CPROFILE: ProfileReport.CPROFILE,
+    ProfileReport.SAMPLE: ProfileReport.SAMPLE,
+}
+
+
+def get_config():
+    return {**DEFAULT_PROFILING, **getattr(settings, 'PROFILING', {})}
+
+
+def requested_mode(request, config):
+    """Режим профилирования, о котором просит запрос, или ``None``."""
+    value = (request.META.get(config['HEADER'])
+             or request.GET.get(config['PARAM']))
+    if not value:
+        return None
+    return MODES.get(value.lower())
+
+
+def get_staff_user(request):
+    """
+    Сотрудник, отправивший запрос, или ``None``. Промежуточный слой
+    работает до аутентификации DRF, поэтому токен проверяется здесь.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        try:
+            result = CachedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        user = result[0] if result else None
+    if user is not None and user.is_staff:
+        return user
+    return None
+
+
+class QueryCapture:
+    """Запоминает запросы к БД и подключения, на которых они выполнены."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((
+                context['connection'].alias, sql, params, many,
+                perf_counter() - start,
+            ))
+
+    def capture(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+
+def explain(alias, sql, params):
+    """
+    План выполнения запроса. ``EXPLAIN ANALYZE`` снова выполняет
+    запрос, поэтому на PostgreSQL он используется только для SELECT.
+    """
+    connection = connections[alias]
+    options = {}
+    if (connection.vendor == 'postgresql'
+            and sql.lstrip().upper().startswith('SELECT')):
+        options = {'analyze': True, 'buffers': True}
+    prefix = connection.ops.explain_query_prefix(**options)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return '\n'.join(
+                ' '.join(str(column) for column in row)
+                for row in cursor.fetchall()
+            )
+    except DatabaseError as error:
+        return f'EXPLAIN не выполнен: {error}'
+
+
+def explain_queries(queries, limit):
+    lines = []
+    plans = {}
+    for number, (alias, sql, params, many, duration) in enumerate(
+        queries, 1
+    ):
+        lines.append(f'#{number} [{alias}] {duration * 1000:.2f} мс')
+        lines.append(sql)
+        if params:
+            lines.append(f'params: {params!r}')
+        key = (alias, sql, repr(params))
+        if not sql.lstrip().upper().startswith(EXPLAINABLE):
+            plan = ''
+        elif many:
+            plan = 'executemany: план не снимается'
+        elif key in plans:
+            plan = f'тот же план, что у #{plans[key]}'
+        elif len(plans) >= limit:
+            plan = f'план не снят: больше {limit} запросов'
+        else:
+            plans[key] = number
+            plan = explain(alias, sql, params)
+        if plan:
+            lines.append(plan)
+        lines.append('')
+    return lines
+
+
+class Sampler:
+    """
+    Сэмплирующий профилировщик: фоновый поток раз в ``interval`` секунд
+    снимает стек потока запроса. Накладные расходы не зависят от числа
+    вызовов функций, в отличие от cProfile.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, daemon=True)
+
+    def enable(self):
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        self._thread.join()
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{code.co_name} ({code.co_filename}:'
+                    f'{code.co_firstlineno})'
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def report(self, limit):
+        total = sum(self.stacks.values())
+        inclusive = Counter()
+        own = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        lines = [f'Сэмплов: {total}, период {self.interval * 1000:g} мс',
+                 '', 'всего  своих  функция']
+        for frame, count in inclusive.most_common(limit):
+            lines.append(f'{count:>5}  {own[frame]:>5}  {frame}')
+        return lines
+
+    def data(self):
+        """Стеки в свёрнутом формате flamegraph.pl и speedscope."""
+        return '\n'.join(
+            f'{stack} {count}' for stack, count in self.stacks.items()
+        ).encode()
+
+
+def profiler_report(profiler, config):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats(config['SORT']).print_stats(config['LIMIT'])
+    return stream.getvalue().splitlines()
+
+
+def profile(request, get_response, mode, user):
+    """
+    Выполняет запрос под профилировщиком и сохраняет отчёт. Ссылка
+    на отчёт отдаётся в заголовке ``X-Profile-Report``.
+    """
+    config = get_config()
+    if mode == ProfileReport.SAMPLE:
+        profiler = Sampler(config['SAMPLE_INTERVAL'])
+    else:
+        profiler = cProfile.Profile()
+    capture = QueryCapture()
+    start = perf_counter()
+    with capture.capture():
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+    duration = perf_counter() - start
+
+    # Запросы отчёта не относятся к профилируемому запросу.
+    token = current_metrics.set(None)
+    try:
+        if mode == ProfileReport.SAMPLE:
+            lines = profiler.report(config['LIMIT'])
+            data = profiler.data()
+        else:
+            # pstats.Stats забирает статистику у профилировщика.
+            profiler.create_stats()
+            data = marshal.dumps(profiler.stats)
+            lines = profiler_report(profiler, config)
+        report = '\n'.join([
+            f'{request.method} {request.get_full_path()} '
+            f'-> {response.status_code}',
+            f'Время: {duration * 1000:.2f} мс, '
+            f'запросов к БД: {len(capture.queries)}',
+            '', *lines, '', 'Запросы к БД', '',
+            *explain_queries(capture.queries, config['EXPLAIN_LIMIT']),
+        ])
+        saved = ProfileReport.objects.create(
+            user=user,
+            method=request.method,
+            path=request.get_full_path(),
+            mode=mode,
+            status_code=response.status_code,
+            duration_ms=round(duration * 1000, 3),
+            queries=len(capture.queries),
+            report=report,
+            data=data,
+        )
+        ProfileReport.objects.filter(
+            created__lt=timezone.now() - timedelta(
+                seconds=config['RETENTION']
+            )
+        ).delete()
+    finally:
+        current_metrics.reset(token)
+    response['X-Profile-Report'] = request.build_absolute_uri(
+        reverse('api:profile-report', args=[saved.id])
+    )
+    return response
@@ -0,0 +1,137 @@
+import threading
+from time import monotonic
+
+from api import versions
+from api.representations import INGREDIENT_FIELDS, TAG_FIELDS
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import DEFERRED
+from recipe.models import Ingredient, Tag
+
+DEFAULT_REFERENCE_CACHE = {
+    # Не чаще чем раз в столько секунд сверять версию с базой.
+    'CHECK_INTERVAL': 5,
+}
+
+
+def get_config():
+    return {**DEFAULT_REFERENCE_CACHE,
+            **getattr(settings, 'REFERENCE_CACHE', {})}
+
+
+class ReferenceCache:
+    """
+    Справочные данные в памяти процесса.
+
+    Данные перечитываются, когда меняется версия ресурса в
+    ``ResourceVersion``; версия сверяется не чаще раза в
+    ``CHECK_INTERVAL`` секунд, так что между проверками обращений к БД нет.
+    """
+
+    def __init__(self, resource, loader):
+        self.resource = resource
+        self.loader = loader
+        # (данные, версия, время изменения) меняются одним присваиванием.
+        self._state = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        # Кэш общий для процесса: DRF копирует поля вместе с аргументами.
+        return self
+
+    def is_fresh(self):
+        return (self._checked is not None
+                and monotonic() - self._checked
+                < get_config()['CHECK_INTERVAL'])
+
+    def state(self):
+        if self.is_fresh():
+            return self._state
+        with self._lock:
+            if not self.is_fresh():
+                # Версию читаем до данных: изменение между двумя запросами
+                # приведёт к лишней перезагрузке, но не к устаревшим данным.
+                version, updated = versions.get_versions(
+                    [self.resource]
+                )[self.resource]
+                if self._state is None or version != self._state[1]:
+                    self._state = (self.loader(), version, updated)
+                self._checked = monotonic()
+            return self._state
+
+    def get(self):
+        return self.state()[0]
+
+    def version(self):
+        """Версия и время изменения закэшированных данных."""
+        return self.state()[1:]
+
+    def invalidate(self):
+        """Проверить версию при следующем обращении."""
+        self._checked = None
+
+
+def load_tags():
+    rows = tuple(Tag.objects.values(*TAG_FIELDS))
+    return {
+        'rows': rows,
+        'by_id': {row['id']: row for row in rows},
+        'by_slug': {row['slug']: row for row in rows},
+    }
+
+
+def load_ingredients():
+    rows = tuple(Ingredient.objects.values(*INGREDIENT_FIELDS))
+    return {
+        'rows': rows,
+        'by_id': {row['id']: row for row in rows},
+        'names': tuple(row['name'].lower() for row in rows),
+    }
+
+
+tags = ReferenceCache(versions.TAGS, load_tags)
+ingredients = ReferenceCache(versions.INGREDIENTS, load_ingredients)
+
+REFERENCE_CACHES = {cache.resource: cache for cache in (tags, ingredients)}
+
+
+def get_versions(names):
+    """То же, что ``versions.get_versions``, но из кэша процесса."""
+    return {name: REFERENCE_CACHES[name].version() for name in names}
+
+
+def search_ingredients(name=None):
+    """
+    Ингредиенты, название которых начинается с ``name`` без учёта
+    регистра, как в ``IngredientFilter``.
+    """
+    data = ingredients.get()
+    if not name:
+        return data['rows']
+    prefix = name.lower()
+    return [row for row, lowered in zip(data['rows'], data['names'])
+            if lowered.startswith(prefix)]
+
+
+def get_row(cache, pk):
+    """Строка справочника по первичному ключу или None."""
+    try:
+        return cache.get()['by_id'].get(int(pk))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_instance(cache, model, pk):
+    """
+    Объект модели из кэша без обращения к БД или None.
+
+    Объект загружен только полями справочника, остальные отложены.
+    ``from_db`` принимает значения в порядке полей модели, а не строки.
+    """
+    row = get_row(cache, pk)
+    if row is None:
+        return None
+    names = [field.attname for field in model._meta.concrete_fields]
+    return model.from_db(DEFAULT_DB_ALIAS, names,
+                         [row.get(name, DEFERRED) for name in names])
@@ -0,0 +1,51 @@
+from django.utils.functional import cached_property
+from recipe.models import Favorite, ShoppingCart
+from users.models import Subscriptions
+
+
+class UserRelations:
+    """
+    Подписки, избранное и корзина текущего пользователя.
+
+    Каждое множество загружается одним запросом при первом обращении.
+    Для анонимного пользователя запросы не выполняются.
+    """
+
+    def __init__(self, user):
+        self.user = user if user.is_authenticated else None
+
+    def _ids(self, queryset, field):
+        if self.user is None:
+            return frozenset()
+        return frozenset(queryset.values_list(field, flat=True))
+
+    @cached_property
+    def subscribed_author_ids(self):
+        return self._ids(
+            Subscriptions.objects.filter(user=self.user), 'author_id'
+        )
+
+    @cached_property
+    def favorite_recipe_ids(self):
+        return self._ids(
+            Favorite.objects.filter(user=self.user), 'recipe_id'
+        )
+
+    @cached_property
+    def cart_recipe_ids(self):
+        return self._ids(
+            ShoppingCart.objects.filter(user=self.user), 'recipe_id'
+        )
+
+
+def get_relations(request):
+    """Отношения пользователя, общие для всего запроса."""
+    user = request.user
+    storage = getattr(request, '_request', request)
+    relations = getattr(storage, 'user_relations', None)
+    if relations is None or relations.user != (
+        user if user.is_authenticated else None
+    ):
+        relations = UserRelations(user)
+        storage.user_relations = relations
+    return relations
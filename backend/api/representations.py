@@ -0,0 +1,254 @@
+from collections import defaultdict
+
+from api.metrics import measure_serialization, serialization
+from api.relations import get_relations
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Count, Exists, OuterRef, Subquery, Value
+from django.db.models.functions import JSONObject
+from recipe.models import Favorite, IngredientAmount, Recipe, ShoppingCart
+from users.models import Subscriptions
+
+User = get_user_model()
+
+TAG_FIELDS = ('id', 'color', 'name', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+USER_FIELDS = ('id', 'email', 'username', 'first_name', 'last_name')
+RECIPE_FIELDS = ('id', 'author_id', 'name', 'image', 'text', 'cooking_time')
+RECIPE_SHORT_FIELDS = ('id', 'name', 'image', 'cooking_time')
+INGREDIENT_AMOUNT_FIELDS = ('id', 'name', 'measurement_unit', 'amount')
+
+
+def instance_row(instance, fields):
+    """Строка в формате ``.values()`` для уже загруженного объекта."""
+    return {field: getattr(instance, field) for field in fields}
+
+
+def image_url(image, request=None):
+    """Ссылка на изображение так же, как её строит Base64ImageField."""
+    name = getattr(image, 'name', image)
+    if not name:
+        return None
+    url = Recipe._meta.get_field('image').storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def tag_representation(row):
+    return {field: row[field] for field in TAG_FIELDS}
+
+
+def ingredient_representation(row):
+    return {field: row[field] for field in INGREDIENT_FIELDS}
+
+
+def user_representation(row, subscribed_ids):
+    data = {field: row[field] for field in USER_FIELDS}
+    data['is_subscribed'] = row['id'] in subscribed_ids
+    return data
+
+
+def recipe_short_representation(row, request=None):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'image': image_url(row['image'], request),
+        'cooking_time': row['cooking_time'],
+    }
+
+
+@serialization
+def recipe_representations(rows, request):
+    """Список рецептов в формате RecipeReadSerializer."""
+    rows = list(rows)
+    if not rows:
+        return []
+    recipe_ids = [row['id'] for row in rows]
+    author_ids = {row['author_id'] for row in rows}
+
+    authors = {
+        author['id']: author
+        for author in User.objects.filter(
+            id__in=author_ids
+        ).values(*USER_FIELDS)
+    }
+    relations = get_relations(request)
+
+    tags = defaultdict(list)
+    for row in Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('-tag_id').values(
+        'recipe_id', 'tag__id', 'tag__color', 'tag__name', 'tag__slug'
+    ):
+        tags[row['recipe_id']].append({
+            'id': row['tag__id'],
+            'color': row['tag__color'],
+            'name': row['tag__name'],
+            'slug': row['tag__slug'],
+        })
+
+    ingredients = defaultdict(list)
+    for row in IngredientAmount.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values(
+        'recipe_id', 'ingredient_id', 'ingredient__name',
+        'ingredient__measurement_unit', 'amount'
+    ):
+        ingredients[row['recipe_id']].append({
+            'id': row['ingredient_id'],
+            'name': row['ingredient__name'],
+            'measurement_unit': row['ingredient__measurement_unit'],
+            'amount': row['amount'],
+        })
+
+    return [
+        recipe_representation(
+            row, tags[row['id']], ingredients[row['id']],
+            author=user_representation(
+                authors[row['author_id']], relations.subscribed_author_ids
+            ),
+            is_favorited=row['id'] in relations.favorite_recipe_ids,
+            is_in_shopping_cart=row['id'] in relations.cart_recipe_ids,
+            request=request,
+        )
+        for row in rows
+    ]
+
+
+def recipe_representation(row, tags, ingredients, author, is_favorited,
+                          is_in_shopping_cart, request):
+    """Рецепт в формате RecipeReadSerializer из уже выбранных частей."""
+    return {
+        'id': row['id'],
+        'tags': tags,
+        'author': author,
+        'ingredients': ingredients,
+        'is_favorited': is_favorited,
+        'is_in_shopping_cart': is_in_shopping_cart,
+        'name': row['name'],
+        'image': image_url(row['image'], request),
+        'text': row['text'],
+        'cooking_time': row['cooking_time'],
+    }
+
+
+def recipe_detail(queryset, request):
+    """
+    Один рецепт в формате RecipeReadSerializer или ``None``.
+
+    На PostgreSQL весь ответ собирается одним запросом: теги
+    и ингредиенты - подзапросами с JSONB_AGG, флаги пользователя -
+    подзапросами EXISTS. На других базах - запросами по связям,
+    как для списка. Результат совпадает побайтно.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        rows = list(queryset.values(*RECIPE_FIELDS))
+        return recipe_representations(rows, request)[0] if rows else None
+
+    user = request.user
+    if user.is_authenticated:
+        flags = {
+            'is_favorited': Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            'is_in_shopping_cart': Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            'is_subscribed': Exists(Subscriptions.objects.filter(
+                user=user, author=OuterRef('author_id')
+            )),
+        }
+    else:
+        flags = {name: Value(False) for name in (
+            'is_favorited', 'is_in_shopping_cart', 'is_subscribed'
+        )}
+    row = queryset.annotate(
+        tags_json=json_list(
+            Recipe.tags.through.objects, '-tag_id',
+            id='tag__id', color='tag__color', name='tag__name',
+            slug='tag__slug',
+        ),
+        ingredients_json=json_list(
+            IngredientAmount.objects, '-id',
+            id='ingredient_id', name='ingredient__name',
+            measurement_unit='ingredient__measurement_unit',
+            amount='amount',
+        ),
+        **flags,
+    ).values(
+        *RECIPE_FIELDS, *[f'author__{field}' for field in USER_FIELDS],
+        'tags_json', 'ingredients_json', *flags,
+    ).first()
+    if row is None:
+        return None
+    with measure_serialization(request):
+        author = {field: row[f'author__{field}'] for field in USER_FIELDS}
+        # JSONB хранит ключи объектов в своём порядке: восстанавливаем
+        # порядок полей сериализаторов.
+        return recipe_representation(
+            row,
+            [tag_representation(tag) for tag in row['tags_json'] or []],
+            [{field: item[field] for field in INGREDIENT_AMOUNT_FIELDS}
+             for item in row['ingredients_json'] or []],
+            author=user_representation(
+                author, {author['id']} if row['is_subscribed'] else ()
+            ),
+            is_favorited=row['is_favorited'],
+            is_in_shopping_cart=row['is_in_shopping_cart'],
+            request=request,
+        )
+
+
+def json_list(manager, ordering, **fields):
+    """Подзапрос: строки рецепта списком JSON-объектов в порядке ordering."""
+    # Модуль требует psycopg2, поэтому импортируется только для PostgreSQL.
+    from django.contrib.postgres.aggregates import JSONBAgg
+
+    return Subquery(
+        manager.filter(recipe_id=OuterRef('pk')).order_by().values(
+            'recipe_id'
+        ).annotate(
+            data=JSONBAgg(JSONObject(**fields), ordering=ordering)
+        ).values('data')
+    )
+
+
+@serialization
+def subscription_representations(rows, request):
+    """Список авторов в формате SubscriptionsSerializer."""
+    rows = list(rows)
+    if not rows:
+        return []
+    author_ids = [row['id'] for row in rows]
+    subscribed_ids = get_relations(request).subscribed_author_ids
+    recipes_count = dict(
+        Recipe.objects.filter(author_id__in=author_ids).order_by().values(
+            'author_id'
+        ).annotate(count=Count('id')).values_list('author_id', 'count')
+    )
+
+    recipes = defaultdict(list)
+    limit = request.query_params.get('recipes_limit')
+    if limit:
+        for author_id in author_ids:
+            recipes[author_id] = list(Recipe.objects.filter(
+                author_id=author_id
+            ).values(*RECIPE_SHORT_FIELDS)[:int(limit)])
+    else:
+        for row in Recipe.objects.filter(
+            author_id__in=author_ids
+        ).values('author_id', *RECIPE_SHORT_FIELDS):
+            recipes[row['author_id']].append(row)
+
+    result = []
+    for row in rows:
+        data = {field: row[field] for field in USER_FIELDS}
+        data['recipes_count'] = recipes_count.get(row['id'], 0)
+        data['recipes'] = [
+            recipe_short_representation(recipe)
+            for recipe in recipes[row['id']]
+        ]
+        data['is_subscribed'] = row['id'] in subscribed_ids
+        result.append(data)
+    return result
@@ -0,0 +1,88 @@
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+DEFAULT_READ_REPLICAS = {
+    'ALIASES': (),
+    'PIN_SECONDS': 5,
+    'CACHE': 'default',
+}
+
+# Реплика, из которой читает текущий запрос; None - основная БД.
+current_replica = ContextVar('current_replica', default=None)
+
+
+def get_config():
+    return {**DEFAULT_READ_REPLICAS, **getattr(settings, 'READ_REPLICAS', {})}
+
+
+@contextmanager
+def use_primary():
+    """Чтение внутри блока идёт в основную БД."""
+    token = current_replica.set(None)
+    try:
+        yield
+    finally:
+        current_replica.reset(token)
+
+
+def pin_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return ('replica-pin:'
+            + hashlib.sha256(authorization.encode()).hexdigest())
+
+
+def pin_to_primary(request):
+    """
+    После записи клиент какое-то время читает из основной БД,
+    чтобы видеть свои изменения, пока они не дошли до реплик.
+    """
+    key = pin_key(request)
+    config = get_config()
+    if key is not None and config['PIN_SECONDS']:
+        caches[config['CACHE']].set(key, True, config['PIN_SECONDS'])
+
+
+def is_pinned(request):
+    key = pin_key(request)
+    return key is not None and caches[get_config()['CACHE']].get(key, False)
+
+
+def choose_replica(request):
+    """Реплика для безопасного запроса или None."""
+    aliases = get_config()['ALIASES']
+    if (not aliases or request.method not in SAFE_METHODS
+            or is_pinned(request)):
+        return None
+    return random.choice(aliases)
+
+
+class ReplicaRouter:
+    """
+    Чтение в безопасных запросах идёт в реплику, выбранную
+    ``ReplicaRoutingMiddleware`` на весь запрос; запись, чтение
+    в транзакциях и вне запросов - в основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = current_replica.get()
+        if replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -1,12 +1,15 @@
-from api.fields import Base64ImageField, Hex2NameColor
+from api import reference
+from api.fields import Base64ImageField, Hex2NameColor, ReferenceRelatedField
+from api.models import Job, ProfileReport
+from api.relations import get_relations
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.urls import reverse
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from recipe.models import (Ingredient, IngredientAmount, Recipe, ShoppingCart,
-                           Tag)
+from recipe.models import Ingredient, IngredientAmount, Recipe, Tag
 from rest_framework import serializers
 from rest_framework.fields import SerializerMethodField
 from rest_framework.validators import UniqueValidator
-from users.models import Subscriptions
 
 User = get_user_model()
 
@@ -56,11 +59,10 @@ class UserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, author):
-        if Subscriptions.objects.filter(
-            author=author, user=self.context['request'].user
-        ).exists():
-            return True
-        return False
+        request = self.context['request']
+        if author.id == request.user.id:
+            return False
+        return author.id in get_relations(request).subscribed_author_ids
 
 
 class RecipeShortSerializer(serializers.ModelSerializer):
@@ -101,11 +103,10 @@ class SubscriptionsSerializer(UserSerializer):
         return RecipeShortSerializer(queryset, many=True).data
 
     def get_is_subscribed(self, author):
-        if Subscriptions.objects.filter(
-            author=author, user=self.context['request'].user
-        ).exists():
-            return True
-        return False
+        request = self.context['request']
+        if author.id == request.user.id:
+            return False
+        return author.id in get_relations(request).subscribed_author_ids
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -148,7 +149,8 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
 class IngredientsAddSerializer(serializers.ModelSerializer):
     """Сериализатор для добавления ингредиента в рецептах."""
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = ReferenceRelatedField(reference.ingredients,
+                               queryset=Ingredient.objects.all())
     amount = serializers.IntegerField(write_only=True)
 
     class Meta:
@@ -177,31 +179,26 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         Метод для определения находится ли рецепт у аутентифицированного
         пользователя в списке любимых рецептов.
         """
-        user = self.context['request'].user
-        return user.is_authenticated and user.favorites.filter(
-            recipe=recipe).exists()
+        return recipe.id in get_relations(
+            self.context['request']
+        ).favorite_recipe_ids
 
     def get_is_in_shopping_cart(self, recipe):
         """
         Метод для определения находится ли рецепт в корзине у
         аутентифицированного пользователя.
         """
-        user = self.context['request'].user
-        try:
-            user = self.context['request'].user
-            return user.is_authenticated and user.purchases.filter(
-                recipe=recipe
-            ).exists()
-        except ShoppingCart.DoesNotExist:
-            return False
+        return recipe.id in get_relations(
+            self.context['request']
+        ).cart_recipe_ids
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Сериализатор создания рецептов."""
 
     ingredients = IngredientsAddSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True
+    tags = ReferenceRelatedField(
+        reference.tags, queryset=Tag.objects.all(), many=True
     )
     image = Base64ImageField()
     cooking_time = serializers.IntegerField()
@@ -216,12 +213,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         if not tags:
             raise serializers.ValidationError(
                 'Нужен хотя бы один тэг для рецепта')
-        for tag in tags:
-            if not Tag.objects.filter(id=tag.id).exists():
-                raise serializers.ValidationError(
-                    'Тега не существует'
-                )
-            return tags
+        return tags
 
     def validate_cooking_time(self, cooking_time):
         """Метод для валидации времени приготовления."""
@@ -264,6 +256,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         ) for ingredient in ingredients])
         return recipe
 
+    @transaction.atomic
     def create(self, validated_data):
         """Метод переодпределния создания рецепта."""
         user = self.context['request'].user
@@ -273,6 +266,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         self.add_ingredients_tags(ingredients, tags, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
@@ -285,3 +279,52 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         """Метод для отображения рецепта после создания или измененния."""
         context = {'request': self.context['request']}
         return RecipeReadSerializer(instance, context=context).data
+
+
+class RecipeMatchSerializer(serializers.Serializer):
+    """Параметры подбора рецептов по ингредиентам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Статус фоновой задачи и ссылка на результат."""
+
+    result = SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ('id', 'kind', 'status', 'error', 'created', 'started',
+                  'finished', 'result')
+
+    def get_result(self, obj):
+        if obj.status != Job.DONE:
+            return None
+        return self.context['request'].build_absolute_uri(
+            reverse('api:job-result', args=[obj.id])
+        )
+
+
+class ProfileReportSerializer(serializers.ModelSerializer):
+    """Профиль запроса и ссылки на отчёт и исходные данные."""
+
+    report = SerializerMethodField()
+    data = SerializerMethodField()
+
+    class Meta:
+        model = ProfileReport
+        fields = ('id', 'method', 'path', 'mode', 'status_code',
+                  'duration_ms', 'queries', 'created', 'report', 'data')
+
+    def get_report(self, obj):
+        return self.context['request'].build_absolute_uri(
+            reverse('api:profile-report', args=[obj.id])
+        )
+
+    def get_data(self, obj):
+        return self.context['request'].build_absolute_uri(
+            reverse('api:profile-data', args=[obj.id])
+        )
@@ -0,0 +1,191 @@
+from functools import partial
+from time import monotonic
+
+from api import jobs, matching, profiles, reference, snapshots, versions
+from api.authentication import CACHED_USER_FIELDS, invalidate_user
+from api.metrics import install_execute_wrapper
+from api.representations import USER_FIELDS
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished, request_started
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from recipe import feed, similarity
+from recipe.models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                           ShoppingCart, Tag)
+from rest_framework.authtoken.models import Token
+from users.models import PopularAuthor, Subscriptions
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientAmount)
+@receiver(post_delete, sender=IngredientAmount)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipes_changed(action='post_save', **kwargs):
+    if not action.startswith('post_'):
+        return
+    versions.bump(versions.RECIPES)
+
+
+M2M_THROUGH = (Recipe.tags.through, Recipe.ingredients.through)
+
+
+def changed_recipe_ids(sender, instance, reverse=False, pk_set=None):
+    """id рецептов, состав которых затронут изменением."""
+    if sender is Recipe or (sender in M2M_THROUGH and not reverse):
+        return [instance.id]
+    if sender in M2M_THROUGH:
+        return list(pk_set or ())
+    return [instance.recipe_id]
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientAmount)
+@receiver(post_delete, sender=IngredientAmount)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_changed(sender, instance, action='post_save',
+                               reverse=False, pk_set=None, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse and not pk_set:
+        transaction.on_commit(matching.request_rebuild)
+        return
+    for recipe_id in changed_recipe_ids(sender, instance, reverse, pk_set):
+        matching.recipe_changed(recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=IngredientAmount)
+@receiver(post_delete, sender=IngredientAmount)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_vector_changed(sender, instance, action='post_save',
+                          reverse=False, pk_set=None, **kwargs):
+    """Похожие рецепты пересчитает ``build_similar_recipes --stale``."""
+    if not action.startswith('post_'):
+        return
+    for recipe_id in changed_recipe_ids(sender, instance, reverse, pk_set):
+        transaction.on_commit(partial(similarity.mark_changed, recipe_id))
+
+
+# Раскладка по лентам может затронуть тысячи подписчиков, поэтому идёт
+# фоновыми задачами. Задача ставится в той же транзакции, что и изменение,
+# и при откате исчезает вместе с ним.
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(instance, created, **kwargs):
+    if created:
+        jobs.enqueue('feed_publish', payload={'recipe_id': instance.id})
+
+
+@receiver(post_save, sender=Subscriptions)
+def subscription_created(instance, created, **kwargs):
+    if created:
+        jobs.enqueue('feed_subscribe', payload={
+            'user_id': instance.user_id, 'author_id': instance.author_id,
+        })
+
+
+@receiver(post_delete, sender=Subscriptions)
+def subscription_deleted(instance, **kwargs):
+    """Записи автора убираются из ленты сразу, это один DELETE."""
+    feed.unsubscribed(instance.user_id, instance.author_id)
+    if PopularAuthor.objects.filter(author_id=instance.author_id).exists():
+        jobs.enqueue('feed_followers_decreased',
+                     payload={'author_id': instance.author_id})
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tags_changed(**kwargs):
+    versions.bump(versions.TAGS)
+    reference.tags.invalidate()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredients_changed(**kwargs):
+    versions.bump(versions.INGREDIENTS)
+    reference.ingredients.invalidate()
+    snapshots.ingredients.invalidate()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def users_changed(update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    versions.bump(versions.USERS)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Subscriptions)
+@receiver(post_delete, sender=Subscriptions)
+def user_relations_changed(instance, **kwargs):
+    versions.bump(versions.user_resource(instance.user_id))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    """Выход через djoser удаляет токен: сбрасываем его из кэша."""
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def user_tokens_changed(instance, update_fields=None, **kwargs):
+    if update_fields and CACHED_USER_FIELDS.isdisjoint(update_fields):
+        return
+    invalidate_user(instance.id)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_profile_changed(instance, update_fields=None, **kwargs):
+    # Подписки в кэше профилей версионируются ресурсом
+    # user_resource, его увеличивает user_relations_changed.
+    if update_fields and set(USER_FIELDS).isdisjoint(update_fields):
+        return
+    profiles.invalidate_profile(instance.id)
+
+
+@receiver(connection_created)
+def connection_opened(connection, **kwargs):
+    install_execute_wrapper(connection)
+
+
+@receiver(request_finished)
+def connections_released(**kwargs):
+    now = monotonic()
+    for connection in connections.all():
+        connection.last_used = now
+
+
+@receiver(request_started)
+def check_idle_connections(**kwargs):
+    """
+    Проверка постоянных подключений (аналог CONN_HEALTH_CHECKS
+    из новых версий Django): подключение, простаивавшее дольше
+    DB_CONN_HEALTH_CHECK_IDLE секунд, закрывается, если стало
+    непригодным, и будет открыто заново при первом запросе к БД.
+    """
+    if not getattr(settings, 'DB_CONN_HEALTH_CHECKS', False):
+        return
+    now = monotonic()
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        idle = now - getattr(connection, 'last_used', now)
+        if (idle > settings.DB_CONN_HEALTH_CHECK_IDLE
+                and not connection.is_usable()):
+            connection.close()
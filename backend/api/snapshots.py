@@ -0,0 +1,65 @@
+import hashlib
+import json
+
+from api import compression, versions
+from api.reference import ReferenceCache
+from api.representations import INGREDIENT_FIELDS, ingredient_representation
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from recipe.models import Ingredient
+
+
+def build(data):
+    """
+    Снимок данных: тело в JSON и его сжатые варианты, каждый со своим
+    сильным ETag. Собирается редко, поэтому сжимается максимально.
+    """
+    content = json.dumps(
+        data, ensure_ascii=False, separators=(',', ':')
+    ).encode()
+    digest = hashlib.sha256(content).hexdigest()[:32]
+    config = {**compression.get_config(),
+              'GZIP_LEVEL': 9, 'BROTLI_QUALITY': 11}
+    bodies = {None: (content, f'"{digest}"')}
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and compression.brotli is None:
+            continue
+        bodies[encoding] = (
+            compression.compress(content, encoding, config),
+            f'"{digest}-{encoding}"',
+        )
+    return bodies
+
+
+def load_ingredients():
+    return build([
+        ingredient_representation(row)
+        for row in Ingredient.objects.values(*INGREDIENT_FIELDS)
+    ])
+
+
+# Пересобирается при смене версии справочника ингредиентов.
+ingredients = ReferenceCache(versions.INGREDIENTS, load_ingredients)
+
+
+def snapshot_response(request, snapshot):
+    """
+    Готовый снимок в кодировке, которую принимает клиент. Если у клиента
+    та же версия (``If-None-Match``), возвращается 304.
+    """
+    bodies = snapshot.get()
+    encoding = compression.choose_encoding(
+        request.META.get('HTTP_ACCEPT_ENCODING')
+    )
+    if encoding not in bodies:
+        encoding = None
+    content, etag = bodies[encoding]
+    response = HttpResponse(content, content_type='application/json')
+    if encoding is not None:
+        response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Encoding', ))
+    # Клиент хранит снимок у себя и сверяет версию при каждом открытии.
+    patch_cache_control(response, public=True, no_cache=True)
+    return get_conditional_response(request, etag=etag, response=response)
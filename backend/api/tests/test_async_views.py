@@ -0,0 +1,105 @@
+from unittest import mock
+
+from api import async_views, authentication, reference
+from asgiref.sync import sync_to_async
+from django.test import TestCase
+from recipe.models import Favorite, Ingredient, IngredientAmount, Recipe, Tag
+from rest_framework.authtoken.models import Token
+from users.models import Subscriptions, User
+
+
+async def run_in_test_thread(func, *args):
+    """ORM в потоке теста: данные его транзакции видны."""
+    return await sync_to_async(func)(*args)
+
+
+class AsyncViewsTest(TestCase):
+    """Асинхронные представления отвечают так же, как синхронные."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = [
+            User.objects.create_user(
+                username=username, email=f'{username}@example.com',
+                first_name='Имя', last_name='Фамилия', password='password',
+            )
+            for username in ('author', 'reader')
+        ]
+        cls.token = Token.objects.create(user=cls.reader)
+        tag = Tag.objects.create(name='Завтрак', color='Yellow',
+                                 slug='breakfast')
+        ingredient = Ingredient.objects.create(name='мука',
+                                               measurement_unit='г')
+        cls.recipes = []
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}',
+                text='Описание', cooking_time=10,
+                image=f'static/recipe/{number}.png',
+            )
+            recipe.tags.set([tag])
+            IngredientAmount.objects.create(recipe=recipe,
+                                            ingredient=ingredient,
+                                            amount=100 * (number + 1))
+            cls.recipes.append(recipe)
+        Favorite.objects.create(user=cls.reader, recipe=cls.recipes[0])
+        Subscriptions.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        patcher = mock.patch.object(async_views, 'run_in_db_thread',
+                                    run_in_test_thread)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.reset()
+        self.addCleanup(self.reset)
+
+    def reset(self):
+        for cache in reference.REFERENCE_CACHES.values():
+            cache._state = None
+            cache._checked = None
+        authentication._local_tokens.clear()
+
+    def authorizations(self):
+        return ({}, {'HTTP_AUTHORIZATION': f'Token {self.token}'})
+
+    def test_same_body(self):
+        paths = ['/recipes/', '/tags/', '/ingredients/?name=му',
+                 *[f'/recipes/{recipe.id}/' for recipe in self.recipes]]
+        for extra in self.authorizations():
+            for path in paths:
+                with self.subTest(path=path, auth=bool(extra)):
+                    sync = self.client.get('/api' + path, **extra)
+                    response = self.client.get('/api/async' + path, **extra)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.content, sync.content)
+
+    def test_not_found(self):
+        response = self.client.get('/api/async/recipes/0/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(),
+                         self.client.get('/api/recipes/0/').json())
+
+    def test_conditional_get(self):
+        for path in ('/api/async/recipes/',
+                     f'/api/async/recipes/{self.recipes[0].id}/',
+                     '/api/async/tags/'):
+            for extra in self.authorizations():
+                with self.subTest(path=path, auth=bool(extra)):
+                    response = self.client.get(path, **extra)
+                    self.assertIn('Authorization', response['Vary'])
+                    etag = response['ETag']
+                    response = self.client.get(path, HTTP_IF_NONE_MATCH=etag,
+                                               **extra)
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response.content, b'')
+
+    def test_etag_follows_changes(self):
+        path = f'/api/async/recipes/{self.recipes[0].id}/'
+        extra = self.authorizations()[1]
+        etag = self.client.get(path, **extra)['ETag']
+        Favorite.objects.filter(user=self.reader).delete()
+        Favorite.objects.create(user=self.reader, recipe=self.recipes[1])
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag, **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['is_favorited'])
+        self.assertNotEqual(response['ETag'], etag)
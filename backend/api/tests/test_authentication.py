@@ -0,0 +1,79 @@
+from api import authentication
+from api.authentication import CachedTokenAuthentication
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from users.models import User
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    """Кэш токенов и его сброс."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com',
+            first_name='Имя', last_name='Фамилия', password='password',
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        # Версии откатываются вместе с транзакцией теста, кэши - нет.
+        authentication._local_tokens.clear()
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+
+    def authenticate(self):
+        return CachedTokenAuthentication().authenticate_credentials(
+            self.token.key
+        )
+
+    def cached_entry(self):
+        return authentication._local_tokens.get(self.token.key)
+
+    def test_cache_hit_checks_version(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            user, token = self.authenticate()
+        self.assertEqual((user, token), (self.user, self.token))
+
+    def test_logout_revokes_token_in_every_process(self):
+        """
+        Запись в кэше процесса остаётся, но версия в базе уже другая:
+        так другой процесс узнаёт об удалении токена.
+        """
+        self.authenticate()
+        Token.objects.filter(key=self.token.key).delete()
+        self.assertIsNotNone(self.cached_entry())
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    @override_settings(TOKEN_AUTH_CACHE={'CACHE': 'default'})
+    def test_shared_cache_revocation(self):
+        self.authenticate()
+        Token.objects.filter(key=self.token.key).delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deactivation_revokes_cached_token(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        self.assertIsNotNone(self.cached_entry())
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_profile_change_reloads_user(self):
+        self.authenticate()
+        self.user.first_name = 'Новое'
+        self.user.save()
+        user, _ = self.authenticate()
+        self.assertEqual(user.first_name, 'Новое')
+
+    def test_last_login_does_not_touch_tokens(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(1):
+            self.authenticate()
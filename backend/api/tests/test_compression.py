@@ -0,0 +1,122 @@
+import asyncio
+import gzip
+import json
+from unittest import mock
+
+import brotli
+from api import compression
+from api.middleware import CompressionMiddleware
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+CONTENT = json.dumps([{'id': number, 'name': 'мука пшеничная'}
+                      for number in range(100)]).encode()
+
+
+class ChooseEncodingTest(SimpleTestCase):
+    """Выбор кодировки по Accept-Encoding."""
+
+    def test_choose_encoding(self):
+        for header, expected in (
+            (None, None),
+            ('', None),
+            ('identity', None),
+            ('gzip', 'gzip'),
+            ('GZIP', 'gzip'),
+            ('gzip, deflate, br', 'br'),
+            ('*', 'br'),
+            ('gzip;q=1, br;q=0.5', 'gzip'),
+            ('gzip;q=0.5, *;q=0.8', 'br'),
+            ('*;q=1, br;q=0', 'gzip'),
+            ('br;q=0, *', 'gzip'),
+            ('*;q=1, br;q=0, gzip;q=0', None),
+            ('*;q=0', None),
+            ('gzip;q=0', None),
+            ('br;q=abc, gzip', 'gzip'),
+        ):
+            with self.subTest(header=header):
+                self.assertEqual(compression.choose_encoding(header),
+                                 expected)
+
+    def test_without_brotli(self):
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertEqual(compression.choose_encoding('*'), 'gzip')
+            self.assertEqual(compression.choose_encoding('br'), None)
+
+
+@override_settings(COMPRESSION={'MIN_SIZE': 1024})
+class CompressionMiddlewareTest(SimpleTestCase):
+    """Сжатие ответов в middleware."""
+
+    def process(self, response, accept_encoding='gzip, br'):
+        request = RequestFactory().get(
+            '/api/ingredients/', HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def json_response(self, content=CONTENT, **headers):
+        response = HttpResponse(content, content_type='application/json')
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    def test_compresses_json(self):
+        for accept_encoding, decompress in (('gzip', gzip.decompress),
+                                            ('br', brotli.decompress)):
+            with self.subTest(encoding=accept_encoding):
+                response = self.process(self.json_response(),
+                                        accept_encoding)
+                self.assertEqual(response['Content-Encoding'],
+                                 accept_encoding)
+                self.assertEqual(int(response['Content-Length']),
+                                 len(response.content))
+                self.assertEqual(decompress(response.content), CONTENT)
+
+    def test_refused_encoding(self):
+        response = self.process(self.json_response(), '*;q=1, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_threshold(self):
+        small = CONTENT[:1023]
+        response = self.process(self.json_response(small))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+        self.assertEqual(response.content, small)
+        response = self.process(self.json_response(CONTENT[:1024]))
+        self.assertTrue(response.has_header('Content-Encoding'))
+
+    def test_skips_pdf_and_streaming(self):
+        pdf = HttpResponse(CONTENT, content_type='application/pdf')
+        self.assertFalse(self.process(pdf).has_header('Content-Encoding'))
+        streaming = StreamingHttpResponse(
+            iter([CONTENT]), content_type='application/json'
+        )
+        response = self.process(streaming)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+    def test_etag_becomes_weak(self):
+        for etag, expected in (('"v1"', 'W/"v1"'), ('W/"v1"', 'W/"v1"')):
+            with self.subTest(etag=etag):
+                response = self.process(self.json_response(ETag=etag))
+                self.assertEqual(response['ETag'], expected)
+        response = self.process(self.json_response(ETag='"v1"'),
+                                'identity')
+        self.assertEqual(response['ETag'], '"v1"')
+
+    def test_vary(self):
+        response = self.process(self.json_response(Vary='Authorization'))
+        self.assertEqual(response['Vary'], 'Authorization, Accept-Encoding')
+        # Несжатый ответ зависит от заголовка так же, как сжатый.
+        response = self.process(self.json_response(), 'identity')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_async(self):
+        async def get_response(request):
+            return self.json_response()
+
+        request = RequestFactory().get('/api/async/recipes/',
+                                       HTTP_ACCEPT_ENCODING='gzip')
+        response = asyncio.run(CompressionMiddleware(get_response)(request))
+        self.assertEqual(gzip.decompress(response.content), CONTENT)
@@ -0,0 +1,103 @@
+from unittest import mock
+
+from api import deletion
+from django.db.models.deletion import Collector
+from django.test import TestCase
+from recipe.models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                           RecipeSimilarity, ShoppingCart, Tag)
+from rest_framework.authtoken.models import Token
+from users.models import Subscriptions, User
+
+
+class BatchDeleterTest(TestCase):
+    """Удаление пачками с обработчиками после каждой пачки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                username=f'user{number}', email=f'user{number}@example.com',
+                password='password',
+            )
+            for number in range(4)
+        ]
+        tag = Tag.objects.create(name='Обед', color='Green', slug='lunch')
+        ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(3)
+        ]
+        cls.recipes = []
+        for number in range(6):
+            recipe = Recipe.objects.create(
+                author=cls.users[number % 2], name=f'Рецепт {number}',
+                text='Описание', cooking_time=10,
+                image=f'static/recipe/{number}.png',
+            )
+            recipe.tags.add(tag)
+            IngredientAmount.objects.bulk_create([
+                IngredientAmount(recipe=recipe, ingredient=ingredient,
+                                 amount=100)
+                for ingredient in ingredients
+            ])
+            cls.recipes.append(recipe)
+        for user in cls.users:
+            Token.objects.create(user=user)
+            for recipe in cls.recipes[:3]:
+                Favorite.objects.create(user=user, recipe=recipe)
+                ShoppingCart.objects.create(user=user, recipe=recipe)
+            for author in cls.users[:2]:
+                if author != user:
+                    Subscriptions.objects.create(user=user, author=author)
+
+    def expected_counts(self, queryset):
+        collector = Collector(using='default')
+        collector.collect(queryset)
+        counts = {}
+        for model, instances in collector.data.items():
+            counts[model._meta.label] = len(instances)
+        for queryset in collector.fast_deletes:
+            if queryset.exists():
+                label = queryset.model._meta.label
+                counts[label] = counts.get(label, 0) + queryset.count()
+        return counts
+
+    def test_counts_match_collector(self):
+        user_ids = [user.id for user in self.users[:2]]
+        expected = self.expected_counts(User.objects.filter(id__in=user_ids))
+        self.assertEqual(deletion.delete_users(user_ids, batch_size=2),
+                         expected)
+        self.assertFalse(User.objects.filter(id__in=user_ids).exists())
+
+    def test_handlers_skip_removed(self):
+        """Удаляемые рецепты и авторы не пересчитываются."""
+        with mock.patch.object(deletion.feed,
+                               'followers_decreased') as decreased, \
+                mock.patch.object(deletion.similarity,
+                                  'mark_changed') as marked:
+            deletion.delete_users(
+                [user.id for user in self.users[:2]], batch_size=2
+            )
+        decreased.assert_not_called()
+        marked.assert_not_called()
+
+    def test_remaining_authors(self):
+        with mock.patch.object(deletion.feed,
+                               'followers_decreased') as decreased:
+            deletion.delete_users([self.users[3].id], batch_size=2)
+        self.assertEqual(
+            sorted(call.args[0] for call in decreased.call_args_list),
+            [self.users[0].id, self.users[1].id],
+        )
+
+    def test_rows_kept_only_for_removing(self):
+        deleter = deletion.BatchDeleter(batch_size=2)
+        deleter.delete(Recipe, [recipe.id for recipe in self.recipes[:4]])
+        self.assertEqual(set(deleter.removing), {Recipe})
+        self.assertEqual(
+            deleter.removing[Recipe],
+            {recipe.id for recipe in self.recipes[:4]},
+        )
+        self.assertFalse(RecipeSimilarity.objects.filter(
+            recipe_id__in=deleter.removing[Recipe]
+        ).exists())
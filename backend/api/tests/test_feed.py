@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta, timezone
+
+from api import jobs
+from api.models import Job
+from django.test import TestCase, override_settings
+from recipe import feed
+from recipe.models import FeedEntry, Recipe
+from rest_framework.authtoken.models import Token
+from users.models import PopularAuthor, Subscriptions, User
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def run_jobs():
+    """Выполняет задачи очереди так, как это сделал бы ``run_worker``."""
+    for job in Job.objects.filter(status=Job.PENDING).order_by('id'):
+        jobs.TASKS[job.kind](job)
+        Job.objects.filter(id=job.id).update(status=Job.DONE)
+
+
+@override_settings(RECIPE_FEED={'FANOUT_LIMIT': 4, 'BACKFILL': 50})
+class FeedTest(TestCase):
+    """
+    Лента из разложенных записей обычного автора и рецептов популярного
+    автора, подмешанных при чтении.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author, cls.star, *cls.fans = [
+            User.objects.create_user(
+                username=f'user{number}', email=f'user{number}@example.com',
+                password='password',
+            )
+            for number in range(6)
+        ]
+        cls.token = Token.objects.create(user=cls.reader)
+        # Рецепты обоих авторов чередуются, в 4 часа - одновременно.
+        cls.recipes = {}
+        for author, hours in ((cls.author, (0, 2, 4)), (cls.star, (1, 3, 4))):
+            for hour in hours:
+                recipe = Recipe.objects.create(
+                    author=author, name=f'Рецепт {hour}', text='Описание',
+                    cooking_time=10, image=f'static/recipe/{hour}.png',
+                )
+                Recipe.objects.filter(id=recipe.id).update(
+                    pub_date=START + timedelta(hours=hour)
+                )
+                cls.recipes[author.id, hour] = recipe.id
+        Subscriptions.objects.create(user=cls.reader, author=cls.author)
+        for user in (cls.reader, *cls.fans):
+            Subscriptions.objects.create(user=user, author=cls.star)
+        run_jobs()
+
+    def expected(self):
+        """Все рецепты ленты читателя от новых к старым."""
+        return list(Recipe.objects.filter(
+            author__in=(self.author, self.star)
+        ).order_by('-pub_date', '-id').values_list('id', flat=True))
+
+    def test_fanout_runs_in_background(self):
+        recipe = Recipe.objects.create(
+            author=self.author, name='Новый', text='Описание',
+            cooking_time=10, image='static/recipe/new.png',
+        )
+        entries = FeedEntry.objects.filter(recipe=recipe)
+        self.assertFalse(entries.exists())
+        self.assertTrue(Job.objects.filter(
+            kind='feed_publish', status=Job.PENDING,
+            payload={'recipe_id': recipe.id},
+        ).exists())
+        run_jobs()
+        self.assertEqual(list(entries.values_list('user_id', flat=True)),
+                         [self.reader.id])
+
+    def test_popular_author_is_not_pushed(self):
+        self.assertTrue(PopularAuthor.objects.filter(
+            author=self.star
+        ).exists())
+        self.assertEqual(
+            set(FeedEntry.objects.values_list('author_id', flat=True)),
+            {self.author.id},
+        )
+
+    def test_merge_pushed_and_pulled(self):
+        items, cursor = feed.page(self.reader, limit=10)
+        self.assertEqual([recipe_id for recipe_id, _ in items],
+                         self.expected())
+        self.assertIsNone(cursor)
+
+    def test_cursor_round_trip(self):
+        pub_date = START + timedelta(hours=4)
+        self.assertEqual(
+            feed.decode_cursor(feed.encode_cursor(pub_date, 42)),
+            (pub_date, 42),
+        )
+        with self.assertRaises(ValueError):
+            feed.decode_cursor('не курсор')
+        # Страницы по одному рецепту проходят и через рецепты с одной
+        # датой публикации у разных частей ленты.
+        pages = []
+        cursor = None
+        while True:
+            items, next_cursor = feed.page(
+                self.reader,
+                feed.decode_cursor(cursor) if cursor else None,
+                limit=1,
+            )
+            pages.extend(recipe_id for recipe_id, _ in items)
+            if next_cursor is None:
+                break
+            cursor = next_cursor
+        self.assertEqual(pages, self.expected())
+
+    def test_endpoint_pages(self):
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {self.token}'
+        recipe_ids = []
+        url = '/api/recipes/feed/?limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            recipe_ids.extend(
+                recipe['id'] for recipe in response.json()['results']
+            )
+            url = response.json()['next']
+        self.assertEqual(recipe_ids, self.expected())
+        response = self.client.get('/api/recipes/feed/?cursor=xyz')
+        self.assertEqual(response.status_code, 400)
+
+    def test_unsubscribe_cleans_feed(self):
+        Subscriptions.objects.get(user=self.reader,
+                                  author=self.author).delete()
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        items, _ = feed.page(self.reader, limit=10)
+        self.assertEqual(
+            [recipe_id for recipe_id, _ in items],
+            [self.recipes[self.star.id, hour] for hour in (4, 3, 1)],
+        )
+
+    def test_unsubscribe_before_backfill(self):
+        user = self.fans[0]
+        Subscriptions.objects.create(user=user, author=self.author)
+        Subscriptions.objects.get(user=user, author=self.author).delete()
+        run_jobs()
+        self.assertFalse(FeedEntry.objects.filter(user=user).exists())
+
+    def test_popular_author_loses_followers(self):
+        for user in self.fans:
+            Subscriptions.objects.get(user=user, author=self.star).delete()
+        self.assertTrue(PopularAuthor.objects.filter(
+            author=self.star
+        ).exists())
+        run_jobs()
+        self.assertFalse(PopularAuthor.objects.filter(
+            author=self.star
+        ).exists())
+        self.assertEqual(
+            set(FeedEntry.objects.filter(
+                user=self.reader, author=self.star
+            ).values_list('recipe_id', flat=True)),
+            {self.recipes[self.star.id, hour] for hour in (1, 3, 4)},
+        )
+        items, _ = feed.page(self.reader, limit=10)
+        self.assertEqual([recipe_id for recipe_id, _ in items],
+                         self.expected())
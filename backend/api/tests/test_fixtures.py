@@ -0,0 +1,65 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from recipe.fixtures import FixtureGenerator
+from recipe.models import Ingredient, Recipe, Tag
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+
+class GenerateFixturesTest(TestCase):
+    """Генерация синтетических данных."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Каталог не пуст: CSV с ингредиентами не загружается.
+        Ingredient.objects.bulk_create([
+            Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+            for number in range(10)
+        ])
+
+    def generate(self, **options):
+        call_command('generate_fixtures', stdout=StringIO(),
+                     **{'users': 5, 'recipes': 10, **options})
+
+    def token_keys(self, prefix):
+        return list(Token.objects.filter(
+            user__username__startswith=prefix
+        ).order_by('user__username').values_list('key', flat=True))
+
+    def test_same_prefix_fails_clearly(self):
+        self.generate(prefix='first')
+        with self.assertRaisesMessage(CommandError, '"first"'):
+            self.generate(prefix='first')
+        with self.assertRaisesMessage(CommandError, '"firs"'):
+            self.generate(prefix='firs')
+        self.assertEqual(Recipe.objects.count(), 10)
+
+    def test_invalid_counts(self):
+        for options in ({'recipes': -1}, {'users': 0},
+                        {'batch_size': 0}):
+            with self.subTest(**options):
+                with self.assertRaises(CommandError):
+                    self.generate(**options)
+        self.assertFalse(User.objects.exists())
+
+    def test_no_recipes(self):
+        self.generate(prefix='empty', recipes=0)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_token_keys_follow_seed(self):
+        self.generate(prefix='first', seed=1)
+        keys = self.token_keys('first')
+        User.objects.all().delete()
+        Tag.objects.all().delete()
+        self.generate(prefix='first', seed=1)
+        self.assertEqual(self.token_keys('first'), keys)
+        self.generate(prefix='second', seed=1)
+        self.assertTrue(set(keys).isdisjoint(self.token_keys('second')))
+        self.assertTrue(all(len(key) == 40 for key in keys))
+
+    def test_batch_size(self):
+        with self.assertRaises(ValueError):
+            FixtureGenerator(batch_size=0)
@@ -0,0 +1,163 @@
+from datetime import timedelta
+from unittest import mock
+
+from api import jobs
+from api.models import Job
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from recipe.models import Ingredient, IngredientAmount, Recipe, ShoppingCart
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+
+def fail(job):
+    raise RuntimeError('сбой задачи')
+
+
+@override_settings(JOBS={'TIMEOUT': 600, 'MAX_ATTEMPTS': 2})
+class JobQueueTest(TestCase):
+    """Очередь задач в таблице."""
+
+    def setUp(self):
+        # Внутри транзакции теста соединение закрывать нельзя.
+        patcher = mock.patch.object(jobs, 'close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        tasks = mock.patch.dict(jobs.TASKS, {
+            'fail': fail,
+            'echo': lambda job: ('echo.txt', 'text/plain',
+                                 job.payload['text'].encode()),
+        })
+        tasks.start()
+        self.addCleanup(tasks.stop)
+
+    def test_claim_in_order(self):
+        first, second = jobs.enqueue('echo'), jobs.enqueue('echo')
+        self.assertEqual(jobs.claim(1), [first.id])
+        self.assertEqual(jobs.claim(5), [second.id])
+        self.assertEqual(jobs.claim(5), [])
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.attempts), (Job.RUNNING, 1))
+
+    def test_claim_race(self):
+        """
+        Другой обработчик забрал задачу между выборкой кандидатов
+        и UPDATE: задача не выполняется дважды, берётся следующая.
+        """
+        first, second = jobs.enqueue('echo'), jobs.enqueue('echo')
+        update = QuerySet.update
+        raced = []
+
+        def racing_update(queryset, **kwargs):
+            if not raced:
+                raced.append(True)
+                Job.objects.filter(id=first.id).update(
+                    status=Job.RUNNING, attempts=1
+                )
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True,
+                               side_effect=racing_update):
+            self.assertEqual(jobs.claim(1), [second.id])
+        first.refresh_from_db()
+        self.assertEqual(first.attempts, 1)
+
+    def test_execute(self):
+        job = jobs.enqueue('echo', payload={'text': 'готово'})
+        jobs.claim(1)
+        self.assertTrue(jobs.execute(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(bytes(job.result), 'готово'.encode())
+        self.assertEqual(job.result_name, 'echo.txt')
+
+    def test_retry_then_fail(self):
+        job = jobs.enqueue('fail')
+        for status in (Job.PENDING, Job.FAILED):
+            self.assertEqual(jobs.claim(1), [job.id])
+            with self.assertLogs('api.jobs', 'ERROR'):
+                self.assertFalse(jobs.execute(job.id))
+            job.refresh_from_db()
+            self.assertEqual(job.status, status)
+            self.assertIn('сбой задачи', job.error)
+        self.assertIsNotNone(job.finished)
+        self.assertEqual(jobs.claim(1), [])
+
+    def test_requeue_stale(self):
+        stale, exhausted, fresh = [jobs.enqueue('echo') for _ in range(3)]
+        jobs.claim(3)
+        long_ago = timezone.now() - timedelta(seconds=601)
+        Job.objects.filter(id__in=(stale.id, exhausted.id)).update(
+            started=long_ago
+        )
+        Job.objects.filter(id=exhausted.id).update(attempts=2)
+        self.assertEqual(jobs.requeue_stale(), 2)
+        statuses = dict(Job.objects.values_list('id', 'status'))
+        self.assertEqual(statuses, {stale.id: Job.PENDING,
+                                    exhausted.id: Job.FAILED,
+                                    fresh.id: Job.RUNNING})
+        self.assertEqual(jobs.claim(3), [stale.id])
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            jobs.enqueue('unknown')
+
+
+class JobViewSetTest(TestCase):
+    """Задачи и их результаты видит только владелец."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, cls.other = [
+            User.objects.create_user(
+                username=f'user{number}', email=f'user{number}@example.com',
+                password='password',
+            )
+            for number in range(2)
+        ]
+        cls.tokens = {user: Token.objects.create(user=user)
+                      for user in (cls.owner, cls.other)}
+        ingredient = Ingredient.objects.create(name='мука',
+                                               measurement_unit='г')
+        recipe = Recipe.objects.create(
+            author=cls.owner, name='Блины', text='Описание',
+            cooking_time=10, image='static/recipe/0.png',
+        )
+        IngredientAmount.objects.create(recipe=recipe, ingredient=ingredient,
+                                        amount=200)
+        ShoppingCart.objects.create(user=cls.owner, recipe=recipe)
+
+    def get(self, user, url):
+        return self.client.get(
+            url, HTTP_AUTHORIZATION=f'Token {self.tokens[user]}'
+        )
+
+    def test_background_shopping_list(self):
+        response = self.get(
+            self.owner,
+            '/api/recipes/download_shopping_cart/?background=1&export=txt',
+        )
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get(id=response.json()['id'])
+        self.assertIsNone(response.json()['result'])
+        result_url = f'/api/jobs/{job.id}/result/'
+        self.assertEqual(self.get(self.owner, result_url).status_code, 404)
+
+        name, content_type, content = jobs.TASKS[job.kind](job)
+        Job.objects.filter(id=job.id).update(
+            status=Job.DONE, result=content, result_name=name,
+            content_type=content_type,
+        )
+        response = self.get(self.owner, f'/api/jobs/{job.id}/')
+        self.assertTrue(response.json()['result'].endswith(result_url))
+        response = self.get(self.owner, result_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('мука - 200, г', response.content.decode())
+
+        for url in (f'/api/jobs/{job.id}/', result_url):
+            with self.subTest(url=url):
+                self.assertEqual(self.get(self.other, url).status_code, 404)
+        self.assertEqual(self.get(self.other, '/api/jobs/').json()['count'],
+                         0)
+        self.assertEqual(self.client.get(result_url).status_code, 401)
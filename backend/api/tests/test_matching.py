@@ -0,0 +1,122 @@
+from unittest import mock
+
+from api import matching
+from django.test import TestCase, override_settings
+from recipe.models import Ingredient, IngredientAmount, Recipe
+from users.models import User
+
+
+@override_settings(RECIPE_MATCHING={'CHECK_INTERVAL': 0})
+class IngredientIndexSyncTest(TestCase):
+    """Синхронизация индекса подбора с журналом изменений."""
+
+    def setUp(self):
+        self.index = matching.IngredientIndex()
+        self.index.sync()
+
+    def count_rebuilds(self):
+        return mock.patch.object(
+            self.index, 'rebuild', wraps=self.index.rebuild
+        )
+
+    def test_rebuild_request_is_handled_once(self):
+        matching.request_rebuild()
+        with self.count_rebuilds() as rebuild:
+            self.index.sync()
+            self.index.sync()
+            self.index.sync()
+        self.assertEqual(rebuild.call_count, 1)
+
+    def test_rebuild_skips_requests_it_already_covers(self):
+        matching.request_rebuild()
+        index = matching.IngredientIndex()
+        with mock.patch.object(index, 'rebuild',
+                               wraps=index.rebuild) as rebuild:
+            index.sync()
+            index.sync()
+        self.assertEqual(rebuild.call_count, 1)
+
+
+@override_settings(RECIPE_MATCHING={'CHECK_INTERVAL': 0})
+class MatchTest(TestCase):
+    """Подбор рецептов по ингредиентам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Имя', last_name='Фамилия', password='password',
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(9)
+        ]
+        cls.recipes = {}
+        for name, numbers in (
+            ('A', (1, 2)), ('B', (1, 2, 3)), ('C', (1, 4, 5, 6)),
+            ('D', (2, 7)), ('E', (8, )), ('F', (1, )),
+        ):
+            recipe = Recipe.objects.create(
+                author=author, name=name, text='Описание', cooking_time=10,
+                image=f'static/recipe/{name}.png',
+            )
+            IngredientAmount.objects.bulk_create([
+                IngredientAmount(recipe=recipe,
+                                 ingredient=cls.ingredients[number],
+                                 amount=100)
+                for number in numbers
+            ])
+            cls.recipes[name] = recipe.id
+
+    def setUp(self):
+        # Журнал изменений пишется после фиксации транзакции, в тестах
+        # его нет: индекс строится заново по данным теста.
+        patcher = mock.patch.object(matching, 'index',
+                                    matching.IngredientIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ids(self, *numbers):
+        return [self.ingredients[number].id for number in numbers]
+
+    def test_ranking(self):
+        """
+        Сначала меньше недостающих, затем больше доля совпавших,
+        затем новые рецепты.
+        """
+        results = matching.index.match(self.ids(1, 2, 2))
+        self.assertEqual(results, [
+            (self.recipes['F'], 1, 1), (self.recipes['A'], 2, 2),
+            (self.recipes['B'], 2, 3), (self.recipes['D'], 1, 2),
+            (self.recipes['C'], 1, 4),
+        ])
+        self.assertEqual(
+            [recipe_id for recipe_id, _, _ in matching.index.match(
+                self.ids(1, 2), max_missing=1
+            )],
+            [self.recipes[name] for name in 'FABD'],
+        )
+        self.assertEqual(matching.index.match(self.ids(0)), [])
+
+    def test_endpoint(self):
+        query = '&'.join(f'ingredients={ingredient_id}'
+                         for ingredient_id in self.ids(1, 2))
+        response = self.client.get(
+            f'/api/recipes/match/?{query}&max_missing=1'
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(
+            [(recipe['name'], recipe['ingredients_matched'],
+              recipe['ingredients_missing']) for recipe in data['results']],
+            [('F', 1, 0), ('A', 2, 0), ('B', 2, 1), ('D', 1, 1)],
+        )
+
+    def test_invalid_params(self):
+        for query in ('', 'ingredients=abc', 'ingredients=0',
+                      'ingredients=1&max_missing=-1'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/recipes/match/?{query}')
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,150 @@
+import shutil
+import tempfile
+
+from api import authentication, profiles, reference
+from api.metrics import QueryBudgetExceeded, check_query_budget
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from recipe.models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                           ShoppingCart, Tag)
+from rest_framework.authtoken.models import Token
+from users.models import Subscriptions, User
+
+PIXEL = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+
+STRICT_METRICS = {**settings.REQUEST_METRICS, 'STRICT_BUDGETS': True}
+
+
+@override_settings(REQUEST_METRICS={**STRICT_METRICS, 'QUERY_BUDGETS': {
+    'api:recipe-list': 2,
+    'POST api:recipe-list': 5,
+}})
+class QueryBudgetTest(TestCase):
+    """Бюджеты запросов к БД различают чтение и запись."""
+
+    def test_read_budget(self):
+        check_query_budget('api:recipe-list', 2)
+        with self.assertRaises(QueryBudgetExceeded):
+            check_query_budget('api:recipe-list', 3)
+        with self.assertRaises(QueryBudgetExceeded):
+            check_query_budget('api:recipe-list', 3, 'HEAD')
+
+    def test_write_budget_by_method(self):
+        check_query_budget('api:recipe-list', 5, 'POST')
+        with self.assertRaises(QueryBudgetExceeded):
+            check_query_budget('api:recipe-list', 6, 'POST')
+
+    def test_read_budget_does_not_apply_to_writes(self):
+        check_query_budget('api:recipe-list', 100, 'PATCH')
+
+
+@override_settings(REQUEST_METRICS=STRICT_METRICS)
+class StrictBudgetWriteTest(TestCase):
+    """Запись рецептов проходит со строгими бюджетами из настроек."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Имя', last_name='Фамилия', password='password',
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.tag = Tag.objects.create(name='Завтрак', color='Yellow',
+                                     slug='breakfast')
+        cls.ingredient = Ingredient.objects.create(name='мука',
+                                                   measurement_unit='г')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.client.defaults['HTTP_AUTHORIZATION'] = f'Token {self.token}'
+
+    def test_recipe_create_update_delete(self):
+        payload = {
+            'name': 'Блины', 'text': 'Смешать и пожарить.',
+            'cooking_time': 20, 'image': PIXEL, 'tags': [self.tag.id],
+            'ingredients': [{'id': self.ingredient.id, 'amount': 200}],
+        }
+        response = self.client.post('/api/recipes/', payload,
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        recipe_id = response.json()['id']
+        response = self.client.patch(
+            f'/api/recipes/{recipe_id}/', {**payload, 'cooking_time': 30},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        response = self.client.delete(f'/api/recipes/{recipe_id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Recipe.objects.exists())
+
+
+@override_settings(REQUEST_METRICS=STRICT_METRICS)
+class StrictBudgetReadTest(TestCase):
+    """
+    Список рецептов укладывается в бюджет из настроек и на холодном
+    кэше, как первый запрос после запуска процесса.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Имя', last_name='Фамилия', password='password',
+        )
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            first_name='Имя', last_name='Фамилия', password='password',
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.tag = Tag.objects.create(name='Завтрак', color='Yellow',
+                                     slug='breakfast')
+        ingredient = Ingredient.objects.create(name='мука',
+                                               measurement_unit='г')
+        for number in range(2):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}',
+                text='Описание', cooking_time=10,
+                image=f'static/recipe/{number}.png',
+            )
+            recipe.tags.set([cls.tag])
+            IngredientAmount.objects.create(recipe=recipe,
+                                            ingredient=ingredient, amount=100)
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Subscriptions.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.addCleanup(self.reset)
+
+    def reset(self):
+        for cache in reference.REFERENCE_CACHES.values():
+            cache._state = None
+            cache._checked = None
+        authentication._local_tokens.clear()
+        profiles._local.clear()
+        for alias in settings.CACHES:
+            caches[alias].clear()
+
+    def test_recipe_list_cold(self):
+        urls = (
+            '/api/recipes/',
+            '/api/recipes/?page=2&limit=1',
+            f'/api/recipes/?tags={self.tag.slug}&author={self.author.id}',
+            '/api/recipes/?is_favorited=1&is_in_shopping_cart=1',
+        )
+        for authorization in ({}, {'HTTP_AUTHORIZATION':
+                                   f'Token {self.token}'}):
+            for url in urls:
+                with self.subTest(url=url, auth=bool(authorization)):
+                    self.reset()
+                    response = self.client.get(url, **authorization)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertTrue(response.json()['results'])
@@ -0,0 +1,77 @@
+from api import authentication, profiles, versions
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from users.models import Subscriptions, User
+
+
+class ProfileCacheTest(TestCase):
+    """Кэш профилей сбрасывается через версии в базе, а не в процессе."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = [
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com',
+                first_name='Имя', last_name='Фамилия', password='password',
+            )
+            for name in ('author', 'reader')
+        ]
+
+    def setUp(self):
+        # Версии откатываются вместе с тестом, а кэш процесса - нет.
+        profiles._local.clear()
+        self.client.defaults['HTTP_AUTHORIZATION'] = (
+            f'Token {Token.objects.create(user=self.reader)}'
+        )
+
+    def get_author(self):
+        response = self.client.get(f'/api/users/{self.author.id}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_change_in_another_process(self):
+        self.assertEqual(profiles.get_profile(self.author.id, self.reader.id),
+                         (profiles.get_profile(self.author.id)[0],
+                          frozenset()))
+        # Другой процесс меняет данные; его сигналы меняют только версии.
+        User.objects.filter(id=self.author.id).update(first_name='Новое')
+        Subscriptions.objects.bulk_create([
+            Subscriptions(user=self.reader, author=self.author)
+        ])
+        versions.bump(versions.profile_resource(self.author.id),
+                      versions.user_resource(self.reader.id))
+        row, subscribed_ids = profiles.get_profile(self.author.id,
+                                                   self.reader.id)
+        self.assertEqual(row['first_name'], 'Новое')
+        self.assertEqual(subscribed_ids, {self.author.id})
+
+    def test_read_your_writes(self):
+        self.assertFalse(self.get_author()['is_subscribed'])
+        response = self.client.post(
+            f'/api/users/{self.author.id}/subscribe/'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(self.get_author()['is_subscribed'])
+        self.client.delete(f'/api/users/{self.author.id}/subscribe/')
+        self.assertFalse(self.get_author()['is_subscribed'])
+        self.author.first_name = 'Другое'
+        self.author.save()
+        self.assertEqual(self.get_author()['first_name'], 'Другое')
+
+    def test_me_after_change_in_another_process(self):
+        """
+        ``me`` отдаёт пользователя из кэша токенов процесса: правка
+        в другом процессе видна по версии учётных данных в базе.
+        """
+        authentication._local_tokens.clear()
+        self.assertEqual(self.client.get('/api/users/me/').json()[
+            'first_name'
+        ], 'Имя')
+        User.objects.filter(id=self.reader.id).update(first_name='Новое')
+        versions.bump(versions.profile_resource(self.reader.id),
+                      versions.auth_resource(self.reader.id))
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.json()['first_name'], 'Новое')
+        with self.assertNumQueries(1):
+            self.client.get('/api/users/me/')
@@ -0,0 +1,89 @@
+from api import authentication
+from api.models import ProfileReport
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+
+class ProfilingTest(TestCase):
+    """Профиль снимается только по просьбе сотрудника."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff, cls.user = [
+            User.objects.create_user(
+                username=username, email=f'{username}@example.com',
+                password='password', is_staff=is_staff,
+            )
+            for username, is_staff in (('staff', True), ('user', False))
+        ]
+        cls.tokens = {user: Token.objects.create(user=user)
+                      for user in (cls.staff, cls.user)}
+
+    def setUp(self):
+        authentication._local_tokens.clear()
+        self.addCleanup(authentication._local_tokens.clear)
+
+    def get(self, url, user=None, **extra):
+        if user is not None:
+            extra['HTTP_AUTHORIZATION'] = f'Token {self.tokens[user]}'
+        return self.client.get(url, **extra)
+
+    def assertNotProfiled(self, response):
+        self.assertFalse(response.has_header('X-Profile-Report'))
+        self.assertFalse(ProfileReport.objects.exists())
+
+    def test_staff_request_is_profiled(self):
+        response = self.get('/api/tags/', self.staff, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        report = ProfileReport.objects.get()
+        self.assertEqual((report.user, report.path, report.mode),
+                         (self.staff, '/api/tags/', ProfileReport.CPROFILE))
+        self.assertTrue(response['X-Profile-Report'].endswith(
+            f'/api/profiles/{report.id}/report/'
+        ))
+        response = self.get(f'/api/profiles/{report.id}/report/',
+                            self.staff)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('GET /api/tags/ -> 200', response.content.decode())
+
+    def test_not_staff(self):
+        for user, extra in (
+            (self.user, {'HTTP_X_PROFILE': '1'}),
+            (self.user, {'HTTP_X_PROFILE': 'sample'}),
+            (None, {'HTTP_X_PROFILE': 'cprofile'}),
+        ):
+            for url in ('/api/tags/', '/api/tags/?profile=cprofile'):
+                with self.subTest(user=user, url=url, **extra):
+                    response = self.get(url, user, **extra)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertNotProfiled(response)
+        response = self.get('/api/tags/?profile=1',
+                            HTTP_AUTHORIZATION='Token invalid')
+        self.assertEqual(response.status_code, 401)
+        self.assertNotProfiled(response)
+
+    def test_unknown_mode(self):
+        self.assertNotProfiled(
+            self.get('/api/tags/?profile=perf', self.staff)
+        )
+
+    @override_settings(PROFILING={'ENABLED': False})
+    def test_disabled(self):
+        self.assertNotProfiled(
+            self.get('/api/tags/', self.staff, HTTP_X_PROFILE='1')
+        )
+
+    def test_reports_are_admin_only(self):
+        report = ProfileReport.objects.create(
+            user=self.staff, method='GET', path='/api/tags/',
+            mode=ProfileReport.CPROFILE, status_code=200, duration_ms=1,
+            queries=1, report='отчёт', data=b'',
+        )
+        for url in ('/api/profiles/', f'/api/profiles/{report.id}/',
+                    f'/api/profiles/{report.id}/report/',
+                    f'/api/profiles/{report.id}/data/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.get(url).status_code, 401)
+                self.assertEqual(self.get(url, self.user).status_code, 403)
+                self.assertEqual(self.get(url, self.staff).status_code, 200)
@@ -0,0 +1,92 @@
+from api import reference, versions
+from api.fields import ReferenceRelatedField
+from django.test import TestCase, override_settings
+from recipe.models import Ingredient, Tag
+from rest_framework.exceptions import ValidationError
+
+
+@override_settings(REFERENCE_CACHE={'CHECK_INTERVAL': 60})
+class ReferenceCacheTest(TestCase):
+    """Справочники в памяти процесса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tag = Tag.objects.create(name='Завтрак', color='Yellow',
+                                     slug='breakfast')
+        cls.ingredient = Ingredient.objects.create(
+            name='мука', measurement_unit='г'
+        )
+
+    def setUp(self):
+        # Версии откатываются вместе с транзакцией теста, кэш - нет.
+        self.reset()
+        self.addCleanup(self.reset)
+
+    def reset(self):
+        for cache in reference.REFERENCE_CACHES.values():
+            cache._state = None
+            cache._checked = None
+
+    def create_elsewhere(self):
+        """Тег, созданный другим процессом: кэш здесь не сброшен."""
+        Tag.objects.bulk_create([
+            Tag(name='Ужин', color='Blue', slug='dinner')
+        ])
+        versions.bump(versions.TAGS)
+        return Tag.objects.get(slug='dinner')
+
+    def test_version_checked_once_per_interval(self):
+        reference.tags.get()
+        with self.assertNumQueries(0):
+            reference.tags.get()
+        tag = self.create_elsewhere()
+        self.assertIsNone(reference.get_row(reference.tags, tag.id))
+        reference.tags.invalidate()
+        self.assertIsNotNone(reference.get_row(reference.tags, tag.id))
+
+    @override_settings(REFERENCE_CACHE={'CHECK_INTERVAL': 0})
+    def test_reload_on_version_change(self):
+        reference.tags.get()
+        with self.assertNumQueries(1):
+            reference.tags.get()
+        tag = self.create_elsewhere()
+        self.assertEqual(reference.get_row(reference.tags, tag.id)['slug'],
+                         'dinner')
+
+    def test_get_instance(self):
+        for cache, model, instance in (
+            (reference.tags, Tag, self.tag),
+            (reference.ingredients, Ingredient, self.ingredient),
+        ):
+            with self.subTest(model=model.__name__):
+                loaded = reference.get_instance(cache, model, instance.id)
+                self.assertEqual(loaded.get_deferred_fields(), set())
+                for field in model._meta.concrete_fields:
+                    self.assertEqual(
+                        getattr(loaded, field.attname),
+                        getattr(instance, field.attname),
+                    )
+                self.assertFalse(loaded._state.adding)
+        self.assertIsNone(
+            reference.get_instance(reference.tags, Tag, 'abc')
+        )
+
+    def test_related_field(self):
+        field = ReferenceRelatedField(reference.tags,
+                                      queryset=Tag.objects.all())
+        reference.tags.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(field.to_internal_value(self.tag.id).name,
+                             'Завтрак')
+        for value in (10 ** 6, 'abc', True):
+            with self.subTest(value=value), \
+                    self.assertRaises(ValidationError):
+                field.to_internal_value(value)
+
+    def test_related_field_accepts_new_tag(self):
+        """Тег из другого процесса принимается до CHECK_INTERVAL."""
+        field = ReferenceRelatedField(reference.tags,
+                                      queryset=Tag.objects.all())
+        reference.tags.get()
+        tag = self.create_elsewhere()
+        self.assertEqual(field.to_internal_value(tag.id).slug, 'dinner')
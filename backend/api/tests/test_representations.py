@@ -0,0 +1,220 @@
+import json
+from unittest import skipUnless
+
+from api.representations import (INGREDIENT_FIELDS, RECIPE_FIELDS, TAG_FIELDS,
+                                 USER_FIELDS, ingredient_representation,
+                                 recipe_detail, recipe_representations,
+                                 subscription_representations,
+                                 tag_representation)
+from api.serializers import (IngredientSerializer, RecipeReadSerializer,
+                             SubscriptionsSerializer, TagSerializer)
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.test import TestCase
+from recipe.models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                           ShoppingCart, Tag)
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from users.models import Subscriptions, User
+
+
+def dump(data):
+    """JSON ответа: сравнение учитывает и порядок полей."""
+    return json.dumps(data, ensure_ascii=False)
+
+
+class RepresentationParityTest(TestCase):
+    """
+    Ответы, собранные из ``.values()`` в ``api.representations``,
+    совпадают с ответами сериализаторов побайтно.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [
+            User.objects.create_user(
+                username=f'author{number}',
+                email=f'author{number}@example.com',
+                first_name=f'Имя{number}', last_name=f'Фамилия{number}',
+                password='password',
+            )
+            for number in range(2)
+        ]
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            first_name='Читатель', last_name='Читателев',
+            password='password',
+        )
+        tags = [
+            Tag.objects.create(name='Завтрак', color='Yellow',
+                               slug='breakfast'),
+            Tag.objects.create(name='Обед', color='Green', slug='lunch'),
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (('мука', 'г'), ('молоко', 'мл'),
+                               ('яйца', 'шт.'))
+        ]
+        cls.recipes = []
+        for number in range(5):
+            recipe = Recipe.objects.create(
+                author=cls.authors[number % 2],
+                name=f'Рецепт {number}',
+                text=f'Описание {number}',
+                cooking_time=10 + number,
+                image=f'static/recipe/{number}.png',
+            )
+            recipe.tags.set(tags[:number % 2 + 1])
+            IngredientAmount.objects.bulk_create([
+                IngredientAmount(recipe=recipe, ingredient=ingredient,
+                                 amount=100 * (index + 1))
+                for index, ingredient in enumerate(
+                    ingredients[:number % 3 + 1]
+                )
+            ])
+            cls.recipes.append(recipe)
+        Favorite.objects.create(user=cls.reader, recipe=cls.recipes[0])
+        Favorite.objects.create(user=cls.reader, recipe=cls.recipes[3])
+        ShoppingCart.objects.create(user=cls.reader, recipe=cls.recipes[1])
+        ShoppingCart.objects.create(user=cls.reader, recipe=cls.recipes[3])
+        Subscriptions.objects.create(user=cls.reader, author=cls.authors[0])
+        Subscriptions.objects.create(user=cls.reader, author=cls.authors[1])
+
+    def make_request(self, user, path='/api/recipes/'):
+        request = Request(APIRequestFactory().get(path))
+        request.user = user or AnonymousUser()
+        return request
+
+    def users(self):
+        return (None, self.reader, self.authors[0])
+
+    def test_recipe_list(self):
+        for user in self.users():
+            with self.subTest(user=user):
+                request = self.make_request(user)
+                queryset = Recipe.objects.all()
+                self.assertEqual(
+                    dump(recipe_representations(
+                        queryset.values(*RECIPE_FIELDS), request
+                    )),
+                    dump(RecipeReadSerializer(
+                        queryset, many=True, context={'request': request}
+                    ).data),
+                )
+
+    def test_recipe_detail(self):
+        for user in self.users():
+            for recipe in self.recipes:
+                with self.subTest(user=user, recipe=recipe.id):
+                    request = self.make_request(
+                        user, f'/api/recipes/{recipe.id}/'
+                    )
+                    self.assertEqual(
+                        dump(recipe_detail(
+                            Recipe.objects.filter(pk=recipe.id), request
+                        )),
+                        dump(RecipeReadSerializer(
+                            recipe, context={'request': request}
+                        ).data),
+                    )
+
+    @skipUnless(connection.vendor == 'postgresql',
+                'Одним запросом рецепт собирается только на PostgreSQL.')
+    def test_recipe_detail_postgresql(self):
+        empty = Recipe.objects.create(
+            author=self.authors[0], name='Пустой рецепт', text='Описание',
+            cooking_time=1, image='static/recipe/empty.png',
+        )
+        for user in self.users():
+            for recipe in [*self.recipes, empty]:
+                with self.subTest(user=user, recipe=recipe.id):
+                    request = self.make_request(
+                        user, f'/api/recipes/{recipe.id}/'
+                    )
+                    queryset = Recipe.objects.filter(pk=recipe.id)
+                    with self.assertNumQueries(1):
+                        detail = dump(recipe_detail(queryset, request))
+                    self.assertEqual(detail, dump(RecipeReadSerializer(
+                        recipe, context={'request': request}
+                    ).data))
+                    self.assertEqual(detail, dump(recipe_representations(
+                        queryset.values(*RECIPE_FIELDS), request
+                    )[0]))
+        self.assertIsNone(recipe_detail(
+            Recipe.objects.filter(pk=0), self.make_request(self.reader)
+        ))
+
+    def test_recipe_flags(self):
+        request = self.make_request(self.reader)
+        flags = {
+            recipe['id']: (recipe['is_favorited'],
+                           recipe['is_in_shopping_cart'],
+                           recipe['author']['is_subscribed'])
+            for recipe in recipe_representations(
+                Recipe.objects.values(*RECIPE_FIELDS), request
+            )
+        }
+        self.assertEqual(flags, {
+            self.recipes[0].id: (True, False, True),
+            self.recipes[1].id: (False, True, True),
+            self.recipes[2].id: (False, False, True),
+            self.recipes[3].id: (True, True, True),
+            self.recipes[4].id: (False, False, True),
+        })
+
+    def test_subscriptions(self):
+        queryset = User.objects.filter(subscriptions__user=self.reader)
+        for query in ('', '?recipes_limit=1', '?recipes_limit=2'):
+            with self.subTest(query=query):
+                request = self.make_request(
+                    self.reader, '/api/users/subscriptions/' + query
+                )
+                self.assertEqual(
+                    dump(subscription_representations(
+                        queryset.values(*USER_FIELDS), request
+                    )),
+                    dump(SubscriptionsSerializer(
+                        queryset, many=True, context={'request': request}
+                    ).data),
+                )
+
+    def test_tags(self):
+        queryset = Tag.objects.all()
+        self.assertEqual(
+            dump([tag_representation(row)
+                  for row in queryset.values(*TAG_FIELDS)]),
+            dump(TagSerializer(queryset, many=True).data),
+        )
+
+    def test_ingredients(self):
+        queryset = Ingredient.objects.all()
+        self.assertEqual(
+            dump([ingredient_representation(row)
+                  for row in queryset.values(*INGREDIENT_FIELDS)]),
+            dump(IngredientSerializer(queryset, many=True).data),
+        )
+
+    def test_endpoints(self):
+        """Представления отдают то же, что сериализаторы."""
+        for user in (None, self.reader):
+            if user is not None:
+                self.client.defaults['HTTP_AUTHORIZATION'] = (
+                    f'Token {Token.objects.create(user=user)}'
+                )
+            request = self.make_request(user)
+            with self.subTest(user=user):
+                response = self.client.get(
+                    f'/api/recipes/{self.recipes[3].id}/'
+                )
+                self.assertEqual(
+                    dump(response.json()),
+                    dump(RecipeReadSerializer(
+                        self.recipes[3], context={'request': request}
+                    ).data),
+                )
+                response = self.client.get('/api/tags/')
+                self.assertEqual(
+                    dump(response.json()),
+                    dump(TagSerializer(Tag.objects.all(), many=True).data),
+                )
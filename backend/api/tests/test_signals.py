@@ -0,0 +1,38 @@
+from api import versions
+from api.models import ResourceVersion
+from django.test import TestCase
+from recipe.models import Recipe, Tag
+from users.models import User
+
+
+class RecipeVersionTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = Recipe.objects.create(
+            author=User.objects.create_user(
+                username='author', email='author@example.com',
+                password='password',
+            ),
+            name='Рецепт', text='Описание', cooking_time=10,
+            image='static/recipe/0.png',
+        )
+        cls.tags = [
+            Tag.objects.create(name='Завтрак', color='Yellow',
+                               slug='breakfast'),
+            Tag.objects.create(name='Обед', color='Green', slug='lunch'),
+        ]
+
+    def version(self):
+        return ResourceVersion.objects.get(name=versions.RECIPES).version
+
+    def test_m2m_change_bumps_once(self):
+        """Версия меняется один раз на изменение, а не на pre_ и post_."""
+        self.recipe.tags.add(self.tags[0])
+        before = self.version()
+        self.recipe.tags.add(self.tags[1])
+        self.assertEqual(self.version(), before + 1)
+        self.recipe.tags.remove(self.tags[0])
+        self.assertEqual(self.version(), before + 2)
+        self.recipe.tags.clear()
+        self.assertEqual(self.version(), before + 3)
@@ -0,0 +1,181 @@
+from unittest import mock
+
+from api import jobs
+from api.models import Job
+from django.test import TestCase, override_settings
+from recipe import similarity
+from recipe.models import (Ingredient, IngredientAmount, Recipe,
+                           RecipeSimilarity, Tag)
+from users.models import User
+
+
+class SimilarityData:
+
+    @classmethod
+    def create_recipe(cls, number, ingredients, tags):
+        recipe = Recipe.objects.create(
+            author=cls.author, name=f'Рецепт {number}',
+            text='Описание', cooking_time=10,
+            image=f'static/recipe/{number}.png',
+        )
+        recipe.tags.set([cls.tags[index] for index in tags])
+        IngredientAmount.objects.bulk_create([
+            IngredientAmount(recipe=recipe,
+                             ingredient=cls.ingredients[index], amount=100)
+            for index in ingredients
+        ])
+        return recipe
+
+    def stored(self):
+        return dict(RecipeSimilarity.objects.values_list(
+            'recipe_id', 'neighbors'
+        ))
+
+
+class SimilarityRefreshTest(SimilarityData, TestCase):
+    """Пересчёт изменённых рецептов совпадает с полным расчётом."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Имя', last_name='Фамилия', password='password',
+        )
+        cls.tags = [
+            Tag.objects.create(name='Завтрак', color='Yellow',
+                               slug='breakfast'),
+            Tag.objects.create(name='Обед', color='Green', slug='lunch'),
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(6)
+        ]
+        for number, (ingredients, tags) in enumerate((
+            ((0, 1), (0,)), ((1, 2), (0,)), ((2, 3), (1,)),
+            ((3, 4), (1,)), ((5,), ()),
+        )):
+            cls.create_recipe(number, ingredients, tags)
+        similarity.build()
+
+    def test_new_recipe(self):
+        recipe = self.create_recipe(5, (0, 2), (0,))
+        self.assertEqual(similarity.refresh(), 4)
+        refreshed = self.stored()
+        similarity.build()
+        built = self.stored()
+        self.assertEqual(refreshed[recipe.id], built[recipe.id])
+        for recipe_id, neighbors in built.items():
+            with self.subTest(recipe=recipe_id):
+                self.assertEqual(
+                    dict(refreshed[recipe_id]).get(recipe.id),
+                    dict(neighbors).get(recipe.id),
+                )
+
+    def test_nothing_changed(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(similarity.refresh(), 0)
+
+    @override_settings(RECIPE_SIMILARITY={'BATCH_SIZE': 2})
+    def test_batches(self):
+        expected = self.stored()
+        RecipeSimilarity.objects.update(neighbors=[], changes=3)
+        similarity.build()
+        self.assertEqual(self.stored(), expected)
+        self.assertFalse(RecipeSimilarity.objects.filter(
+            changes__gt=0
+        ).exists())
+
+
+@override_settings(RECIPE_SIMILARITY={'CANDIDATE_SHARE': 0,
+                                      'CANDIDATE_MIN_RECIPES': 3})
+class SimilarityCandidatesTest(SimilarityData, TestCase):
+    """
+    Теги и частые ингредиенты не дают кандидатов: пересчёт касается
+    только рецептов с общим редким ингредиентом.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Имя', last_name='Фамилия', password='password',
+        )
+        cls.tags = [Tag.objects.create(name='Обед', color='Green',
+                                       slug='lunch')]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(4)
+        ]
+        # Ингредиент 0 и тег есть у всех, 1-3 - у пар рецептов.
+        cls.recipes = [
+            cls.create_recipe(number, (0, 1 + number // 2), (0,))
+            for number in range(6)
+        ] + [cls.create_recipe(6, (0,), (0,))]
+        with override_settings(RECIPE_SIMILARITY={
+            'CANDIDATE_SHARE': 0, 'CANDIDATE_MIN_RECIPES': 3,
+        }):
+            similarity.build()
+
+    def test_refresh_touches_rare_neighbours(self):
+        recipe = self.create_recipe(7, (0, 1), (0,))
+        load = similarity.RecipeVectors.load
+        with mock.patch.object(similarity.RecipeVectors, 'load',
+                               side_effect=load) as loaded:
+            before = self.stored()
+            similarity.refresh()
+        # Рецепт 6 без редких ингредиентов: кандидат для всех.
+        expected = {recipe.id, self.recipes[0].id, self.recipes[1].id,
+                    self.recipes[6].id}
+        self.assertEqual(set(loaded.call_args.kwargs['recipe_ids']),
+                         expected)
+        after = self.stored()
+        self.assertEqual(
+            {recipe_id for recipe_id in after
+             if after[recipe_id] != before.get(recipe_id)},
+            expected,
+        )
+        self.assertEqual(
+            [neighbor for neighbor, _ in after[recipe.id]],
+            [self.recipes[1].id, self.recipes[0].id, self.recipes[6].id],
+        )
+
+    def test_common_only_recipe(self):
+        """Рецепт без редких ингредиентов похож на всех с общими."""
+        self.assertEqual(
+            len(self.stored()[self.recipes[6].id]), len(self.recipes) - 1
+        )
+        for recipe in self.recipes[:6]:
+            self.assertEqual(
+                {neighbor for neighbor, _ in self.stored()[recipe.id]},
+                {self.recipes[recipe_index].id for recipe_index in (
+                    self.recipes.index(recipe) ^ 1, 6
+                )},
+            )
+
+
+class ScheduleTest(TestCase):
+
+    @override_settings(JOBS={'SCHEDULE': {'similar_recipes': 300}})
+    def test_enqueue_once_per_interval(self):
+        self.assertEqual(len(jobs.enqueue_scheduled()), 1)
+        self.assertEqual(jobs.enqueue_scheduled(), [])
+        Job.objects.update(status=Job.DONE)
+        self.assertEqual(jobs.enqueue_scheduled(), [])
+        self.assertEqual(Job.objects.filter(kind='similar_recipes').count(),
+                         1)
+
+    def test_task(self):
+        Recipe.objects.create(
+            author=User.objects.create_user(
+                username='author', email='author@example.com',
+                password='password',
+            ),
+            name='Рецепт', text='Описание', cooking_time=10,
+            image='static/recipe/0.png',
+        )
+        job = jobs.enqueue('similar_recipes')
+        name, _, content = jobs.TASKS[job.kind](job)
+        self.assertEqual(name, 'similar_recipes.txt')
+        self.assertIn('пересчитано: 1', content.decode())
@@ -0,0 +1,106 @@
+from api import throttling
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from users.models import User
+
+RATES = {'RATES': {'search': '3/min', 'write': '4/min'},
+         'WRITE_COST_BYTES': 100}
+
+
+@override_settings(THROTTLING=RATES)
+class ThrottlingTest(TestCase):
+
+    def setUp(self):
+        throttling._local_counters._data.clear()
+        self.factory = APIRequestFactory()
+
+    def make_request(self, user=None, remote_addr='10.0.0.2', **extra):
+        request = self.factory.get('/api/ingredients/',
+                                   REMOTE_ADDR=remote_addr, **extra)
+        request.user = user or AnonymousUser()
+        return request
+
+    def consume(self, request, scope='search', cost=1):
+        return throttling.consume(throttling.get_ident(request), scope,
+                                  cost, now=30)
+
+    def test_user_buckets(self):
+        users = [
+            User.objects.create_user(
+                username=f'user{number}',
+                email=f'user{number}@example.com', password='password',
+            )
+            for number in range(2)
+        ]
+        for _ in range(3):
+            self.assertIsNone(self.consume(self.make_request(users[0])))
+        self.assertIsNotNone(self.consume(self.make_request(users[0])))
+        # Пользователь с того же адреса считается отдельно.
+        self.assertIsNone(self.consume(self.make_request(users[1])))
+        self.assertIsNone(self.consume(self.make_request()))
+
+    def test_ip_buckets(self):
+        for _ in range(3):
+            self.assertIsNone(self.consume(self.make_request(
+                HTTP_X_FORWARDED_FOR='203.0.113.1'
+            )))
+        self.assertIsNotNone(self.consume(self.make_request(
+            HTTP_X_FORWARDED_FOR='203.0.113.1'
+        )))
+        self.assertIsNone(self.consume(self.make_request(
+            HTTP_X_FORWARDED_FOR='203.0.113.2'
+        )))
+
+    def test_spoofed_forwarded_for(self):
+        """Адрес, подставленный клиентом, не даёт нового лимита."""
+        idents = {
+            throttling.get_ident(self.make_request(
+                HTTP_X_FORWARDED_FOR=f'198.51.100.{number}, 203.0.113.1'
+            ))
+            for number in range(5)
+        }
+        self.assertEqual(idents, {'ip:203.0.113.1'})
+        for number in range(3):
+            self.assertIsNone(self.consume(self.make_request(
+                HTTP_X_FORWARDED_FOR=f'198.51.100.{number}, 203.0.113.1'
+            )))
+        self.assertIsNotNone(self.consume(self.make_request(
+            HTTP_X_FORWARDED_FOR='198.51.100.9, 203.0.113.1'
+        )))
+
+    def test_cost(self):
+        request = self.make_request()
+        self.assertIsNone(self.consume(request, 'write', cost=3))
+        self.assertIsNotNone(self.consume(request, 'write', cost=2))
+        # Отклонённый запрос не расходует лимит.
+        self.assertIsNone(self.consume(request, 'write', cost=1))
+        self.assertIsNotNone(self.consume(request, 'write', cost=1))
+
+    def test_cost_above_limit(self):
+        self.assertEqual(self.consume(self.make_request(), 'write', 5), 60)
+
+    def test_body_cost(self):
+        for length, cost in ((None, 1), (99, 1), (100, 2), (250, 3)):
+            extra = {} if length is None else {'CONTENT_LENGTH': str(length)}
+            with self.subTest(length=length):
+                self.assertEqual(
+                    throttling.body_cost(self.make_request(**extra)), cost
+                )
+
+    def test_endpoint(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(
+                '/api/ingredients/', REMOTE_ADDR='10.0.0.3',
+                HTTP_X_FORWARDED_FOR='203.0.113.5',
+            ).status_code, 200)
+        response = self.client.get(
+            '/api/ingredients/', REMOTE_ADDR='10.0.0.3',
+            HTTP_X_FORWARDED_FOR='198.51.100.1, 203.0.113.5',
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.client.get(
+            '/api/ingredients/', REMOTE_ADDR='10.0.0.3',
+            HTTP_X_FORWARDED_FOR='203.0.113.6',
+        ).status_code, 200)
@@ -0,0 +1,87 @@
+from api.utils import shopping_list
+from django.test import SimpleTestCase, TestCase
+from recipe.models import Ingredient, IngredientAmount, Recipe, ShoppingCart
+from recipe.units import aggregate, format_amount
+from users.models import User
+
+
+class AggregateTest(SimpleTestCase):
+    """Сведение количеств в список покупок."""
+
+    def test_convertible_units(self):
+        for rows, expected in (
+            ([('мука', 'г', 500), ('мука', 'кг', 1)],
+             [('мука', '1.5', 'кг')]),
+            ([('молоко', 'ст. л.', 2), ('молоко', 'стакан', 1)],
+             [('молоко', '280', 'мл')]),
+            ([('масло', 'мл', 100), ('масло', 'ч. л.', 1)],
+             [('масло', '105', 'мл')]),
+            ([('вода', 'л', 1), ('вода', 'стакан', 2)],
+             [('вода', '1.5', 'л')]),
+        ):
+            with self.subTest(rows=rows):
+                self.assertEqual(aggregate(rows), expected)
+
+    def test_single_unit_is_not_converted(self):
+        self.assertEqual(aggregate([('сахар', 'г', 1500)]),
+                         [('сахар', '1500', 'г')])
+        self.assertEqual(aggregate([('сахар', 'ст. л.', 3)]),
+                         [('сахар', '3', 'ст. л.')])
+
+    def test_incompatible_units_stay_separate(self):
+        self.assertEqual(
+            aggregate([('яйца', 'шт.', 2), ('яйца', 'г', 100),
+                       ('соль', 'по вкусу', 1), ('соль', 'г', 5),
+                       ('соль', 'щепотка', 2)]),
+            [('соль', '5', 'г'), ('соль', '1', 'по вкусу'),
+             ('соль', '2', 'щепотка'), ('яйца', '100', 'г'),
+             ('яйца', '2', 'шт.')],
+        )
+
+    def test_names_and_order(self):
+        self.assertEqual(
+            aggregate([('Сахар ', 'г', 100), ('мука', 'г', 200),
+                       ('сахар', 'кг', 1)]),
+            [('мука', '200', 'г'), ('Сахар', '1.1', 'кг')],
+        )
+        self.assertEqual(aggregate([]), [])
+
+    def test_rounding(self):
+        self.assertEqual(aggregate([('мука', 'кг', 1), ('мука', 'г', 333)]),
+                         [('мука', '1.33', 'кг')])
+        for amount, expected in ((2.0, '2'), (1.5, '1.5'), (0.333, '0.33'),
+                                 (1000, '1000')):
+            with self.subTest(amount=amount):
+                self.assertEqual(format_amount(amount), expected)
+
+
+class ShoppingListTest(TestCase):
+    """Список покупок пользователя из базы."""
+
+    def test_shopping_list(self):
+        user = User.objects.create_user(
+            username='user', email='user@example.com', password='password',
+        )
+        ingredients = {
+            (name, unit): Ingredient.objects.create(name=name,
+                                                    measurement_unit=unit)
+            for name, unit in (('мука', 'г'), ('мука', 'кг'),
+                               ('соль', 'по вкусу'))
+        }
+        for number, amounts in enumerate((
+            {('мука', 'г'): 300, ('соль', 'по вкусу'): 1},
+            {('мука', 'г'): 200, ('мука', 'кг'): 1},
+        )):
+            recipe = Recipe.objects.create(
+                author=user, name=f'Рецепт {number}', text='Описание',
+                cooking_time=10, image=f'static/recipe/{number}.png',
+            )
+            IngredientAmount.objects.bulk_create([
+                IngredientAmount(recipe=recipe, ingredient=ingredients[key],
+                                 amount=amount)
+                for key, amount in amounts.items()
+            ])
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+        self.assertEqual(shopping_list(user), [
+            ('мука', '1.5', 'кг'), ('соль', '1', 'по вкусу'),
+        ])
@@ -0,0 +1,189 @@
+import threading
+from math import ceil, floor
+from time import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+DEFAULT_THROTTLING = {
+    # Лимиты по классам стоимости: "число единиц/период".
+    'RATES': {
+        'export': '10/min',
+        'search': '120/min',
+        'write': '60/min',
+    },
+    # Псевдоним общего кэша из CACHES. Без него счётчики хранятся
+    # в памяти процесса и лимит действует на каждый процесс отдельно.
+    'CACHE': None,
+    # Сколько счётчиков держать в памяти процесса.
+    'MAX_KEYS': 100000,
+    # Тело запроса на запись стоит единицу за каждые столько байт.
+    'WRITE_COST_BYTES': 512 * 1024,
+}
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def get_config():
+    return {**DEFAULT_THROTTLING, **getattr(settings, 'THROTTLING', {})}
+
+
+def parse_rate(rate):
+    """``'10/min'`` -> ``(10, 60)``, как в ``SimpleRateThrottle``."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class LocalCounters:
+    """Счётчики с временем жизни в памяти процесса."""
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time()
+        with self._lock:
+            return {key: value for key, (value, expires) in (
+                (key, self._data.get(key, (0, 0))) for key in keys
+            ) if expires > now}
+
+    def incr(self, key, amount, timeout):
+        now = time()
+        with self._lock:
+            value, expires = self._data.get(key, (0, 0))
+            if expires <= now:
+                value, expires = 0, now + timeout
+            self._data[key] = (value + amount, expires)
+            if len(self._data) > self.max_keys:
+                self._purge(now)
+            return value + amount
+
+    def _purge(self, now):
+        self._data = {key: item for key, item in self._data.items()
+                      if item[1] > now}
+        while len(self._data) > self.max_keys:
+            self._data.pop(next(iter(self._data)))
+
+
+class CacheCounters:
+    """Счётчики в общем кэше Django, атомарные за счёт ``incr``."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+    def incr(self, key, amount, timeout):
+        self.cache.add(key, 0, timeout)
+        try:
+            return self.cache.incr(key, amount)
+        except ValueError:
+            # Ключ истёк между add и incr.
+            self.cache.add(key, amount, timeout)
+            return amount
+
+
+_local_counters = LocalCounters(get_config()['MAX_KEYS'])
+
+
+def get_counters():
+    alias = get_config()['CACHE']
+    if alias:
+        return CacheCounters(caches[alias])
+    return _local_counters
+
+
+def consume(ident, scope, cost=1, now=None):
+    """
+    Списывает ``cost`` единиц из лимита ``scope`` для клиента ``ident``.
+
+    Скользящее окно оценивается по двум фиксированным: счётчик прошлого
+    окна берётся с весом непрошедшей его доли. На клиента и класс
+    хранится два числа, а не история запросов. Возвращает ``None``, если
+    запрос разрешён, иначе - сколько секунд подождать.
+    """
+    rate = get_config()['RATES'].get(scope)
+    if rate is None:
+        return None
+    limit, duration = parse_rate(rate)
+    now = time() if now is None else now
+    window = floor(now / duration)
+    current_key = f'throttle:{scope}:{ident}:{window}'
+    previous_key = f'throttle:{scope}:{ident}:{window - 1}'
+    counters = get_counters()
+    previous = counters.get_many([previous_key]).get(previous_key, 0)
+    weight = 1 - (now / duration - window)
+    current = counters.incr(current_key, cost, duration * 2)
+    if current + previous * weight <= limit:
+        return None
+    # Отклонённый запрос не расходует лимит.
+    counters.incr(current_key, -cost, duration * 2)
+    if cost > limit:
+        return duration
+    if previous:
+        # Через сколько вес прошлого окна упадёт настолько, чтобы
+        # запрос поместился; иначе - до начала следующего окна.
+        excess = current + previous * weight - limit
+        wait = excess / previous * duration
+        if wait <= (window + 1) * duration - now:
+            return ceil(wait)
+    return ceil((window + 1) * duration - now)
+
+
+def get_ident(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return 'ip:' + BaseThrottle().get_ident(request)
+
+
+def check(request, scope, cost=1):
+    """Проверка лимита вне DRF-представлений: исключение ``Throttled``."""
+    wait = consume(get_ident(request), scope, cost)
+    if wait is not None:
+        raise Throttled(wait)
+
+
+def body_cost(request):
+    """Стоимость записи по размеру тела: большие картинки дороже."""
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    return 1 + length // get_config()['WRITE_COST_BYTES']
+
+
+class CostThrottle(BaseThrottle):
+    """
+    Лимит по классу стоимости действия. Класс задаётся атрибутом
+    представления ``throttle_scopes`` (действие -> класс) или
+    ``throttle_scope``; стоимость запроса - методом представления
+    ``get_throttle_cost(request)``, по умолчанию единица.
+    Действия без класса не ограничиваются.
+    """
+
+    def get_scope(self, view):
+        scopes = getattr(view, 'throttle_scopes', {})
+        action = getattr(view, 'action', None)
+        if action in scopes:
+            return scopes[action]
+        return getattr(view, 'throttle_scope', None)
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(view)
+        self.wait_time = None
+        if scope is None:
+            return True
+        cost = 1
+        if hasattr(view, 'get_throttle_cost'):
+            cost = view.get_throttle_cost(request)
+        self.wait_time = consume(get_ident(request), scope, cost)
+        return self.wait_time is None
+
+    def wait(self):
+        return self.wait_time
@@ -1,18 +1,34 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
-                    TagViewSet)
+from . import async_views
+from .metrics import metrics_view
+from .views import (CustomUserViewSet, IngredientViewSet, JobViewSet,
+                    ProfileReportViewSet, RecipeViewSet, TagViewSet)
 
 app_name = 'api'
 router_v1 = DefaultRouter()
 router_v1.register('ingredients', IngredientViewSet)
+router_v1.register('jobs', JobViewSet, basename='job')
+router_v1.register('profiles', ProfileReportViewSet, basename='profile')
 router_v1.register('recipes', RecipeViewSet)
 router_v1.register('tags', TagViewSet)
 router_v1.register('users', CustomUserViewSet)
 
+async_urlpatterns = [
+    path('ingredients/', async_views.async_ingredient_list,
+         name='async-ingredient-list'),
+    path('tags/', async_views.async_tag_list, name='async-tag-list'),
+    path('recipes/', async_views.async_recipe_list,
+         name='async-recipe-list'),
+    path('recipes/<int:pk>/', async_views.async_recipe_detail,
+         name='async-recipe-detail'),
+]
+
 
 urlpatterns = [
+    path('async/', include(async_urlpatterns)),
+    path('metrics/', metrics_view, name='metrics'),
     path('', include(router_v1.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
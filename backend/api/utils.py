@@ -1,39 +1,70 @@
 from io import BytesIO
 
-from django.http import FileResponse
+from django.db.models import Sum
+from django.http import FileResponse, HttpResponse
 from recipe.models import IngredientAmount
+from recipe.units import aggregate
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfgen import canvas
 
+SHOPPING_LIST_TITLE = 'Список покупок'
 
-def download_shopping_list(request):
-    ingredients = IngredientAmount.objects.filter(
-        recipe__purchases__user=request.user).values_list(
-        'ingredient__name', 'ingredient__measurement_unit',
-        'amount')
-    shopping_list = {}
-    for item in ingredients:
-        name = item[0]
-        if name not in shopping_list:
-            shopping_list[name] = {
-                'measurement_unit': item[1],
-                'amount': item[2]}
-        else:
-            shopping_list[name]['amount'] += item[2]
-    height = 700
+
+def shopping_list(user):
+    """
+    Сводный список покупок пользователя: ``(название, количество,
+    единица)``. Одинаковые пары ингредиент-единица суммирует база,
+    разные единицы одного ингредиента сводит ``aggregate``.
+    """
+    return aggregate(IngredientAmount.objects.filter(
+        recipe__purchases__user=user
+    ).values_list(
+        'ingredient__name', 'ingredient__measurement_unit'
+    ).annotate(total=Sum('amount')).order_by())
+
+
+def shopping_list_lines(items):
+    return [f'<{i}> {name} - {amount}, {unit}'
+            for i, (name, amount, unit) in enumerate(items, 1)]
+
+
+def shopping_list_text(items):
+    return '\n'.join([SHOPPING_LIST_TITLE, *shopping_list_lines(items)])
+
+
+def shopping_list_pdf(items):
     buffer = BytesIO()
     pdfmetrics.registerFont(TTFont('FreeSans', 'fonts/FreeSans.ttf'))
     page = canvas.Canvas(buffer)
     page.setFont('FreeSans', 13)
-    page.drawString(200, 800, "Список покупок")
-    for i, (name, data) in enumerate(shopping_list.items(), 1):
-        page.drawString(75, height, (f"<{i}> {name} - {data['amount']}, "
-                                     f"{data['measurement_unit']}"))
+    page.drawString(200, 800, SHOPPING_LIST_TITLE)
+    height = 700
+    for line in shopping_list_lines(items):
+        if height < 50:
+            page.showPage()
+            page.setFont('FreeSans', 13)
+            height = 800
+        page.drawString(75, height, line)
         height -= 25
     page.showPage()
     page.save()
     buffer.seek(0)
+    return buffer
+
+
+def download_shopping_list(request):
+    items = shopping_list(request.user)
+    if request.query_params.get('export') == 'txt':
+        response = HttpResponse(
+            shopping_list_text(items),
+            content_type='text/plain; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="shopping_list.txt"'
+        )
+        return response
     return FileResponse(
-        buffer, as_attachment=True, filename='shopping_list.pdf'
+        shopping_list_pdf(items), as_attachment=True,
+        filename='shopping_list.pdf'
     )
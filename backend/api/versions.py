@@ -0,0 +1,45 @@
+from api.models import ResourceVersion
+from django.db.models import F
+from django.utils import timezone
+
+RECIPES = 'recipes'
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+USERS = 'users'
+
+
+def user_resource(user_id):
+    """Ресурс с отношениями пользователя: избранное, корзина, подписки."""
+    return f'user:{user_id}'
+
+
+def profile_resource(user_id):
+    """Поля профиля пользователя."""
+    return f'profile:{user_id}'
+
+
+def auth_resource(user_id):
+    """Токены и учётные данные пользователя для кэша аутентификации."""
+    return f'auth:{user_id}'
+
+
+def bump(*names):
+    """Увеличивает версии переданных ресурсов."""
+    now = timezone.now()
+    for name in names:
+        if not ResourceVersion.objects.filter(name=name).update(
+            version=F('version') + 1, updated=now
+        ):
+            ResourceVersion.objects.get_or_create(
+                name=name, defaults={'version': 1, 'updated': now}
+            )
+
+
+def get_versions(names):
+    """Словарь ``имя -> (версия, время изменения)`` одним запросом."""
+    versions = {name: (0, None) for name in names}
+    for name, version, updated in ResourceVersion.objects.filter(
+        name__in=names
+    ).values_list('name', 'version', 'updated'):
+        versions[name] = (version, updated)
+    return versions
@@ -1,21 +1,40 @@
+from urllib.parse import urlencode
+
+from api import jobs, matching, profiles, reference, snapshots
+from api.conditional import conditional_get
 from api.filters import IngredientFilter, RecipeFilter
+from api.models import Job, ProfileReport
 from api.pagination import CustomPageNumberPagination
 from api.permissions import AuthorAdminPermission, IsAdminOrReadOnly
-from api.serializers import (IngredientSerializer, RecipeCreateSerializer,
-                             RecipeReadSerializer, RecipeShortSerializer,
-                             SubscriptionsSerializer, TagSerializer,
-                             UserSerializer)
+from api.representations import (RECIPE_FIELDS, USER_FIELDS,
+                                 ingredient_representation, instance_row,
+                                 recipe_detail, recipe_representations,
+                                 subscription_representations,
+                                 tag_representation, user_representation)
+from api.serializers import (IngredientSerializer, JobSerializer,
+                             ProfileReportSerializer, RecipeCreateSerializer,
+                             RecipeMatchSerializer, RecipeReadSerializer,
+                             RecipeShortSerializer, SubscriptionsSerializer,
+                             TagSerializer, UserSerializer)
+from api.throttling import body_cost
 from api.utils import download_shopping_list
+from api.versions import INGREDIENTS, RECIPES, TAGS, USERS
+from django.db.models import Exists, OuterRef, Value
+from django.http import HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
+from recipe import feed, similarity
 from recipe.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.generics import get_object_or_404
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from users.models import Subscriptions, User
 
+FEED_MAX_LIMIT = 100
+
 
 class CustomUserViewSet(UserViewSet):
     """Кастомный вьюсет для работы с пользователями."""
@@ -24,6 +43,50 @@ class CustomUserViewSet(UserViewSet):
     serializer_class = UserSerializer
     pagination_class = CustomPageNumberPagination
 
+    def list(self, request, *args, **kwargs):
+        """Флаг подписки вычисляется в том же запросе, что и страница."""
+        is_subscribed = Value(False)
+        if request.user.is_authenticated:
+            is_subscribed = Exists(Subscriptions.objects.filter(
+                user=request.user, author=OuterRef('pk')
+            ))
+        page = self.paginate_queryset(
+            self.get_queryset().order_by('id').annotate(
+                is_subscribed=is_subscribed
+            ).values(*USER_FIELDS, 'is_subscribed')
+        )
+        return self.get_paginated_response(page)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Профиль и подписки читающего берутся из ``api.profiles``."""
+        if self.action == 'me':
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            user_id = int(kwargs[self.lookup_field])
+        except ValueError:
+            raise NotFound
+        viewer_id = None
+        if request.user.is_authenticated and request.user.id != user_id:
+            viewer_id = request.user.id
+        row, subscribed_ids = profiles.get_profile(user_id, viewer_id)
+        if row is None:
+            raise NotFound
+        return Response(user_representation(row, subscribed_ids))
+
+    @action(['get', 'put', 'patch', 'delete'], detail=False)
+    def me(self, request, *args, **kwargs):
+        """
+        Свой профиль берётся из уже загруженного пользователя, на себя
+        подписаться нельзя. Пользователь из кэша токенов сверен с версией
+        учётных данных, которую меняет и правка профиля, поэтому GET
+        обходится одним запросом этой сверки.
+        """
+        if request.method == 'GET' and request.user.is_authenticated:
+            return Response(user_representation(
+                instance_row(request.user, USER_FIELDS), frozenset()
+            ))
+        return super().me(request, *args, **kwargs)
+
     @action(
             methods=['get'],
             permission_classes=(IsAuthenticated, ),
@@ -31,18 +94,16 @@ class CustomUserViewSet(UserViewSet):
             url_path='subscriptions',
 
         )
+    @conditional_get(RECIPES, USERS, per_user=True)
     def subscriptions(self, request):
         """Получение списка подписок."""
         queryset = User.objects.filter(
             subscriptions__user=request.user
         )
-        page = self.paginate_queryset(queryset)
-        serializer = SubscriptionsSerializer(
-                page,
-                many=True,
-                context={'request': request}
+        page = self.paginate_queryset(queryset.values(*USER_FIELDS))
+        return self.get_paginated_response(
+            subscription_representations(page, request)
         )
-        return self.get_paginated_response(serializer.data)
 
     @action(
         methods=['post', 'delete'],
@@ -85,6 +146,19 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     permission_classes = (IsAdminOrReadOnly, )
 
+    @conditional_get(TAGS, cached=True)
+    def list(self, request, *args, **kwargs):
+        return Response([
+            tag_representation(row) for row in reference.tags.get()['rows']
+        ])
+
+    @conditional_get(TAGS, cached=True)
+    def retrieve(self, request, *args, **kwargs):
+        row = reference.get_row(reference.tags, kwargs['pk'])
+        if row is None:
+            raise NotFound
+        return Response(tag_representation(row))
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     """Вывод игредиентов."""
@@ -93,6 +167,31 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     permission_classes = (IsAdminOrReadOnly, )
     filterset_class = IngredientFilter
+    throttle_scopes = {'list': 'search'}
+
+    @conditional_get(INGREDIENTS, cached=True)
+    def list(self, request, *args, **kwargs):
+        return Response([
+            ingredient_representation(row)
+            for row in reference.search_ingredients(
+                request.query_params.get('name')
+            )
+        ])
+
+    @conditional_get(INGREDIENTS, cached=True)
+    def retrieve(self, request, *args, **kwargs):
+        row = reference.get_row(reference.ingredients, kwargs['pk'])
+        if row is None:
+            raise NotFound
+        return Response(ingredient_representation(row))
+
+    @action(detail=False)
+    def snapshot(self, request):
+        """
+        Весь справочник одним сжатым файлом с сильным ETag: клиент
+        скачивает его один раз и ищет ингредиенты у себя.
+        """
+        return snapshots.snapshot_response(request, snapshots.ingredients)
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -104,6 +203,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     pagination_class = CustomPageNumberPagination
+    throttle_scopes = {
+        'create': 'write',
+        'update': 'write',
+        'partial_update': 'write',
+        'download_shopping_cart': 'export',
+    }
 
     def get_serializer_class(self):
         """Определение класса сериализатора в зависимости от запроса."""
@@ -111,6 +216,32 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return RecipeReadSerializer
         return RecipeCreateSerializer
 
+    def get_throttle_cost(self, request):
+        if self.throttle_scopes.get(self.action) == 'write':
+            return body_cost(request)
+        return 1
+
+    @conditional_get(RECIPES, TAGS, INGREDIENTS, USERS, per_user=True)
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.values(*RECIPE_FIELDS))
+        return self.get_paginated_response(
+            recipe_representations(page, request)
+        )
+
+    @conditional_get(RECIPES, TAGS, INGREDIENTS, USERS, per_user=True)
+    def retrieve(self, request, *args, **kwargs):
+        # На чтение объектные права не ограничивают доступ, поэтому
+        # объект не загружается отдельно от ответа.
+        try:
+            pk = int(kwargs[self.lookup_field])
+        except ValueError:
+            raise NotFound
+        data = recipe_detail(self.get_queryset().filter(pk=pk), request)
+        if data is None:
+            raise NotFound
+        return Response(data)
+
     def add_recipe(self, model, request, recipe_id):
         """Метод добавления рецепта."""
         user = request.user
@@ -156,8 +287,163 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return self.add_recipe(ShoppingCart, request, pk)
         return self.delete_recipe(ShoppingCart, request, pk)
 
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """
+        Похожие рецепты из заранее рассчитанного списка
+        (``build_similar_recipes``), без расчёта сходства в запросе.
+        """
+        recipe = self.get_object()
+        neighbors = similarity.get_similar(recipe.id)
+        rows = {
+            row['id']: row for row in Recipe.objects.filter(
+                id__in=[recipe_id for recipe_id, _ in neighbors]
+            ).values(*RECIPE_FIELDS)
+        }
+        neighbors = [neighbor for neighbor in neighbors
+                     if neighbor[0] in rows]
+        data = recipe_representations(
+            [rows[recipe_id] for recipe_id, _ in neighbors], request
+        )
+        for recipe, (_, score) in zip(data, neighbors):
+            recipe['similarity'] = score
+        return Response(data)
+
+    @action(detail=False,
+            methods=['get'],
+            permission_classes=(IsAuthenticated, ))
+    def feed(self, request):
+        """
+        Лента рецептов авторов из подписок, от новых к старым.
+        Следующая страница - по курсору из ``next``.
+        """
+        cursor = request.query_params.get('cursor')
+        try:
+            cursor = feed.decode_cursor(cursor) if cursor else None
+            limit = int(request.query_params.get(
+                'limit', self.pagination_class.page_size
+            ))
+        except ValueError as error:
+            raise ValidationError({'detail': str(error)})
+        limit = max(1, min(limit, FEED_MAX_LIMIT))
+        items, next_cursor = feed.page(request.user, cursor, limit)
+        rows = {
+            row['id']: row for row in Recipe.objects.filter(
+                id__in=[recipe_id for recipe_id, _ in items]
+            ).values(*RECIPE_FIELDS)
+        }
+        return Response({
+            'next': request.build_absolute_uri(
+                request.path + '?' + urlencode(
+                    {'cursor': next_cursor, 'limit': limit}
+                )
+            ) if next_cursor else None,
+            'results': recipe_representations(
+                [rows[recipe_id] for recipe_id, _ in items
+                 if recipe_id in rows],
+                request
+            ),
+        })
+
+    @action(detail=False, methods=['get'])
+    def match(self, request):
+        """
+        Рецепты, которые можно приготовить из переданных ингредиентов,
+        по возрастанию числа недостающих:
+        ``?ingredients=1&ingredients=2&max_missing=0``.
+        """
+        params = RecipeMatchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        page = self.paginate_queryset(matching.index.match(
+            params.validated_data['ingredients'],
+            params.validated_data.get('max_missing'),
+        ))
+        rows = {
+            row['id']: row for row in Recipe.objects.filter(
+                id__in=[recipe_id for recipe_id, _, _ in page]
+            ).values(*RECIPE_FIELDS)
+        }
+        page = [result for result in page if result[0] in rows]
+        data = recipe_representations(
+            [rows[recipe_id] for recipe_id, _, _ in page], request
+        )
+        for recipe, (_, matched, total) in zip(data, page):
+            recipe['ingredients_matched'] = matched
+            recipe['ingredients_missing'] = total - matched
+        return self.get_paginated_response(data)
+
     @action(detail=False,
             methods=['get'],
             permission_classes=(IsAuthenticated, ))
     def download_shopping_cart(self, request):
+        """
+        С ``?background=1`` список собирается фоновой задачей: ответ 202
+        со статусом задачи, готовый файл - по ссылке ``result``.
+        """
+        if request.query_params.get('background'):
+            job = jobs.enqueue('shopping_list', request.user, {
+                'export': request.query_params.get('export', 'pdf')
+            })
+            serializer = JobSerializer(job, context={'request': request})
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         return download_shopping_list(request)
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Фоновые задачи текущего пользователя."""
+
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated, )
+    pagination_class = CustomPageNumberPagination
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user).defer('result')
+
+    @action(detail=True, methods=['get'])
+    def result(self, request, pk=None):
+        job = get_object_or_404(
+            Job.objects.filter(user=request.user, status=Job.DONE), pk=pk
+        )
+        response = HttpResponse(bytes(job.result),
+                                content_type=job.content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="{job.result_name}"'
+        )
+        return response
+
+
+class ProfileReportViewSet(viewsets.ReadOnlyModelViewSet):
+    """Профили запросов, снятые ``ProfilingMiddleware``."""
+
+    serializer_class = ProfileReportSerializer
+    permission_classes = (IsAdminUser, )
+    pagination_class = CustomPageNumberPagination
+    queryset = ProfileReport.objects.defer('report', 'data')
+
+    @action(detail=True, methods=['get'])
+    def report(self, request, pk=None):
+        """Текстовый отчёт: профиль и планы запросов к БД."""
+        profile = get_object_or_404(ProfileReport, pk=pk)
+        response = HttpResponse(profile.report,
+                                content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = (
+            f'attachment; filename="profile-{profile.id}.txt"'
+        )
+        return response
+
+    @action(detail=True, methods=['get'])
+    def data(self, request, pk=None):
+        """
+        Исходные данные: статистика cProfile для ``pstats`` и snakeviz
+        или свёрнутые стеки сэмплера для flamegraph.
+        """
+        profile = get_object_or_404(ProfileReport, pk=pk)
+        extension = 'prof' if profile.mode == ProfileReport.CPROFILE else (
+            'folded'
+        )
+        response = HttpResponse(bytes(profile.data),
+                                content_type='application/octet-stream')
+        response['Content-Disposition'] = (
+            f'attachment; filename="profile-{profile.id}.{extension}"'
+        )
+        return response
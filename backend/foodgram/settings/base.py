@@ -45,11 +45,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.CompressionMiddleware',
+    'api.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -139,9 +143,108 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.getenv('TOKEN_AUTH_CACHE_SIZE', default=10000)),
+    'TIMEOUT': int(os.getenv('TOKEN_AUTH_CACHE_TIMEOUT', default=60)),
+    'CACHE': os.getenv('TOKEN_AUTH_SHARED_CACHE'),
+}
+PROFILE_CACHE = {
+    'TIMEOUT': int(os.getenv('PROFILE_CACHE_TIMEOUT', default=30)),
+    'CACHE': os.getenv('PROFILE_SHARED_CACHE'),
+}
+REFERENCE_CACHE = {
+    'CHECK_INTERVAL': int(os.getenv('REFERENCE_CACHE_CHECK_INTERVAL',
+                                    default=5)),
+}
+
+RECIPE_MATCHING = {
+    'CHECK_INTERVAL': int(os.getenv('RECIPE_MATCHING_CHECK_INTERVAL',
+                                    default=5)),
+    'RETENTION': int(os.getenv('RECIPE_MATCHING_RETENTION', default=3600)),
+}
+
+RECIPE_SIMILARITY = {
+    'NEIGHBORS': int(os.getenv('SIMILAR_RECIPES', default=10)),
+    'TAG_WEIGHT': float(os.getenv('SIMILAR_RECIPES_TAG_WEIGHT',
+                                  default=0.5)),
+    'CANDIDATE_SHARE': float(os.getenv('SIMILAR_RECIPES_CANDIDATE_SHARE',
+                                       default=0.02)),
+}
+
+RECIPE_FEED = {
+    'FANOUT_LIMIT': int(os.getenv('FEED_FANOUT_LIMIT', default=1000)),
+    'BACKFILL': int(os.getenv('FEED_BACKFILL', default=50)),
+}
+
+JOBS = {
+    'PROCESSES': int(os.getenv('JOB_WORKER_PROCESSES', default=2)),
+    'TIMEOUT': int(os.getenv('JOB_TIMEOUT', default=600)),
+    'RETENTION': int(os.getenv('JOB_RETENTION', default=86400)),
+    'SCHEDULE': {
+        'similar_recipes': int(
+            os.getenv('SIMILAR_RECIPES_REFRESH_INTERVAL', default=300)
+        ),
+        'similar_recipes_build': int(
+            os.getenv('SIMILAR_RECIPES_BUILD_INTERVAL', default=86400)
+        ),
+    },
+}
+
+COMPRESSION = {
+    'ENABLED': os.getenv('COMPRESSION_ENABLED', default='1') == '1',
+    'MIN_SIZE': int(os.getenv('COMPRESSION_MIN_SIZE', default=1024)),
+}
+
+# Потоки, в которых асинхронные представления работают с ORM.
+ASYNC_DB_THREADS = int(os.getenv('ASYNC_DB_THREADS', default=8))
+
+PROFILING = {
+    'ENABLED': os.getenv('PROFILING_ENABLED', default='1') == '1',
+    'RETENTION': int(os.getenv('PROFILING_RETENTION', default=7 * 86400)),
+}
+
+REQUEST_METRICS = {
+    'ENABLED': os.getenv('REQUEST_METRICS_ENABLED', default='1') == '1',
+    'STRICT_BUDGETS': os.getenv('QUERY_BUDGETS_STRICT') == '1',
+    # Ключ без метода - бюджет чтения (GET, HEAD, OPTIONS); бюджет
+    # записи задаётся с методом: 'POST api:recipe-list'. Бюджеты
+    # чтения считаны на холодном кэше: первый запрос после запуска
+    # процесса ещё загружает справочники и версии.
+    'QUERY_BUDGETS': {
+        'api:recipe-list': 13,
+        'api:recipe-detail': 10,
+        'api:recipe-match': 11,
+        'api:recipe-similar': 10,
+        'api:recipe-feed': 12,
+        'api:job-list': 4,
+        'api:job-detail': 3,
+        'api:job-result': 3,
+        'api:tag-list': 3,
+        'api:tag-detail': 3,
+        'api:ingredient-list': 3,
+        'api:ingredient-detail': 3,
+        'api:ingredient-snapshot': 3,
+        'api:user-list': 3,
+        'api:user-detail': 4,
+        'api:user-me': 2,
+        'api:user-subscriptions': 13,
+    },
+}
+
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication'
+        'api.authentication.CachedTokenAuthentication'
     ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
@@ -149,6 +252,21 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly'
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.CostThrottle'
+    ],
+    # Сколько прокси добавляют адрес в X-Forwarded-For: адрес клиента
+    # для лимитов - столько-то с конца. Без прокси - 0.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', default=1)),
+}
+
+THROTTLING = {
+    'RATES': {
+        'export': os.getenv('THROTTLE_EXPORT_RATE', default='10/min'),
+        'search': os.getenv('THROTTLE_SEARCH_RATE', default='120/min'),
+        'write': os.getenv('THROTTLE_WRITE_RATE', default='60/min'),
+    },
+    'CACHE': os.getenv('THROTTLE_CACHE'),
 }
 
 DJOSER = {
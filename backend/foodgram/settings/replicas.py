@@ -0,0 +1,29 @@
+import os
+
+# Реплики только для чтения: через запятую хосты PostgreSQL
+# или пути к файлам, если основная БД - SQLite.
+DB_REPLICAS = [
+    location.strip()
+    for location in os.getenv('DB_REPLICAS', default='').split(',')
+    if location.strip()
+]
+
+for number, location in enumerate(DB_REPLICAS, start=1):
+    replica = {**DATABASES['default'],  # noqa: F821
+               'TEST': {'MIRROR': 'default'}}
+    if replica['ENGINE'].endswith('sqlite3'):
+        replica['NAME'] = location
+    else:
+        replica['HOST'] = location
+    DATABASES[f'replica{number}'] = replica  # noqa: F821
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
+READ_REPLICAS = {
+    'ALIASES': [f'replica{number}'
+                for number in range(1, len(DB_REPLICAS) + 1)],
+    # Сколько секунд после записи клиент читает из основной БД.
+    'PIN_SECONDS': int(os.getenv('DB_REPLICA_PIN_SECONDS', default=5)),
+    # При нескольких процессах нужен общий кэш (CACHE_BACKEND).
+    'CACHE': os.getenv('DB_REPLICA_PIN_CACHE', default='default'),
+}
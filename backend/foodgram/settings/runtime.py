@@ -0,0 +1,50 @@
+import multiprocessing
+import os
+
+# Постоянные подключения к БД вместо нового подключения на каждый запрос.
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', default=600))
+for database in DATABASES.values():  # noqa: F821
+    database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+
+# Проверка постоянного подключения (SELECT 1) в начале запроса,
+# если оно простаивало дольше заданного числа секунд.
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', default='1') == '1'
+DB_CONN_HEALTH_CHECK_IDLE = int(
+    os.getenv('DB_CONN_HEALTH_CHECK_IDLE', default=30)
+)
+
+CPU_COUNT = multiprocessing.cpu_count()
+
+# Каждый поток gunicorn держит своё постоянное подключение к каждому
+# серверу БД (основному и репликам), поэтому процессов не больше, чем
+# помещается в бюджет подключений:
+#   WORKERS * THREADS <= DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS,
+# где DB_MAX_CONNECTIONS - max_connections сервера (100 по умолчанию
+# в PostgreSQL), а в резерве асинхронный сервис (ASYNC_DB_THREADS),
+# обработчик задач (PROCESSES + 1) и 10 подключений для миграций,
+# консоли и резерва суперпользователя.
+DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', default=100))
+DB_RESERVED_CONNECTIONS = int(os.getenv(
+    'DB_RESERVED_CONNECTIONS',
+    default=ASYNC_DB_THREADS + JOBS['PROCESSES'] + 1 + 10,  # noqa: F821
+))
+GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', default=4))
+DB_CONNECTION_WORKERS = max(
+    1, (DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS) // GUNICORN_THREADS
+)
+
+# Параметры gunicorn, их читает gunicorn.conf.py.
+GUNICORN = {
+    'WORKERS': int(os.getenv(
+        'WEB_CONCURRENCY',
+        default=min(CPU_COUNT * 2 + 1, DB_CONNECTION_WORKERS),
+    )),
+    'THREADS': GUNICORN_THREADS,
+    'WORKER_CLASS': os.getenv('GUNICORN_WORKER_CLASS', default='gthread'),
+    'KEEPALIVE': int(os.getenv('GUNICORN_KEEPALIVE', default=5)),
+    'TIMEOUT': int(os.getenv('GUNICORN_TIMEOUT', default=30)),
+    'MAX_REQUESTS': int(os.getenv('GUNICORN_MAX_REQUESTS', default=1000)),
+    'MAX_REQUESTS_JITTER': int(
+        os.getenv('GUNICORN_MAX_REQUESTS_JITTER', default=100)
+    ),
+}
@@ -15,4 +15,6 @@ include('base.py')
 if 'dev' == os.getenv('DJANGO_ENV'):
     include('development.py')
 if 'prod' == os.getenv('DJANGO_ENV'):
-    include('production.py')
+    include('production.py', 'runtime.py')
+
+include('replicas.py')
@@ -0,0 +1,19 @@
+import os
+
+from django.conf import settings
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE',
+                      'foodgram.settings.split_settings')
+
+# Без профиля runtime.py остаются настройки gunicorn по умолчанию.
+profile = getattr(settings, 'GUNICORN', {})
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+if profile:
+    workers = profile['WORKERS']
+    threads = profile['THREADS']
+    worker_class = profile['WORKER_CLASS']
+    keepalive = profile['KEEPALIVE']
+    timeout = profile['TIMEOUT']
+    max_requests = profile['MAX_REQUESTS']
+    max_requests_jitter = profile['MAX_REQUESTS_JITTER']
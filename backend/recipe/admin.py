@@ -1,4 +1,7 @@
+from api.jobs import delete_in_background
 from django.contrib import admin
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from recipe.models import (Favorite, Ingredient, IngredientAmount, Recipe,
                            ShoppingCart, Tag)
 
@@ -7,25 +10,48 @@ class RecipeAdmin(admin.ModelAdmin):
     """Админ панель для управления рецептами."""
     list_display = ('author', 'name', 'cooking_time',
                     'get_favorites', )
-    search_fields = ('name', 'author', 'tags', )
+    list_select_related = ('author', )
+    search_fields = ('^name', '=author__username', )
     readonly_fields = ('get_favorites', )
-    list_filter = ('author', 'name', 'tags', )
+    list_filter = ('tags', )
+    autocomplete_fields = ('author', )
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    actions = (delete_in_background, )
 
+    def get_queryset(self, request):
+        """
+        Число добавлений в избранное считается подзапросом только
+        для строк текущей страницы.
+        """
+        return super().get_queryset(request).annotate(
+            favorites_count=Coalesce(Subquery(
+                Favorite.objects.filter(
+                    recipe=OuterRef('pk')
+                ).order_by().values('recipe').annotate(
+                    count=Count('id')
+                ).values('count'),
+                output_field=IntegerField(),
+            ), 0)
+        )
+
+    @admin.display(description='В избранном',
+                   ordering='favorites_count')
     def get_favorites(self, obj):
         """
         Метод для отображения сколько раз рецепт добавили
         в избранное.
         """
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 class IngredientAdmin(admin.ModelAdmin):
     """Админ панель для управления ингридиентами."""
 
     list_display = ('name', 'measurement_unit', )
-    search_fields = ('name', )
-    list_filter = ('name', )
+    search_fields = ('^name', )
+    list_filter = ('measurement_unit', )
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
@@ -42,17 +68,21 @@ class FavoriteAdmin(admin.ModelAdmin):
     """Админ панель для управления избранными рецептами."""
 
     list_display = ('user', 'recipe', )
-    list_filter = ('user', 'recipe', )
-    search_fields = ('user', 'recipe', )
+    list_select_related = ('user', 'recipe__author', )
+    search_fields = ('=user__username', '^recipe__name', )
+    autocomplete_fields = ('user', 'recipe', )
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
 class ShoppingCartAdmin(admin.ModelAdmin):
     """Админ панель для управления списком покупок."""
 
-    list_display = ('user', )
-    list_filter = ('recipe', 'user', )
-    search_fields = ('user', )
+    list_display = ('user', 'recipe', )
+    list_select_related = ('user', 'recipe__author', )
+    search_fields = ('=user__username', '^recipe__name', )
+    autocomplete_fields = ('user', 'recipe', )
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
 
@@ -61,7 +91,13 @@ class IngredientAmountAdmin(admin.ModelAdmin):
 
     list_display = ('recipe', 'ingredient',
                     'amount', 'get_measurement_unit', )
+    list_select_related = ('recipe__author', 'ingredient', )
+    search_fields = ('^recipe__name', )
+    raw_id_fields = ('recipe', )
+    autocomplete_fields = ('ingredient', )
+    show_full_result_count = False
 
+    @admin.display(description='Единица измерения')
     def get_measurement_unit(self, obj):
         return obj.ingredient.measurement_unit
 
@@ -0,0 +1,185 @@
+import base64
+import binascii
+import heapq
+from datetime import datetime
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+from users.models import PopularAuthor, Subscriptions
+
+from .fixtures import batched
+from .models import FeedEntry, Recipe
+
+DEFAULT_RECIPE_FEED = {
+    # С какого числа подписчиков рецепты автора не раскладываются
+    # по лентам, а подмешиваются при чтении.
+    'FANOUT_LIMIT': 1000,
+    # Сколько последних рецептов автора добавить в ленту при подписке.
+    'BACKFILL': 50,
+    'BATCH_SIZE': 1000,
+}
+
+
+def get_config():
+    return {**DEFAULT_RECIPE_FEED, **getattr(settings, 'RECIPE_FEED', {})}
+
+
+def encode_cursor(pub_date, recipe_id):
+    return base64.urlsafe_b64encode(
+        f'{pub_date.isoformat()}|{recipe_id}'.encode()
+    ).decode()
+
+
+def decode_cursor(cursor):
+    """Пара (дата публикации, id рецепта) или ValueError."""
+    try:
+        pub_date, recipe_id = base64.urlsafe_b64decode(
+            cursor.encode()
+        ).decode().split('|')
+        return datetime.fromisoformat(pub_date), int(recipe_id)
+    except (binascii.Error, UnicodeError, ValueError) as error:
+        raise ValueError('Некорректный курсор') from error
+
+
+def before(cursor, date_field, id_field):
+    """Условие ключевой пагинации: строго раньше курсора."""
+    if cursor is None:
+        return Q()
+    pub_date, recipe_id = cursor
+    return Q(**{f'{date_field}__lt': pub_date}) | Q(**{
+        date_field: pub_date, f'{id_field}__lt': recipe_id
+    })
+
+
+def push(recipes, user_ids):
+    """Раскладывает рецепты ``(id, автор, дата)`` по лентам."""
+    entries = (
+        FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                  author_id=author_id, pub_date=pub_date)
+        for recipe_id, author_id, pub_date in recipes
+        for user_id in user_ids
+    )
+    for batch in batched(entries, get_config()['BATCH_SIZE']):
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def recent_recipes(author_id):
+    return list(Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'author_id', 'pub_date')[:get_config()['BACKFILL']])
+
+
+def follower_ids(author_id):
+    return Subscriptions.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True).iterator()
+
+
+def is_popular(author_id):
+    """
+    Популярен ли автор. Автор становится популярным, когда число
+    подписчиков достигает ``FANOUT_LIMIT``.
+    """
+    if PopularAuthor.objects.filter(author_id=author_id).exists():
+        return True
+    if Subscriptions.objects.filter(
+        author_id=author_id
+    ).count() >= get_config()['FANOUT_LIMIT']:
+        PopularAuthor.objects.get_or_create(author_id=author_id)
+        return True
+    return False
+
+
+def recipe_published(recipe_id):
+    """Новый рецепт попадает в ленты подписчиков обычного автора."""
+    recipe = Recipe.objects.filter(id=recipe_id).values_list(
+        'id', 'author_id', 'pub_date'
+    ).first()
+    if recipe is None or is_popular(recipe[1]):
+        return
+    push([recipe], follower_ids(recipe[1]))
+
+
+def subscribed(user_id, author_id):
+    """
+    В ленту нового подписчика добавляются последние рецепты автора.
+    Раскладка идёт в фоне: если подписку уже отменили, лента не меняется.
+    """
+    if not Subscriptions.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).exists():
+        return
+    if not is_popular(author_id):
+        push(recent_recipes(author_id), [user_id])
+
+
+def unsubscribed(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def followers_decreased(author_id):
+    popular = PopularAuthor.objects.filter(author_id=author_id)
+    if popular.exists() and Subscriptions.objects.filter(
+        author_id=author_id
+    ).count() < get_config()['FANOUT_LIMIT'] // 2:
+        # Порог снятия ниже порога назначения, чтобы автор на границе
+        # не раскладывал ленты заново при каждой подписке и отписке.
+        popular.delete()
+        push(recent_recipes(author_id), list(follower_ids(author_id)))
+
+
+def rebuild(log=None):
+    """Заполняет ленты заново, например после массовой загрузки данных."""
+    log = log or (lambda message: None)
+    FeedEntry.objects.all().delete()
+    PopularAuthor.objects.all().delete()
+    authors = Subscriptions.objects.order_by().values_list(
+        'author_id', flat=True
+    ).distinct()
+    pushed = popular = 0
+    for author_id in authors.iterator():
+        if is_popular(author_id):
+            popular += 1
+            continue
+        push(recent_recipes(author_id), list(follower_ids(author_id)))
+        pushed += 1
+    log(f'Авторов с раскладкой по лентам: {pushed}, популярных: {popular}')
+
+
+def page(user, cursor=None, limit=10):
+    """
+    Страница ленты: рецепты ``(id, дата публикации)`` и курсор следующей
+    страницы. Обе части ленты читаются по индексу с ключевой пагинацией,
+    так что цена страницы не зависит от числа подписок.
+    """
+    pushed = FeedEntry.objects.filter(
+        before(cursor, 'pub_date', 'recipe_id'), user=user
+    ).order_by('-pub_date', '-recipe_id').values_list(
+        'recipe_id', 'pub_date'
+    )[:limit + 1]
+    popular_ids = list(Subscriptions.objects.filter(
+        user=user,
+        author_id__in=PopularAuthor.objects.values('author_id'),
+    ).values_list('author_id', flat=True))
+    pulled = []
+    if popular_ids:
+        pulled = Recipe.objects.filter(
+            before(cursor, 'pub_date', 'id'), author_id__in=popular_ids
+        ).order_by('-pub_date', '-id').values_list(
+            'id', 'pub_date'
+        )[:limit + 1]
+
+    seen = set()
+    merged = []
+    for recipe_id, pub_date in heapq.merge(
+        pushed, pulled, key=lambda item: (item[1], item[0]), reverse=True
+    ):
+        if recipe_id not in seen:
+            seen.add(recipe_id)
+            merged.append((recipe_id, pub_date))
+    items = list(islice(merged, limit))
+    next_cursor = None
+    if len(merged) > limit:
+        next_cursor = encode_cursor(items[-1][1], items[-1][0])
+    return items, next_cursor
@@ -0,0 +1,201 @@
+import csv
+import random
+from array import array
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from rest_framework.authtoken.models import Token
+from users.models import Subscriptions
+
+from .models import (Favorite, Ingredient, IngredientAmount, Recipe,
+                     ShoppingCart, Tag)
+
+User = get_user_model()
+
+INGREDIENTS_CSV = 'data/ingredients.csv'
+MAX_INGREDIENTS = 40
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def load_ingredients(path=INGREDIENTS_CSV, batch_size=1000):
+    """Загружает каталог ингредиентов из CSV, если он ещё пуст."""
+    if Ingredient.objects.exists():
+        return
+    with open(path, encoding='utf-8') as data_file:
+        for batch in batched(csv.reader(data_file), batch_size):
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=unit)
+                 for name, unit in batch],
+                ignore_conflicts=True,
+            )
+
+
+class FixtureGenerator:
+    """
+    Генератор синтетических данных для нагрузочного тестирования.
+
+    Объекты создаются пачками через ``bulk_create`` из генераторов,
+    поэтому в памяти держатся только пачка и массивы идентификаторов.
+    При одинаковых ``seed`` и ``prefix`` результат совпадает, включая
+    ключи токенов. Префикс занимается один раз: повторный запуск с ним
+    завершается ``ValueError`` до создания объектов.
+    """
+
+    def __init__(self, seed=0, prefix='fixture', batch_size=5000,
+                 log=None):
+        if batch_size < 1:
+            raise ValueError('Размер пачки должен быть положительным')
+        self.rng = random.Random(seed)
+        # Ключи токенов - отдельной последовательностью: они не сдвигают
+        # остальные данные и различаются у наборов с разными префиксами.
+        self.token_rng = random.Random(f'{prefix}:{seed}')
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+
+    def bulk_create(self, model, objects):
+        created = 0
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch)
+            created += len(batch)
+        self.log(f'{model._meta.verbose_name_plural}: {created}')
+        return created
+
+    def ids(self, queryset):
+        return array('q', queryset.order_by('id').values_list(
+            'id', flat=True
+        ).iterator(chunk_size=self.batch_size))
+
+    def skewed_index(self, size, skew=2.0):
+        """Индекс со степенным распределением: малые индексы популярнее."""
+        return int(size * self.rng.random() ** skew)
+
+    def power_law_count(self, minimum, maximum, alpha=1.5):
+        return min(maximum, int(minimum * self.rng.paretovariate(alpha)))
+
+    def users(self, count):
+        password = make_password(f'{self.prefix}-password')
+        self.bulk_create(User, (
+            User(username=f'{self.prefix}{index}',
+                 email=f'{self.prefix}{index}@example.com',
+                 first_name='Fixture', last_name=str(index),
+                 password=password)
+            for index in range(count)
+        ))
+        user_ids = self.ids(
+            User.objects.filter(username__startswith=self.prefix)
+        )
+        self.bulk_create(Token, (
+            Token(key=f'{self.token_rng.getrandbits(160):040x}',
+                  user_id=user_id)
+            for user_id in user_ids
+        ))
+        return user_ids
+
+    def tags(self):
+        colors = [color for color, _ in Tag.COLOR_CHOICES]
+        self.bulk_create(Tag, (
+            Tag(name=f'{self.prefix}-{color}', color=color,
+                slug=f'{self.prefix}-{color.lower()}')
+            for color in colors
+        ))
+        return self.ids(Tag.objects.filter(slug__startswith=self.prefix))
+
+    def recipes(self, count, user_ids, tag_ids, ingredient_ids):
+        self.bulk_create(Recipe, (
+            Recipe(
+                author_id=user_ids[self.skewed_index(len(user_ids))],
+                name=f'Рецепт {index}',
+                cooking_time=self.rng.randint(1, 180),
+                text='Описание рецепта',
+                image=f'static/recipe/{self.prefix}-{index % 100}.png',
+            )
+            for index in range(count)
+        ))
+        recipe_ids = self.ids(
+            Recipe.objects.filter(author__username__startswith=self.prefix)
+        )
+        TagThrough = Recipe.tags.through
+        self.bulk_create(TagThrough, (
+            TagThrough(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.rng.sample(
+                tag_ids, self.rng.randint(1, min(3, len(tag_ids)))
+            )
+        ))
+        self.bulk_create(IngredientAmount, (
+            IngredientAmount(recipe_id=recipe_id,
+                             ingredient_id=ingredient_id,
+                             amount=self.rng.randint(1, 500))
+            for recipe_id in recipe_ids
+            for ingredient_id in self.rng.sample(
+                ingredient_ids,
+                self.power_law_count(3, min(MAX_INGREDIENTS,
+                                            len(ingredient_ids)))
+            )
+        ))
+        return recipe_ids
+
+    def user_links(self, user_ids, target_ids, per_user, exclude_self=False):
+        """Пары (пользователь, объект) без повторов, популярность степенная."""
+        if not target_ids:
+            return
+        for user_id in user_ids:
+            count = min(max(1, len(target_ids) // 2),
+                        self.power_law_count(max(1, per_user // 2),
+                                             per_user * 10))
+            targets = set()
+            while len(targets) < count:
+                targets.add(target_ids[self.skewed_index(len(target_ids))])
+            for target_id in sorted(targets):
+                if not (exclude_self and target_id == user_id):
+                    yield user_id, target_id
+
+    def check(self, users, recipes, favorites, cart, subscriptions):
+        counts = {'users': users, 'recipes': recipes, 'favorites': favorites,
+                  'cart': cart, 'subscriptions': subscriptions}
+        negative = [name for name, count in counts.items() if count < 0]
+        if negative:
+            raise ValueError(
+                f'Отрицательное количество: {", ".join(negative)}'
+            )
+        if recipes and not users:
+            raise ValueError('Для рецептов нужен хотя бы один пользователь')
+        if (User.objects.filter(username__startswith=self.prefix).exists()
+                or Tag.objects.filter(slug__startswith=self.prefix).exists()):
+            raise ValueError(
+                f'В базе уже есть данные с префиксом "{self.prefix}": '
+                f'укажите другой префикс'
+            )
+
+    def generate(self, users=1000, recipes=10000, favorites=20, cart=5,
+                 subscriptions=10):
+        self.check(users, recipes, favorites, cart, subscriptions)
+        load_ingredients(batch_size=self.batch_size)
+        ingredient_ids = self.ids(Ingredient.objects.all())
+        user_ids = self.users(users)
+        tag_ids = self.tags()
+        recipe_ids = self.recipes(recipes, user_ids, tag_ids, ingredient_ids)
+        self.bulk_create(Favorite, (
+            Favorite(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in self.user_links(
+                user_ids, recipe_ids, favorites)
+        ))
+        self.bulk_create(ShoppingCart, (
+            ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in self.user_links(
+                user_ids, recipe_ids, cart)
+        ))
+        self.bulk_create(Subscriptions, (
+            Subscriptions(user_id=user_id, author_id=author_id)
+            for user_id, author_id in self.user_links(
+                user_ids, user_ids, subscriptions, exclude_self=True)
+        ))
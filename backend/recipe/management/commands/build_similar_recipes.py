@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from recipe import similarity
+
+
+class Command(BaseCommand):
+    help = 'Рассчитать похожие рецепты'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale', action='store_true',
+                            help='Пересчитать только изменённые рецепты '
+                                 'и затронутые ими списки')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Старт команды'))
+        if options['stale']:
+            similarity.refresh(log=self.stdout.write)
+        else:
+            similarity.build(log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS('Похожие рецепты рассчитаны'))
@@ -0,0 +1,48 @@
+from api import matching, versions
+from django.core.management.base import BaseCommand, CommandError
+from recipe import feed
+from recipe.fixtures import FixtureGenerator
+
+
+class Command(BaseCommand):
+    help = 'Сгенерировать синтетические данные для нагрузочных тестов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Типичное число избранных на пользователя')
+        parser.add_argument('--cart', type=int, default=5,
+                            help='Типичное число рецептов в корзине')
+        parser.add_argument('--subscriptions', type=int, default=10,
+                            help='Типичное число подписок')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='fixture',
+                            help='Префикс имён пользователей и тегов, '
+                                 'у каждого набора данных свой')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.WARNING('Старт команды'))
+        try:
+            generator = FixtureGenerator(
+                seed=options['seed'],
+                prefix=options['prefix'],
+                batch_size=options['batch_size'],
+                log=self.stdout.write,
+            )
+            generator.generate(
+                users=options['users'],
+                recipes=options['recipes'],
+                favorites=options['favorites'],
+                cart=options['cart'],
+                subscriptions=options['subscriptions'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        versions.bump(versions.RECIPES, versions.TAGS,
+                      versions.INGREDIENTS, versions.USERS)
+        # Ингредиенты рецептов созданы bulk_create, без сигналов.
+        matching.request_rebuild()
+        feed.rebuild(log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS('Данные сгенерированы'))
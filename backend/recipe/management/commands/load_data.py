@@ -1,5 +1,6 @@
 import json
 
+from api import versions
 from django.core.management.base import BaseCommand
 from recipe.models import Ingredient
 
@@ -14,5 +15,7 @@ class Command(BaseCommand):
             ingredient_data = json.loads(data_file_ingredients.read())
             for ingredients in ingredient_data:
                 Ingredient.objects.get_or_create(**ingredients)
+        # Сбрасывает кэш справочника ингредиентов во всех процессах.
+        versions.bump(versions.INGREDIENTS)
 
         self.stdout.write(self.style.SUCCESS('Данные загружены'))
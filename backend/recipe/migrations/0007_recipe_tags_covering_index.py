@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Покрывающий индекс (tag_id, recipe_id) для фильтрации рецептов
+    по тегам: id рецептов читаются прямо из индекса.
+    """
+
+    dependencies = [
+        ('recipe', '0006_auto_20230610_2226'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=('CREATE INDEX recipe_recipe_tags_tag_recipe_idx '
+                 'ON recipe_recipe_tags (tag_id, recipe_id);'),
+            reverse_sql='DROP INDEX recipe_recipe_tags_tag_recipe_idx;',
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:26
+
+from django.db import migrations, models
+
+UPPER_NAME_INDEX = 'recipe_recipe_name_upper_like'
+
+
+def create_upper_name_index(apps, schema_editor):
+    """
+    Поиск ``^name`` в админке - это ``UPPER(name) LIKE UPPER('...%')``.
+    В PostgreSQL его ускоряет только индекс по выражению.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX {UPPER_NAME_INDEX} ON recipe_recipe '
+            f'(UPPER(name::text) text_pattern_ops);'
+        )
+
+
+def drop_upper_name_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {UPPER_NAME_INDEX};')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0007_recipe_tags_covering_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='name',
+            field=models.CharField(db_index=True, max_length=200, verbose_name='Название рецепта'),
+        ),
+        migrations.RunPython(create_upper_name_index, drop_upper_name_index),
+    ]
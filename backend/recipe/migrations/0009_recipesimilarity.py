@@ -0,0 +1,27 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0008_recipe_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSimilarity',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='similarity', serialize=False, to='recipe.recipe', verbose_name='Рецепт')),
+                ('neighbors', models.JSONField(default=list, help_text='Пары [id рецепта, сходство] по убыванию сходства', verbose_name='Похожие рецепты')),
+                ('changes', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Изменений с последнего расчёта')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Время расчёта')),
+            ],
+            options={
+                'verbose_name': 'Похожие рецепты',
+                'verbose_name_plural': 'Похожие рецепты',
+            },
+        ),
+    ]
@@ -66,6 +66,7 @@ class Recipe(models.Model):
 
     name = models.CharField(
         max_length=200,
+        db_index=True,
         verbose_name='Название рецепта'
     )
     author = models.ForeignKey(
@@ -109,6 +110,10 @@ class Recipe(models.Model):
         ordering = ['-pub_date']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='recipe_author_pub_date_idx'),
+        ]
 
     def __str__(self):
         return f'{self.name}, {self.author}'
@@ -216,3 +221,85 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return (f'{self.user}, рецепт в списке {self.recipe.name}')
+
+
+class FeedEntry(models.Model):
+    """
+    Рецепт в ленте подписчика. Заполняется при публикации рецепта
+    для авторов с небольшим числом подписчиков.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    class Meta:
+        ordering = ['-pub_date', '-recipe_id']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feed_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='feed_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} <- {self.recipe_id}'
+
+
+class RecipeSimilarity(models.Model):
+    """Заранее рассчитанные похожие рецепты."""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='similarity',
+        verbose_name='Рецепт'
+    )
+    neighbors = models.JSONField(
+        default=list,
+        verbose_name='Похожие рецепты',
+        help_text='Пары [id рецепта, сходство] по убыванию сходства'
+    )
+    changes = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        verbose_name='Изменений с последнего расчёта'
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Время расчёта'
+    )
+
+    class Meta:
+        verbose_name = 'Похожие рецепты'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {len(self.neighbors)}'
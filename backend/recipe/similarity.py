@@ -0,0 +1,388 @@
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import IngredientAmount, Recipe, RecipeSimilarity
+
+DEFAULT_RECIPE_SIMILARITY = {
+    # Сколько похожих рецептов хранить для каждого рецепта.
+    'NEIGHBORS': 10,
+    # Вес тегов относительно ингредиентов.
+    'TAG_WEIGHT': 0.5,
+    # Кандидатов в похожие дают только ингредиенты, которые есть не
+    # больше чем в такой доле рецептов (но не меньше чем в
+    # CANDIDATE_MIN_RECIPES). Теги и частые ингредиенты, как соль,
+    # есть у трети каталога: они только меняют сходство кандидатов.
+    # Рецепт без редких ингредиентов ищет кандидатов по всем своим.
+    'CANDIDATE_SHARE': 0.02,
+    'CANDIDATE_MIN_RECIPES': 100,
+    # Сколько списков сохранять одним запросом.
+    'BATCH_SIZE': 500,
+}
+
+
+def get_config():
+    return {**DEFAULT_RECIPE_SIMILARITY,
+            **getattr(settings, 'RECIPE_SIMILARITY', {})}
+
+
+def candidate_limit(documents):
+    """Сколько рецептов может иметь ингредиент, дающий кандидатов."""
+    config = get_config()
+    return max(config['CANDIDATE_MIN_RECIPES'],
+               config['CANDIDATE_SHARE'] * documents)
+
+
+class RecipeVectors:
+    """
+    Разреженные векторы рецептов по ингредиентам и тегам с весами IDF,
+    нормированные по длине: скалярное произведение - косинусное сходство.
+
+    Матрица хранится массивами NumPy в двух порядках: по строкам
+    (признаки рецепта) и по столбцам (рецепты с признаком). Столбцы
+    нужны только для поиска кандидатов по редким ингредиентам.
+    """
+
+    def __init__(self, recipe_ids, pairs, tag_weight, frequencies=None,
+                 total=None):
+        """
+        ``frequencies`` (признак -> число рецептов) и ``total`` задаются,
+        когда загружена часть рецептов: IDF считается по всем.
+        """
+        self.recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        self.position = {
+            recipe_id: index for index, recipe_id in enumerate(recipe_ids)
+        }
+        rows = np.array([self.position[recipe_id]
+                         for recipe_id, _, _ in pairs], dtype=np.int64)
+        features = {}
+        cols = np.array([features.setdefault(feature, len(features))
+                         for _, feature, _ in pairs], dtype=np.int64)
+        weights = np.array([weight for _, _, weight in pairs],
+                           dtype=np.float64)
+        size = len(self.recipe_ids)
+
+        if frequencies is None:
+            document_frequency = np.bincount(cols, minlength=len(features))
+        else:
+            document_frequency = np.array(
+                [frequencies[feature] for feature in features],
+                dtype=np.float64,
+            )
+        documents = size if total is None else total
+        values = weights * (
+            np.log((1 + documents) / (1 + document_frequency)) + 1
+        )[cols]
+        norms = np.sqrt(np.bincount(rows, weights=values ** 2,
+                                    minlength=size))
+        if len(values):
+            values /= norms[rows]
+        self.ingredient = np.array(
+            [kind == 'ingredient' for kind, _ in features], dtype=bool
+        )
+        self.generating = self.ingredient & (
+            document_frequency <= candidate_limit(documents)
+        )
+        # Рецепты без редких ингредиентов.
+        self.fallback = np.bincount(
+            rows, weights=self.generating[cols], minlength=size
+        ) == 0
+
+        self.row_ptr, self.row_cols, self.row_values = self.compress(
+            rows, cols, values, size
+        )
+        self.col_ptr, self.col_rows, _ = self.compress(
+            cols, rows, values, len(features)
+        )
+        # Столбцы ингредиентов только с рецептами без редких
+        # ингредиентов: остальные рецепты находят их по ним.
+        mask = self.fallback[rows] & self.ingredient[cols]
+        self.fallback_ptr, self.fallback_rows, _ = self.compress(
+            cols[mask], rows[mask], values[mask], len(features)
+        )
+        # Вектор рецепта по всем признакам для ``scores``.
+        self._query = np.zeros(len(features))
+
+    @staticmethod
+    def compress(major, minor, values, size):
+        order = np.argsort(major, kind='stable')
+        pointers = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(major, minlength=size), out=pointers[1:])
+        return pointers, minor[order], values[order]
+
+    @classmethod
+    def load(cls, tag_weight=None, recipe_ids=None):
+        """
+        Векторы всех рецептов из базы или только ``recipe_ids``. Для
+        части рецептов частоты признаков считаются запросом по всем.
+        """
+        if tag_weight is None:
+            tag_weight = get_config()['TAG_WEIGHT']
+        amounts = IngredientAmount.objects.order_by()
+        tags = Recipe.tags.through.objects.order_by()
+        recipes = Recipe.objects.all()
+        if recipe_ids is not None:
+            amounts = amounts.filter(recipe_id__in=recipe_ids)
+            tags = tags.filter(recipe_id__in=recipe_ids)
+            recipes = recipes.filter(id__in=recipe_ids)
+        pairs = [
+            (recipe_id, ('ingredient', ingredient_id), 1.0)
+            for recipe_id, ingredient_id in amounts.values_list(
+                'recipe_id', 'ingredient_id'
+            ).iterator()
+        ]
+        pairs.extend(
+            (recipe_id, ('tag', tag_id), tag_weight)
+            for recipe_id, tag_id in tags.values_list(
+                'recipe_id', 'tag_id'
+            ).iterator()
+        )
+        ids = sorted(recipes.values_list('id', flat=True))
+        if recipe_ids is None:
+            return cls(ids, pairs, tag_weight)
+        return cls(ids, pairs, tag_weight, frequencies=feature_frequencies(
+            {feature for _, feature, _ in pairs}
+        ), total=Recipe.objects.count())
+
+    @staticmethod
+    def spans(pointers, indices):
+        """
+        Позиции элементов строк (или столбцов) ``indices`` одним
+        массивом и длины строк.
+        """
+        starts = pointers[indices]
+        lengths = pointers[indices + 1] - starts
+        return (np.arange(lengths.sum())
+                - np.repeat(np.cumsum(lengths) - lengths, lengths)
+                + np.repeat(starts, lengths)), lengths
+
+    def candidates(self, index):
+        """
+        Рецепты с общим редким ингредиентом, а если один из двух
+        рецептов редких не имеет - с любым общим ингредиентом.
+        Отношение симметрично: это нужно ``refresh``.
+        """
+        cols = self.row_cols[self.row_ptr[index]:self.row_ptr[index + 1]]
+        ingredients = cols[self.ingredient[cols]]
+        offsets, _ = self.spans(self.col_ptr, (
+            ingredients if self.fallback[index]
+            else cols[self.generating[cols]]
+        ))
+        fallback, _ = self.spans(self.fallback_ptr, ingredients)
+        candidates = np.unique(np.concatenate((
+            self.col_rows[offsets], self.fallback_rows[fallback]
+        )))
+        return candidates[candidates != index]
+
+    def scores(self, index):
+        """
+        Кандидаты (индексы в ``recipe_ids``) и их сходство с рецептом
+        по всем признакам, включая теги и частые ингредиенты.
+        """
+        start, end = self.row_ptr[index], self.row_ptr[index + 1]
+        cols = self.row_cols[start:end]
+        self._query[cols] = self.row_values[start:end]
+        candidates = self.candidates(index)
+        offsets, lengths = self.spans(self.row_ptr, candidates)
+        scores = np.bincount(
+            np.repeat(np.arange(len(candidates)), lengths),
+            weights=(self._query[self.row_cols[offsets]]
+                     * self.row_values[offsets]),
+            minlength=len(candidates),
+        )
+        self._query[cols] = 0
+        return candidates, scores
+
+    def neighbors(self, index, count, scores=None):
+        """Самые похожие рецепты: список ``[id, сходство]``."""
+        candidates, scores = scores or self.scores(index)
+        positive = scores > 0
+        candidates, scores = candidates[positive], scores[positive]
+        if len(candidates) > count:
+            top = np.argpartition(-scores, count - 1)[:count]
+            candidates, scores = candidates[top], scores[top]
+        order = np.lexsort((-self.recipe_ids[candidates], -scores))
+        return [[int(self.recipe_ids[candidate]), round(float(score), 4)]
+                for candidate, score in zip(candidates[order], scores[order])]
+
+
+def feature_frequencies(features):
+    """Во скольких рецептах встречается каждый из признаков."""
+    frequencies = {}
+    for kind, manager, field in (
+        ('ingredient', IngredientAmount.objects, 'ingredient_id'),
+        ('tag', Recipe.tags.through.objects, 'tag_id'),
+    ):
+        ids = [feature_id for feature_kind, feature_id in features
+               if feature_kind == kind]
+        for feature_id, count in manager.filter(**{
+            f'{field}__in': ids
+        }).order_by().values(field).annotate(
+            count=Count('recipe_id')
+        ).values_list(field, 'count'):
+            frequencies[(kind, feature_id)] = count
+    return frequencies
+
+
+def save(results, seen):
+    """
+    Сохраняет рассчитанные списки пачками по ``BATCH_SIZE``. Счётчик
+    изменений уменьшается только на учтённые в расчёте, поэтому
+    изменения во время расчёта не теряются.
+    """
+    batch_size = get_config()['BATCH_SIZE']
+    recipe_ids = list(results)
+    now = timezone.now()
+    for start in range(0, len(recipe_ids), batch_size):
+        batch = recipe_ids[start:start + batch_size]
+        with transaction.atomic():
+            existing = set(RecipeSimilarity.objects.filter(
+                recipe_id__in=batch
+            ).values_list('recipe_id', flat=True))
+            RecipeSimilarity.objects.bulk_create(
+                [RecipeSimilarity(recipe_id=recipe_id,
+                                  neighbors=results[recipe_id])
+                 for recipe_id in batch if recipe_id not in existing],
+                ignore_conflicts=True,
+            )
+            RecipeSimilarity.objects.bulk_update(
+                [RecipeSimilarity(
+                    recipe_id=recipe_id,
+                    neighbors=results[recipe_id],
+                    changes=F('changes') - seen.get(recipe_id, 0),
+                    updated=now,
+                ) for recipe_id in batch if recipe_id in existing],
+                ('neighbors', 'changes', 'updated'),
+            )
+
+
+def build(log=None):
+    """Полный расчёт похожих рецептов для всех рецептов."""
+    log = log or (lambda message: None)
+    count = get_config()['NEIGHBORS']
+    seen = dict(RecipeSimilarity.objects.filter(
+        changes__gt=0
+    ).values_list('recipe_id', 'changes'))
+    vectors = RecipeVectors.load()
+    results = {
+        int(recipe_id): vectors.neighbors(index, count)
+        for index, recipe_id in enumerate(vectors.recipe_ids)
+    }
+    save(results, seen)
+    log(f'Рассчитано рецептов: {len(results)}')
+    return len(results)
+
+
+def find_candidates(recipe_ids):
+    """
+    Рецепты, которые ``RecipeVectors.candidates`` может выбрать для
+    ``recipe_ids``, по частотам ингредиентов в базе.
+    """
+    amounts = IngredientAmount.objects.order_by()
+    limit = candidate_limit(Recipe.objects.count())
+    ingredients = dict(amounts.filter(
+        ingredient_id__in=amounts.filter(
+            recipe_id__in=recipe_ids
+        ).values('ingredient_id')
+    ).values('ingredient_id').annotate(
+        count=Count('recipe_id')
+    ).values_list('ingredient_id', 'count'))
+    recipe_ingredients = defaultdict(set)
+    for recipe_id, ingredient_id in amounts.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id'):
+        recipe_ingredients[recipe_id].add(ingredient_id)
+    rare = {ingredient_id for ingredient_id, count in ingredients.items()
+            if count <= limit}
+    search = set(rare)
+    for own in recipe_ingredients.values():
+        if not own & rare:
+            search |= own
+    candidates = set(amounts.filter(
+        ingredient_id__in=search
+    ).values_list('recipe_id', flat=True))
+    # Рецепты без редких ингредиентов с любым общим ингредиентом.
+    candidates.update(amounts.filter(
+        ingredient_id__in=set(ingredients) - search
+    ).exclude(recipe_id__in=amounts.filter(
+        ingredient_id__in=amounts.values('ingredient_id').annotate(
+            count=Count('recipe_id')
+        ).filter(count__lte=limit).values('ingredient_id')
+    ).values('recipe_id')).values_list('recipe_id', flat=True))
+    return candidates
+
+
+def refresh(log=None):
+    """
+    Пересчёт только для изменённых рецептов. Загружаются векторы
+    изменённых рецептов и рецептов с общими редкими ингредиентами:
+    только они бывают кандидатами в похожие на изменённые. Их списки
+    обновляются слиянием сохранённого списка с новым сходством
+    с изменёнными рецептами. Списки, которые от этого укоротились,
+    и списки рецептов, потерявших общие признаки с изменённым,
+    исправит полный расчёт.
+    """
+    log = log or (lambda message: None)
+    count = get_config()['NEIGHBORS']
+    seen = dict(RecipeSimilarity.objects.filter(
+        changes__gt=0
+    ).values_list('recipe_id', 'changes'))
+    changed = set(seen) | set(Recipe.objects.filter(
+        similarity__isnull=True
+    ).values_list('id', flat=True))
+    if not changed:
+        log('Изменённых рецептов нет')
+        return 0
+
+    candidates = changed | find_candidates(changed)
+    vectors = RecipeVectors.load(recipe_ids=candidates)
+    changed &= set(vectors.position)
+
+    results = {}
+    scores_with_changed = defaultdict(dict)
+    for recipe_id in changed:
+        index = vectors.position[recipe_id]
+        scores = vectors.scores(index)
+        for other, score in zip(*scores):
+            if score > 0:
+                scores_with_changed[int(vectors.recipe_ids[other])][
+                    recipe_id
+                ] = round(float(score), 4)
+        results[recipe_id] = vectors.neighbors(index, count, scores)
+
+    for recipe_id, neighbors in RecipeSimilarity.objects.filter(
+        recipe_id__in=candidates - changed
+    ).values_list('recipe_id', 'neighbors'):
+        merged = {neighbor: score for neighbor, score in neighbors
+                  if neighbor not in changed}
+        merged.update(scores_with_changed.get(recipe_id, {}))
+        updated = [[neighbor, score] for neighbor, score in sorted(
+            merged.items(), key=lambda item: (-item[1], -item[0])
+        )[:count]]
+        if updated != neighbors:
+            results[recipe_id] = updated
+    save(results, seen)
+    log(f'Изменено рецептов: {len(changed)}, '
+        f'пересчитано: {len(results)}')
+    return len(results)
+
+
+def mark_changed(recipe_id):
+    """Отмечает рецепт для пересчёта командой ``--stale``."""
+    if not RecipeSimilarity.objects.filter(recipe_id=recipe_id).update(
+        changes=F('changes') + 1
+    ) and Recipe.objects.filter(id=recipe_id).exists():
+        RecipeSimilarity.objects.get_or_create(
+            recipe_id=recipe_id, defaults={'changes': 1}
+        )
+
+
+def get_similar(recipe_id):
+    """Сохранённый список похожих рецептов: один запрос по ключу."""
+    return RecipeSimilarity.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('neighbors', flat=True).first() or []
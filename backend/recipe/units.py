@@ -0,0 +1,84 @@
+import numpy as np
+
+# Единица каталога: (базовая единица величины, сколько базовых в одной).
+# Единицы не из таблицы ("по вкусу", "щепотка", ...) не пересчитываются.
+UNITS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'ч. л.': ('мл', 5),
+    'ст. л.': ('мл', 15),
+    'стакан': ('мл', 250),
+    'шт.': ('шт.', 1),
+}
+
+# Крупная единица для вывода больших количеств в базовой единице.
+LARGER_UNITS = {
+    'г': ('кг', 1000),
+    'мл': ('л', 1000),
+}
+
+
+def format_amount(amount):
+    amount = round(float(amount), 2)
+    return str(int(amount)) if amount.is_integer() else str(amount)
+
+
+def aggregate(rows):
+    """
+    Сводит строки ``(название, единица, количество)`` в список покупок
+    ``(название, количество, единица)``, отсортированный по названию.
+
+    Ингредиент с одной единицей суммируется как есть. Если один и тот же
+    ингредиент встречается в разных единицах одной величины, количества
+    пересчитываются в базовую единицу и складываются. Весь расчёт идёт
+    массивами NumPy, цикл на Python - только по различным единицам.
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    names, units, amounts = zip(*rows)
+    _, name_index = np.unique(
+        [name.strip().lower() for name in names], return_inverse=True
+    )
+    unit_keys, unit_index = np.unique(units, return_inverse=True)
+    unit_keys = unit_keys.tolist()
+    amounts = np.asarray(amounts, dtype=np.float64)
+
+    # Величина единицы и множитель в базовую единицу.
+    base_units = [UNITS.get(unit, (unit, 1))[0] for unit in unit_keys]
+    base_keys, base_of_unit = np.unique(base_units, return_inverse=True)
+    factors = np.array([UNITS.get(unit, (unit, 1))[1] for unit in unit_keys],
+                       dtype=np.float64)
+
+    groups, group_index = np.unique(
+        name_index * len(base_keys) + base_of_unit[unit_index],
+        return_inverse=True,
+    )
+    base_totals = np.bincount(group_index,
+                              weights=amounts * factors[unit_index])
+    raw_totals = np.bincount(group_index, weights=amounts)
+    # Сколько разных единиц в группе; при одной - какая именно.
+    pairs = np.unique(group_index * len(unit_keys) + unit_index)
+    unit_counts = np.bincount(pairs // len(unit_keys), minlength=len(groups))
+    group_unit = np.zeros(len(groups), dtype=np.int64)
+    group_unit[pairs // len(unit_keys)] = pairs % len(unit_keys)
+
+    result = []
+    first_names = {}
+    for index, name in zip(name_index, names):
+        first_names.setdefault(index, name.strip())
+    for group, key in enumerate(groups):
+        name = first_names[key // len(base_keys)]
+        if unit_counts[group] == 1:
+            unit = unit_keys[group_unit[group]]
+            result.append((name, format_amount(raw_totals[group]), unit))
+            continue
+        unit = base_keys[key % len(base_keys)]
+        amount = base_totals[group]
+        larger, factor = LARGER_UNITS.get(unit, (unit, 1))
+        if amount >= factor:
+            unit, amount = larger, amount / factor
+        result.append((name, format_amount(amount), str(unit)))
+    return result
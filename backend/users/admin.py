@@ -1,3 +1,4 @@
+from api.jobs import delete_in_background
 from django.contrib import admin
 from django.contrib.admin import register
 from django.contrib.auth.admin import UserAdmin
@@ -8,12 +9,17 @@ from .models import Subscriptions
 
 class CustomUserAdmin(UserAdmin):
     list_display = ['email', 'username', ]
-    list_filter = ['email', 'username', ]
+    list_filter = ['is_staff', 'is_active', ]
+    show_full_result_count = False
+    actions = (delete_in_background, )
 
 
 @register(Subscriptions)
 class FollowAdmin(admin.ModelAdmin):
+    list_select_related = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
     autocomplete_fields = ('author', 'user')
+    show_full_result_count = False
 
 
 admin.site.unregister(User)
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.16 on 2026-10-19 09:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0009_subscriptions_unique_subscription'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularAuthor',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='auth.user', verbose_name='Автор')),
+                ('since', models.DateTimeField(auto_now_add=True, verbose_name='С какого времени')),
+            ],
+            options={
+                'verbose_name': 'Популярный автор',
+                'verbose_name_plural': 'Популярные авторы',
+            },
+        ),
+    ]
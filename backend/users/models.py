@@ -34,3 +34,29 @@ class Subscriptions(models.Model):
 
     def __str__(self) -> str:
         return f'{self.user}{self.author}'
+
+
+class PopularAuthor(models.Model):
+    """
+    Автор с большим числом подписчиков. Его рецепты не раскладываются
+    по лентам подписчиков, а подмешиваются при чтении ленты.
+    """
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    since = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='С какого времени'
+    )
+
+    class Meta:
+        verbose_name = 'Популярный автор'
+        verbose_name_plural = 'Популярные авторы'
+
+    def __str__(self):
+        return str(self.author_id)